@@ -1 +1 @@
-from afl_fuzz.afl import fuzz
\ No newline at end of file
+from afl_fuzz.afl import fuzz, fuzz_parallel
\ No newline at end of file
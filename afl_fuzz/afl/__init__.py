@@ -2,16 +2,34 @@
 main fuzzing logic
 '''
 from typing import Iterable, Callable
+import os
 import time
-from multiprocessing.pool import ThreadPool
+import socket
+import tempfile
+import multiprocessing
 
 from afl_fuzz.logger.base import ILogger
+from afl_fuzz.coverage_collector.result import CoverageResult
+from afl_fuzz.coverage_collector.context import Context
 
 from afl_fuzz.afl.state import State
-from afl_fuzz.afl.config import TRACE_BUCKETS
+from afl_fuzz.afl.config import (
+    TRACE_BUCKETS,
+    EXEC_MODE,
+    TRACE_BACKEND,
+    TRACE_MODE,
+    DEP_ALLOW,
+    DEP_DENY,
+    POWER_SCHEDULE,
+    SKIP_DETERMINISTIC,
+    STATS_INTERVAL
+)
 from afl_fuzz.afl.exec import dryrun
 from afl_fuzz.afl.fuzz_one import fuzz_one
 from afl_fuzz.afl.score import cull_queue
+from afl_fuzz.afl.pool import FuzzPool
+from afl_fuzz.afl.sync import ISyncer, DirSyncer, read_stats
+from afl_fuzz.afl.coordinator import CoordinatorSyncer, fetch_context
 
 def fuzz(
     entry: str, 
@@ -21,8 +39,22 @@ def fuzz(
     max_elapsed: int = float('inf'), 
     max_cycles: int = float('inf'), 
     n_workers: int = 1,
-    on_exception: Callable[[bytes, dict[str, str]], None] = None
-):
+    on_exception: Callable[[bytes, dict[str, str]], None] = None,
+    exec_mode: str = EXEC_MODE,
+    exec_options: dict = None,
+    trace_backend: str = TRACE_BACKEND,
+    trace_mode: str = TRACE_MODE,
+    dep_allow: list[str] = DEP_ALLOW,
+    dep_deny: list[str] = DEP_DENY,
+    n_buckets: int = TRACE_BUCKETS,
+    schedule: str = POWER_SCHEDULE,
+    max_execs: int = float('inf'),
+    sync_dir: str = None,
+    sync_id: str = None,
+    skip_deterministic: bool = SKIP_DETERMINISTIC,
+    ctx: Context = None,
+    coordinator: str = None
+) -> State:
     '''
     main fuzz loop
 
@@ -34,54 +66,87 @@ def fuzz(
     - op_logger: operation logger
     - max_elapsed: elapsed time
     - max_cycles: max fuzz cycles
-    - n_workers: no. of worker threads
+    - n_workers: no. of worker threads, each with its own executor process. `None` for no. of cores.
+    - on_exception: called when a new case is discovered with exception
+    - exec_mode: executor used to run the entry point, 'forkserver', 'persistent' or 'spawn'
+    - exec_options: executor options, e.g. `max_rss`, or `max_iters` and `restore` for 'persistent'
+    - trace_backend: tracing backend, 'monitoring' (python 3.12+), 'settrace' or 'instrument'
+    - trace_mode: lines which record an edge, 'line' or 'block' (first lines of basic blocks)
+    - dep_allow: globs on the paths of dependencies to trace, e.g. `['*/myproject/*']`. all if empty
+    - dep_deny: globs on the paths of dependencies not to trace, e.g. `['*/site-packages/*']`
+    - n_buckets: no. of trace buckets, a power of two up to 2^20. ignored if `ctx` is set
+    - schedule: seed scheduler, 'fifo', 'explore', 'fast' or 'coe'
+    - max_execs: max no. of executions. checked before fuzzing each entry
+    - sync_dir: directory to exchange entries with other instances. `None` to run alone
+    - sync_id: name of this instance in `sync_dir` or on `coordinator`
+    - skip_deterministic: skip deterministic stages
+    - ctx: coverage context. instances which share a sync directory share it, so that their bitmaps match
+    - coordinator: `host:port` of a coordinator to exchange entries with other nodes, instead of `sync_dir`.
+      its context is used
+
+    Returns:
+    ---
+    - afl state
     '''
+    n_workers = n_workers or os.cpu_count()
+
+    if sync_dir and coordinator:
+        raise ValueError('expected at most one of sync_dir and coordinator')
+
+    if coordinator:
+        ctx = fetch_context(coordinator)
+
     afl = State(
         entry, 
-        n_buckets=TRACE_BUCKETS, 
+        n_buckets=ctx.n_buckets if ctx else n_buckets, 
         exception_logger=exception_logger, 
         op_logger=op_logger, 
-        on_exception=on_exception
+        on_exception=on_exception,
+        exec_mode=exec_mode,
+        exec_options={ 'n_workers': n_workers, **(exec_options or dict()) },
+        trace_backend=trace_backend,
+        trace_mode=trace_mode,
+        dep_allow=dep_allow,
+        dep_deny=dep_deny,
+        schedule=schedule,
+        skip_deterministic=skip_deterministic,
+        ctx=ctx
     )
     
     afl.use_ctx()
 
-    pool: ThreadPool = None
+    syncer: ISyncer = None
 
-    try:
-        dryrun(afl, seed, n_workers=n_workers)
+    if sync_dir:
+        syncer = DirSyncer(afl, sync_dir, sync_id or str(os.getpid()))
+    elif coordinator:
+        syncer = CoordinatorSyncer(afl, coordinator, sync_id or f'{socket.gethostname()}-{os.getpid()}')
 
-        start = time.time()
+    # whether a cycle is in progress
+    in_cycle: bool = False
 
-        def map(_):
-            with afl.lock:
-                entry = afl.queue.pop()
+    def fuzz_entry(entry: CoverageResult):
+        if afl.total_execs >= max_execs:
+            return
 
-            fuzz_one(afl, entry)
+        fuzz_one(afl, entry)
+        afl.scheduler.done(entry)
 
-            with afl.lock:
-                afl.fuzzed_queue.push(entry)
+        syncer and syncer.sync()
 
-        afl.coverage_updated = True
-        afl.should_splice = False
+    def next_cycle() -> list[CoverageResult]:
+        nonlocal in_cycle
 
-        while (time.time() - start < max_elapsed) and afl.queue_cycle < max_cycles:
-            # fuzz loop
-            cull_queue(afl)
+        cull_queue(afl)
 
-            afl.op_logger.write(f'begin fuzz cycle = {afl.queue_cycle}')
-
-            if n_workers == 1:
-                for i in range(len(afl.queue)):
-                    map(i)
-            else:
-                pool = ThreadPool(n_workers)
-                pool.imap_unordered(map, range(len(afl.queue)))
-                pool.close()
-                pool.join()
-                pool = None
+        # entries in flight are still fuzzed in the current cycle
+        entries = [el for el in afl.scheduler.next_cycle() if not pool.in_flight(el)]
 
+        if not entries:
+            return []
 
+        # a cycle ends once all its entries are taken, and there is other work to do
+        if in_cycle:
             afl.should_splice = not afl.coverage_updated
             afl.coverage_updated = False
 
@@ -92,8 +157,130 @@ def fuzz(
             print('=====')
             print(f'elapsed: {time.time() - start}')
             print(f'estimated coverage: {afl.estimate_coverage()}')
+
+            for i, stats in enumerate(afl.executor.stats()):
+                print(f'worker {i}: {stats}')
+
+            for i, stats in enumerate(pool.stats()):
+                print(f'thread {i}: {stats}')
+
             print('=====')
 
+        if time.time() - start >= max_elapsed or afl.queue_cycle >= max_cycles or afl.total_execs >= max_execs:
+            return None
+
+        in_cycle = True
+        afl.op_logger.write(f'begin fuzz cycle = {afl.queue_cycle}')
+
+        return entries
+
+    pool = FuzzPool(n_workers, fuzz_entry, next_cycle)
+
+    try:
+        dryrun(afl, seed, n_workers=n_workers)
+
+        start = time.time()
+
+        afl.coverage_updated = True
+        afl.should_splice = False
+
+        if syncer:
+            # every instance has the seeds
+            for el in afl.fuzzed_queue:
+                el.synced = True
+
+        pool.run()
+
+        if syncer:
+            syncer.export_entries()
+            syncer.write_stats()
+
     finally:
+        pool.stop()
+        syncer and syncer.close()
         afl.rm_ctx()
-        pool and pool.close()
\ No newline at end of file
+
+    return afl
+
+def fuzz_parallel(
+    entry: str,
+    seed: Iterable[bytes],
+    n_instances: int = None,
+    sync_dir: str = None,
+    **kwargs
+) -> dict:
+    '''
+    run independent fuzzer processes, each with its own state, which exchange entries through a
+    sync directory. like AFL's -M/-S mode, the first instance ('main') runs deterministic stages
+    and the others ('secondary<i>') skip them.
+
+    Arguments:
+    ---
+    - entry: entry point
+    - seed: input seed
+    - n_instances: no. of instances. `None` for no. of cores.
+    - sync_dir: sync directory. `None` for a temporary directory
+    - kwargs: passed to `fuzz` in each instance, e.g. `max_elapsed` or `max_execs`
+
+    Returns:
+    ---
+    - stats of all instances. see `read_stats`
+    '''
+    n_instances = n_instances or os.cpu_count()
+    seed = [*seed]
+
+    tmp = tempfile.TemporaryDirectory() if sync_dir is None else None
+    sync_dir = tmp.name if tmp else sync_dir
+
+    # same bucket of each line in all instances
+    ctx = Context.create(
+        kwargs.get('n_buckets', TRACE_BUCKETS),
+        entry,
+        kwargs.get('trace_backend', TRACE_BACKEND),
+        kwargs.get('trace_mode', TRACE_MODE),
+        kwargs.get('dep_allow', DEP_ALLOW),
+        kwargs.get('dep_deny', DEP_DENY)
+    )
+
+    mp = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+
+    procs = [
+        mp.Process(target=fuzz, args=(entry, seed), kwargs={
+            **kwargs,
+            'ctx': ctx,
+            'sync_dir': sync_dir,
+            'sync_id': 'main' if i == 0 else f'secondary{i}',
+            'skip_deterministic': i > 0
+        })
+        for i in range(n_instances)
+    ]
+
+    start = time.time()
+
+    try:
+        for p in procs:
+            p.start()
+
+        while alive := [p for p in procs if p.is_alive()]:
+            alive[0].join(STATS_INTERVAL)
+
+            # show stats
+            stats = read_stats(sync_dir)
+
+            print('=====')
+            print(f'elapsed: {time.time() - start}')
+            print(f'instances: {len(alive)} of {n_instances} running')
+            print(f'execs: {stats["execs"]}, execs/s: {stats["execs"] / (time.time() - start):.1f}')
+            print(f'buckets covered: {stats["covered"]}')
+
+            for name, el in stats['instances'].items():
+                print(f'{name}: execs: {el["execs"]}, cycles: {el["cycles"]}, entries: {el["entries"]}, imported: {el["imported"]}')
+
+            print('=====')
+
+        return read_stats(sync_dir)
+    finally:
+        for p in procs:
+            p.is_alive() and p.terminate()
+
+        tmp and tmp.cleanup()
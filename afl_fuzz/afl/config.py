@@ -1,9 +1,37 @@
 '''
 config settings
 '''
-
-# no. of buckets used in sketch
-TRACE_BUCKETS: int = 1024
+import os
+import sys
+
+# No. of trace buckets, a power of two up to 2^20. Fewer edges share a bucket on
+# larger maps, see `python -m afl_fuzz.coverage_collector.collisions <entry>`, and
+# pass `fuzz(n_buckets=...)` to use one:
+TRACE_BUCKETS: int = 1 << 10
+
+# Executor used to run the fuzzed code: 'forkserver' forks a child per input from
+# a warm process, 'spawn' launches a fresh interpreter per input.
+EXEC_MODE: str = 'forkserver' if hasattr(os, 'fork') else 'spawn'
+
+# Max. number of inputs sent to the executor in one request during deterministic
+# stages:
+EXEC_BATCH_SIZE: int = 64
+
+# Tracing backend: 'monitoring' uses sys.monitoring (python 3.12+) and skips code
+# without markers, 'settrace' uses coverage.py on sys.settrace, 'instrument' inserts
+# counters into the target at import time.
+TRACE_BACKEND: str = 'monitoring' if hasattr(sys, 'monitoring') else 'settrace'
+
+# Lines which record an edge: 'line' marks every line, 'block' only the first
+# line of each basic block, so straight-line code does not touch the hit map:
+TRACE_MODE: str = 'line'
+
+# Globs on the paths of dependencies to trace. A dependency is skipped if it matches
+# one in DEP_DENY, or if DEP_ALLOW is not empty and it matches none of it. The entry
+# point is always traced. E.g. '*/site-packages/*' in DEP_DENY skips third-party
+# packages:
+DEP_ALLOW: list[str] = []
+DEP_DENY: list[str] = []
 
 # Default timeout for fuzzed code (milliseconds).
 EXEC_TIMEOUT: int = 500
@@ -13,6 +41,17 @@ CALIBRATE_SAMPLE_SIZE: int = 3
 
 PREFER_QUEUE_CAPACITY: int = 2000
 
+# Seed scheduler: 'fifo' goes through the queue in order and skips non-favored entries,
+# power schedules ('explore', 'fast', 'coe') pick entries at random, weighted by energy.
+POWER_SCHEDULE: str = 'fast'
+
+# Maximum energy of an entry under a power schedule:
+MAX_FACTOR: float = 32
+
+# No. of path frequency counters for power schedules. Paths are mapped to
+# counters by checksum:
+N_FUZZ_SIZE: int = 1 << 20
+
 # Probabilities of skipping non-favored entries in the queue
 SKIP_FUZZ_PROB: float = 0.99
 SKIP_NFAV_OLD_PROB: float = 0.95
@@ -64,6 +103,26 @@ HAVOC_BLK_XL: int = 32768
 
 SKIP_DETERMINISTIC: bool = False
 
+# Min. seconds between exchanges of queue entries with other instances through
+# the sync directory:
+SYNC_INTERVAL: float = 5
+
+# Seconds between stats printed by `fuzz_parallel` and the coordinator:
+STATS_INTERVAL: float = 10
+
+# Max. no. of entries sent to or received from the coordinator per request. The
+# coordinator may accept fewer, and the rest are sent in later syncs:
+COORD_MAX_BATCH: int = 256
+
+# Max. no. of new entries waiting to be sent to the coordinator. Entries found
+# while the coordinator is behind are only kept locally:
+COORD_MAX_PENDING: int = 4096
+
+# Max. size of a request to the coordinator, in bytes. Pushes are cut to fit, entries
+# larger than this are not sent, and the coordinator closes connections which send
+# larger frames:
+COORD_MAX_FRAME: int = 64 * 1024 * 1024
+
 # Limits for the test case trimmer. The absolute minimum chunk size; and
 # the starting and ending divisors for chopping up the input file:
 TRIM_MIN_BYTES: int = 4
@@ -0,0 +1,584 @@
+'''
+coordinator of a fuzzing campaign over several nodes. it owns the global coverage bitmap and the
+corpus of entries which covered something new, and serves them to clients over TCP.
+
+every message is a frame `<type: u8><length: u32><payload>`, and every request gets a reply of the
+same type, or a `MSG_ERROR` reply with the reason if the request is malformed:
+
+- `MSG_CONTEXT`: empty. reply: compressed context, shared by all nodes so that their bitmaps match
+- `MSG_HELLO`: name of the client. reply: empty
+- `MSG_PUSH`: `<n: u32>` then n entries. reply: `<accepted: u32><new: u32>`. the coordinator
+  accepts at most `max_batch` entries per request, and the client sends the rest later
+- `MSG_PULL`: `<cursor: u64><max. n: u32>`. reply: `<cursor: u64><n: u32>`, n entries of other
+  clients, then the compressed global bitmap once the client has caught up
+- `MSG_STATS`: stats of the client as json. reply: empty
+
+the coordinator closes the connection after a frame longer than `max_frame` bytes, or of unknown
+type. clients are not authenticated, so it listens on localhost unless told otherwise.
+
+an entry is `<input length: u32><input>` followed by its edge list, see `pack_edges`. all integers,
+edge lists included, are little-endian.
+
+usage: python -m afl_fuzz.afl.coordinator entry.py [port] [host]
+'''
+from collections import deque
+from socketserver import ThreadingTCPServer, StreamRequestHandler
+from threading import Thread, Lock
+from array import array
+from typing import BinaryIO
+import json
+import socket
+import struct
+import sys
+import time
+import zlib
+
+from afl_fuzz.afl.state import State
+from afl_fuzz.afl.sync import ISyncer, SyncError
+from afl_fuzz.afl.config import (
+    TRACE_BUCKETS,
+    TRACE_BACKEND,
+    TRACE_MODE,
+    DEP_ALLOW,
+    DEP_DENY,
+    STATS_INTERVAL,
+    COORD_MAX_BATCH,
+    COORD_MAX_PENDING,
+    COORD_MAX_FRAME
+)
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.ipc import pack_edges, unpack_cov
+from afl_fuzz.coverage_collector.result import CoverageResult, EDGE_SHIFT, EDGE_MASK, bitmap_size
+
+MSG_CONTEXT: int = 1
+MSG_HELLO: int = 2
+MSG_PUSH: int = 3
+MSG_PULL: int = 4
+MSG_STATS: int = 5
+MSG_ERROR: int = 6
+
+# type, payload length
+_HEADER = struct.Struct('<BI')
+_LEN = struct.Struct('<I')
+# accepted, new
+_ACK = struct.Struct('<II')
+# cursor, no. of entries
+_PULL = struct.Struct('<QI')
+
+# frames are read in chunks of this size, so that a length alone does not allocate memory
+_CHUNK_SIZE: int = 1 << 16
+
+# fields of the stats of a client read by the coordinator
+_STATS_FIELDS: list[str] = ['execs', 'imported', 'exported', 'elapsed', 'sync_time']
+
+def _read_frame(f: BinaryIO, max_len: int = None) -> tuple[int, bytes]:
+    header = f.read(_HEADER.size)
+
+    if len(header) < _HEADER.size:
+        raise ConnectionError('connection closed')
+
+    msg, n = _HEADER.unpack(header)
+
+    if max_len is not None and n > max_len:
+        raise ValueError(f'frame of {n} bytes, expected at most {max_len}')
+
+    payload = bytearray()
+
+    while len(payload) < n:
+        chunk = f.read(min(n - len(payload), _CHUNK_SIZE))
+
+        if not chunk:
+            raise ConnectionError('connection closed')
+
+        payload += chunk
+
+    return msg, bytes(payload)
+
+def _write_frame(f: BinaryIO, msg: int, payload: bytes):
+    f.write(_HEADER.pack(msg, len(payload)))
+    f.write(payload)
+    f.flush()
+
+def _pack_entry(args: bytes, edges: bytes) -> bytes:
+    '''
+    serialize an entry
+
+    Arguments:
+    ---
+    - args: input
+    - edges: edge list serialized by `pack_edges`
+    '''
+    return _LEN.pack(len(args)) + args + edges
+
+def _unpack_entry(payload: bytes, pos: int) -> tuple[bytes, int]:
+    '''
+    deserialize the input of an entry serialized by `_pack_entry`
+
+    Returns:
+    ---
+    - input. offset of its edge list, see `unpack_cov`
+    '''
+    n, = _LEN.unpack_from(payload, pos)
+    pos += _LEN.size
+
+    if pos + n > len(payload):
+        raise ValueError('truncated entry')
+
+    return payload[pos:pos + n], pos + n
+
+def _merge(covered: bytearray, edges: array) -> bool:
+    '''
+    merge an edge list into a bitmap
+
+    Returns:
+    ---
+    - whether it covers something new
+    '''
+    changed = False
+
+    for edge in edges:
+        i = edge >> EDGE_SHIFT
+        new = covered[i] | (edge & EDGE_MASK)
+
+        if new != covered[i]:
+            covered[i] = new
+            changed = True
+
+    return changed
+
+def _connect(address: str) -> socket.socket:
+    host, port = address.rsplit(':', 1)
+
+    sock = socket.create_connection((host, int(port)))
+    # requests are small and wait for their reply
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    return sock
+
+class _Server(ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class _Handler(StreamRequestHandler):
+    '''
+    serves one client
+    '''
+
+    def handle(self):
+        coordinator: Coordinator = self.server.coordinator
+        name: str = None
+
+        while True:
+            try:
+                msg, payload = _read_frame(self.rfile, coordinator.max_frame)
+            except ConnectionError:
+                return
+            except ValueError as e:
+                # the payload is not read, so the next frame cannot be found
+                _write_frame(self.wfile, MSG_ERROR, str(e).encode())
+                return
+
+            try:
+                if msg == MSG_HELLO:
+                    name = payload.decode()
+                    reply = b''
+                elif msg == MSG_CONTEXT:
+                    reply = zlib.compress(coordinator.ctx.dumps())
+                elif msg == MSG_PUSH:
+                    reply = coordinator.push(name, payload)
+                elif msg == MSG_PULL:
+                    reply = coordinator.pull(name, payload)
+                elif msg == MSG_STATS:
+                    coordinator.set_stats(name, json.loads(payload))
+                    reply = b''
+                else:
+                    _write_frame(self.wfile, MSG_ERROR, f'unknown message type {msg}'.encode())
+                    return
+            except (struct.error, IndexError, ValueError) as e:
+                msg, reply = MSG_ERROR, str(e).encode()
+
+            _write_frame(self.wfile, msg, reply)
+
+class Coordinator:
+    '''
+    TCP server which owns the global coverage bitmap and corpus. an entry pushed by a client is
+    kept only if it covers something new globally.
+    '''
+
+    def __init__(
+        self,
+        ctx: Context,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        max_batch: int = COORD_MAX_BATCH,
+        max_frame: int = COORD_MAX_FRAME
+    ):
+        '''
+        Arguments:
+        ---
+        - ctx: coverage context, sent to all clients
+        - host: address to listen on
+        - port: port to listen on. 0 for any free port
+        - max_batch: max. no. of entries accepted or sent per request
+        - max_frame: max. size of a request in bytes
+        '''
+        self.ctx = ctx
+        self.max_batch: int = max_batch
+
+        self.max_frame: int = max_frame
+
+        # global coverage bitmap
+        self.covered = bytearray(ctx.n_buckets)
+
+        # (client, input, serialized edge list) of entries which covered something new, in order
+        self.entries: list[tuple[str, bytes, bytes]] = []
+
+        # client -> its last stats
+        self.instances: dict[str, dict] = dict()
+
+        self.start_time: float = time.time()
+
+        self._lock = Lock()
+
+        self._server = _Server((host, port), _Handler)
+        self._server.coordinator = self
+
+        self._thread: Thread = None
+
+    @property
+    def address(self) -> str:
+        '''
+        `host:port` to pass to clients
+        '''
+        host, port = self._server.server_address[:2]
+        return f'{host}:{port}'
+
+    def start(self) -> str:
+        '''
+        serve in a background thread
+
+        Returns:
+        ---
+        - `host:port` to pass to clients
+        '''
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+        return self.address
+
+    def close(self):
+        '''
+        stop serving
+        '''
+        if self._thread:
+            self._server.shutdown()
+            self._thread = None
+
+        self._server.server_close()
+
+    def push(self, name: str, payload: bytes) -> bytes:
+        '''
+        handle `MSG_PUSH`
+        '''
+        n, = _LEN.unpack_from(payload)
+        pos = _LEN.size
+
+        n_accepted = min(n, self.max_batch)
+        n_new = 0
+
+        # (input, edge list, serialized edge list). all entries are checked before any is merged
+        batch: list[tuple[bytes, array, bytes]] = []
+
+        for _ in range(n_accepted):
+            args, start = _unpack_entry(payload, pos)
+            edges, _, pos = unpack_cov(payload, start)
+
+            if pos > len(payload):
+                raise ValueError('truncated edge list')
+
+            last = max(edges, default=0) >> EDGE_SHIFT
+
+            if last >= len(self.covered):
+                raise ValueError(f'bucket {last} out of range, expected less than {len(self.covered)}')
+
+            batch.append((args, edges, payload[start:pos]))
+
+        with self._lock:
+            for args, edges, packed in batch:
+                if _merge(self.covered, edges):
+                    self.entries.append((name, args, packed))
+                    n_new += 1
+
+        return _ACK.pack(n_accepted, n_new)
+
+    def pull(self, name: str, payload: bytes) -> bytes:
+        '''
+        handle `MSG_PULL`
+        '''
+        cursor, n = _PULL.unpack(payload)
+        n = min(n, self.max_batch)
+
+        entries: list[bytes] = []
+
+        with self._lock:
+            while cursor < len(self.entries) and len(entries) < n:
+                origin, args, edges = self.entries[cursor]
+                cursor += 1
+
+                if origin != name:
+                    entries.append(_pack_entry(args, edges))
+
+            # only once caught up, so that the client still keeps the entries it is behind on
+            bitmap = zlib.compress(self.covered) if cursor == len(self.entries) else b''
+
+        return _PULL.pack(cursor, len(entries)) + b''.join(entries) + bitmap
+
+    def set_stats(self, name: str, stats: dict):
+        '''
+        handle `MSG_STATS`
+        '''
+        if not isinstance(stats, dict) or not all(type(stats.get(k)) in (int, float) for k in _STATS_FIELDS):
+            raise ValueError(f'stats must hold the numbers {", ".join(_STATS_FIELDS)}')
+
+        with self._lock:
+            self.instances[name] = stats
+
+    def stats(self) -> dict:
+        '''
+        aggregate the stats of all clients
+
+        Returns:
+        ---
+        - `instances`: stats of each client, by name. `execs`: total no. of executions.
+          `covered`: no. of buckets covered globally. `entries`: size of the corpus
+        '''
+        with self._lock:
+            return {
+                'instances': dict(self.instances),
+                'execs': sum(el['execs'] for el in self.instances.values()),
+                'covered': bitmap_size(self.covered),
+                'entries': len(self.entries)
+            }
+
+def fetch_context(address: str) -> Context:
+    '''
+    get the coverage context of a coordinator
+
+    Arguments:
+    ---
+    - address: `host:port` of the coordinator
+    '''
+    with _connect(address) as sock, sock.makefile('rwb') as f:
+        _write_frame(f, MSG_CONTEXT, b'')
+        _, payload = _read_frame(f)
+
+    return Context.loads(zlib.decompress(payload))
+
+class CoordinatorSyncer(ISyncer):
+    '''
+    exchange entries through a coordinator. new entries are sent with their edge list, so
+    imported entries are not run again: all nodes use the context of the coordinator, so an edge
+    list means the same on all of them.
+    '''
+
+    def __init__(self, state: State, address: str, sync_id: str):
+        '''
+        Arguments:
+        ---
+        - state: afl state. its context must be the one of the coordinator, see `fetch_context`
+        - address: `host:port` of the coordinator
+        - sync_id: name of this instance
+        '''
+        super().__init__(state)
+
+        self.sync_id = sync_id
+        self.address = address
+
+        self._sock: socket.socket = None
+        self._file: BinaryIO = None
+
+        # serialized entries found since the last push
+        self.pending: deque[bytes] = deque()
+        # no. of entries not sent because `pending` was full or they were too large
+        self.n_dropped: int = 0
+        # no. of entries the coordinator rejected
+        self.n_rejected: int = 0
+
+        # no. of coordinator entries seen
+        self.cursor: int = 0
+
+        self._connect()
+
+        state.on_new_entry = self._on_new_entry
+
+    def _connect(self):
+        self._sock = _connect(self.address)
+        self._file = self._sock.makefile('rwb')
+
+        self._request(MSG_HELLO, self.sync_id.encode())
+
+    def _disconnect(self):
+        f, sock = self._file, self._sock
+        self._file = None
+        self._sock = None
+
+        if f:
+            # flushing a broken connection fails
+            try:
+                f.close()
+            except OSError:
+                pass
+
+            sock.close()
+
+    def _request(self, msg: int, payload: bytes) -> bytes:
+        '''
+        send a request and read its reply. raises `OSError` if the connection broke, and reconnects
+        on the next request. raises `SyncError` if the coordinator rejected the request.
+        '''
+        if not self._file:
+            self._connect()
+
+        try:
+            _write_frame(self._file, msg, payload)
+            reply, payload = _read_frame(self._file)
+
+            if reply != msg and reply != MSG_ERROR:
+                raise ConnectionError(f'unexpected reply {reply} to {msg}')
+        except OSError:
+            self._disconnect()
+            raise
+
+        if reply == MSG_ERROR:
+            raise SyncError(f'coordinator rejected {msg}: {payload.decode(errors="replace")}')
+
+        return payload
+
+    def _push(self, batch: list[bytes]) -> int:
+        '''
+        Returns:
+        ---
+        - no. of entries accepted
+        '''
+        n_accepted, _ = _ACK.unpack(self._request(MSG_PUSH, _LEN.pack(len(batch)) + b''.join(batch)))
+
+        return n_accepted
+
+    def _on_new_entry(self, cov: CoverageResult):
+        # the coordinator is behind, or would reject the entry
+        if len(self.pending) >= COORD_MAX_PENDING:
+            self.n_dropped += 1
+            return
+
+        entry = _pack_entry(cov.args, pack_edges(cov.cov, cov.cov_cksum))
+
+        if _LEN.size + len(entry) > COORD_MAX_FRAME:
+            self.n_dropped += 1
+            return
+
+        self.pending.append(entry)
+
+    def export_entries(self):
+        batch: list[bytes] = []
+        size = _LEN.size
+
+        # as many entries as fit in a frame
+        for entry in self.pending:
+            if len(batch) >= COORD_MAX_BATCH or size + len(entry) > COORD_MAX_FRAME:
+                break
+
+            batch.append(entry)
+            size += len(entry)
+
+        if not batch:
+            return
+
+        try:
+            n_accepted = self._push(batch)
+            n_done = n_accepted
+        except SyncError:
+            # push one by one to find the rejected entries, which are dropped. otherwise they
+            # would block the entries behind them
+            n_accepted = 0
+
+            for entry in batch:
+                try:
+                    n_accepted += self._push([entry])
+                except SyncError:
+                    self.n_rejected += 1
+
+            n_done = len(batch)
+
+        for _ in range(n_done):
+            self.pending.popleft()
+
+        self.n_exported += n_accepted
+
+    def import_entries(self):
+        state = self.state
+
+        payload = self._request(MSG_PULL, _PULL.pack(self.cursor, COORD_MAX_BATCH))
+        self.cursor, n = _PULL.unpack_from(payload)
+        pos = _PULL.size
+
+        with state.lock:
+            for _ in range(n):
+                args, pos = _unpack_entry(payload, pos)
+                edges, cov_cksum, pos = unpack_cov(payload, pos)
+
+                cov = CoverageResult(args, edges, cov_cksum=cov_cksum)
+                cov.synced = True
+
+                if not state.update_coverage(cov):
+                    continue
+
+                # calibrated once picked
+                cov.handicap = state.queue_cycle + 1
+                state.queue.push(cov, state.scheduler.energy(cov))
+
+                self.n_imported += 1
+
+            if pos < len(payload):
+                # caught up, so the entries of this bitmap are in the queue
+                covered = int.from_bytes(state.covered, 'little') | int.from_bytes(zlib.decompress(payload[pos:]), 'little')
+                state.covered[:] = covered.to_bytes(len(state.covered), 'little')
+
+    def write_stats(self):
+        self._request(MSG_STATS, json.dumps({ **self.stats(), 'pending': len(self.pending), 'dropped': self.n_dropped, 'rejected': self.n_rejected }).encode())
+
+    def close(self):
+        self.state.on_new_entry = lambda _: None
+
+        self._disconnect()
+
+if __name__ == '__main__':
+    entry = sys.argv[1]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    # e.g. 0.0.0.0 to serve other nodes
+    host = sys.argv[3] if len(sys.argv) > 3 else '127.0.0.1'
+
+    coordinator = Coordinator(Context.create(TRACE_BUCKETS, entry, TRACE_BACKEND, TRACE_MODE, DEP_ALLOW, DEP_DENY), host=host, port=port)
+    print(f'listening on {coordinator.start()}')
+
+    if not host.startswith('127.') and host != 'localhost':
+        print('warning: clients are not authenticated. anyone who can reach this address can push entries')
+
+    try:
+        while True:
+            time.sleep(STATS_INTERVAL)
+
+            # show stats
+            stats = coordinator.stats()
+
+            print('=====')
+            print(f'elapsed: {time.time() - coordinator.start_time}')
+            print(f'execs: {stats["execs"]}, entries: {stats["entries"]}, buckets covered: {stats["covered"]}')
+
+            for name, el in stats['instances'].items():
+                print(f'{name}: execs: {el["execs"]}, imported: {el["imported"]}, exported: {el["exported"]}, sync time: {el["sync_time"] / max(el["elapsed"], 1e-9):.2%}')
+
+            print('=====')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        coordinator.close()
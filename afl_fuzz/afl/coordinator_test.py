@@ -0,0 +1,163 @@
+'''
+unit test for coordinator.py
+'''
+
+import socket
+import unittest
+from array import array
+
+from afl_fuzz.afl.test_util import StateTestCase
+from afl_fuzz.afl.exec import fuzz_arg
+from afl_fuzz.afl.coordinator import (
+    Coordinator,
+    CoordinatorSyncer,
+    fetch_context,
+    MSG_PUSH,
+    MSG_PULL,
+    MSG_STATS,
+    MSG_ERROR,
+    _HEADER,
+    _LEN,
+    _PULL,
+    _connect,
+    _pack_entry,
+    _read_frame,
+    _write_frame
+)
+from afl_fuzz.coverage_collector.ipc import pack_edges
+from afl_fuzz.coverage_collector.result import bitmap_size, EDGE_SHIFT
+
+TARGET = '''
+def main(args: bytes):
+    if args[:1] == b'a':
+        print('a')
+    elif args[:1] == b'b':
+        print('b')
+'''
+
+class coordinator_test(StateTestCase):
+    '''
+    unit test for Coordinator and CoordinatorSyncer
+    '''
+
+    target = 'coord_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        # accepts one entry per push
+        self.coordinator = Coordinator(self.create_context(64), max_batch=1)
+        address = self.coordinator.start()
+
+        ctx = fetch_context(address)
+        self.states = [self.create_state(64, ctx, exec_mode='spawn') for _ in range(2)]
+
+        for state in self.states:
+            state.use_ctx()
+
+        self.syncers = [CoordinatorSyncer(state, address, f'instance{i}') for i, state in enumerate(self.states)]
+
+    def tearDown(self):
+        for syncer in self.syncers:
+            syncer.close()
+
+        for state in self.states:
+            state.rm_ctx()
+
+        self.coordinator.close()
+
+        super().tearDown()
+
+    def test_sync(self):
+        a, b = self.states
+
+        for args in [b'a', b'b', b'aa']:
+            fuzz_arg(a, args)
+
+        # `aa` covers nothing new
+        self.assertEqual(len(self.syncers[0].pending), 2)
+
+        self.syncers[0].sync(force=True)
+        self.syncers[1].sync(force=True)
+
+        # the rest is sent later
+        self.assertEqual(self.syncers[0].n_exported, 1)
+        self.assertEqual(len(self.syncers[0].pending), 1)
+        self.assertEqual([el.args for el in b.queue], [b'a'])
+
+        self.syncers[0].sync(force=True)
+        self.syncers[1].sync(force=True)
+
+        # imported without running, and not sent back
+        self.assertEqual(sorted(el.args for el in b.queue), [b'a', b'b'])
+        self.assertEqual(b.total_execs, 0)
+        self.assertEqual(self.syncers[1].n_exported, 0)
+
+        stats = self.coordinator.stats()
+
+        self.assertEqual(stats['entries'], 2)
+        self.assertEqual([*stats['instances']], ['instance0', 'instance1'])
+        self.assertEqual(stats['covered'], bitmap_size(a.covered))
+        self.assertEqual(stats['covered'], bitmap_size(b.covered))
+
+    def test_malformed(self):
+        coordinator = self.coordinator
+        entry = _pack_entry(b'x', pack_edges(array('I', [(1 << EDGE_SHIFT) | 1, (64 << EDGE_SHIFT) | 1]), 0))
+
+        with _connect(coordinator.address) as sock, sock.makefile('rwb') as f:
+            # bucket out of range, truncated entry, stats which are not an object
+            for msg, payload in [(MSG_PUSH, _LEN.pack(1) + entry), (MSG_PUSH, _LEN.pack(1) + entry[:-2]), (MSG_STATS, b'[]')]:
+                _write_frame(f, msg, payload)
+                self.assertEqual(_read_frame(f)[0], MSG_ERROR)
+
+            # still served
+            _write_frame(f, MSG_PULL, _PULL.pack(0, 1))
+            self.assertEqual(_read_frame(f)[0], MSG_PULL)
+
+            # longer than any request. closed without reading the payload
+            f.write(_HEADER.pack(MSG_PUSH, coordinator.max_frame + 1))
+            f.flush()
+
+            self.assertEqual(_read_frame(f)[0], MSG_ERROR)
+            self.assertRaises(ConnectionError, _read_frame, f)
+
+        # nothing merged
+        self.assertEqual(coordinator.stats(), { 'instances': {}, 'execs': 0, 'covered': 0, 'entries': 0 })
+
+    def test_rejected(self):
+        a = self.states[0]
+        syncer = self.syncers[0]
+
+        # bucket out of range, ahead of a valid entry
+        syncer.pending.append(_pack_entry(b'x', pack_edges(array('I', [(64 << EDGE_SHIFT) | 1]), 0)))
+        fuzz_arg(a, b'a')
+
+        for _ in range(2):
+            syncer.sync(force=True)
+
+        self.assertEqual(syncer.n_rejected, 1)
+        self.assertEqual(syncer.n_exported, 1)
+        self.assertEqual(len(syncer.pending), 0)
+        self.assertEqual(syncer.n_errors, 0)
+
+    def test_reconnect(self):
+        a = self.states[0]
+        syncer = self.syncers[0]
+
+        fuzz_arg(a, b'a')
+
+        # the connection breaks. the sync fails, and the next one reconnects
+        syncer._sock.shutdown(socket.SHUT_RDWR)
+        syncer.sync(force=True)
+
+        self.assertEqual(syncer.n_errors, 1)
+        self.assertEqual(len(syncer.pending), 1)
+
+        syncer.sync(force=True)
+
+        self.assertEqual(syncer.n_exported, 1)
+        self.assertEqual(self.coordinator.stats()['entries'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
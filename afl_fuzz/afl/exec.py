@@ -1,14 +1,15 @@
-from typing import Iterable
+from typing import Iterable, Iterator
+from itertools import islice
 from multiprocessing.pool import ThreadPool
 
-from afl_fuzz.coverage_collector.process import collect
 from afl_fuzz.coverage_collector.result import CoverageResult
 
 from afl_fuzz.afl.state import State
-from afl_fuzz.afl.score import update_bitmap_score
+from afl_fuzz.afl.score import update_bitmap_score, release_cov
 
 from afl_fuzz.afl.config import (
     EXEC_TIMEOUT, 
+    EXEC_BATCH_SIZE,
     CALIBRATE_SAMPLE_SIZE,
     TRIM_MIN_BYTES,
     TRIM_END_STEPS,
@@ -25,16 +26,16 @@ def calibrate(state: State, path: CoverageResult) -> CoverageResult:
     total_bitmap_size = 0
     total_calc_us = 0
 
-    for _ in range(CALIBRATE_SAMPLE_SIZE):
-        try:
-            cov = collect(state.entry_module, state.ctx_fname, path.args, timeout=EXEC_TIMEOUT)
+    # all samples in one round trip
+    results, error = state.executor.collect_batch([path.args] * CALIBRATE_SAMPLE_SIZE, timeout=EXEC_TIMEOUT / 1000)
 
-            if cov.exception:
-                state.on_exception(cov.args, cov.exception)
+    if error:
+        state.exception_logger.write(f'failed to run due to an exception: {error}')
+        return None
 
-        except Exception as ex:
-            state.exception_logger.write(f'failed to run due to an exception: {ex}')
-            return None
+    for cov in results:
+        if cov.exception:
+            state.on_exception(cov.args, cov.exception)
 
         total_bitmap_size += cov.bitmap_size
         total_calc_us += cov.elapsed
@@ -83,10 +84,10 @@ def dryrun(state: State, paths: Iterable[bytes], n_workers: int):
 
         with state.lock:
             state.update_coverage(p)
-            p.cov = None
-
             state.fuzzed_queue.push(p)
 
+        release_cov(state, p)
+
     if n_workers == 1:
         for i in range(len(state.queue)):
             run(i)
@@ -109,22 +110,40 @@ def save_if_interesting(state: State, cov: CoverageResult):
     - state: afl state
     - cov: coverage result
     '''
-    assert cov.cov
+    assert cov.cov is not None
 
-    if not state.update_coverage(cov):
-        return False
-    
-    cov.handicap = state.queue_cycle + 1
-    state.queue.push(cov)
+    with state.lock:
+        state.total_execs += 1
+        state.scheduler.on_exec(cov)
+
+        if not state.update_coverage(cov):
+            return False
+
+        cov.handicap = state.queue_cycle + 1
+        state.queue.push(cov, state.scheduler.energy(cov))
+        state.on_new_entry(cov)
 
     try:
         calibrate(state, cov)
-        cov.cov = None
+        release_cov(state, cov)
     except Exception as ex:
         state.op_logger.write(f'Failed to calibrate path due to {ex}')
 
     return True
 
+def report_crash(state: State, arg: bytes, error: ChildProcessError):
+    '''
+    report an input which killed the target as an exception, so that it is kept like other findings
+
+    Arguments:
+    ---
+    - state: afl state
+    - arg: input
+    - error: error of the executor
+    '''
+    state.exception_logger.write(f'target crashed on input: {arg[:4].hex()}, error: {error}')
+    state.on_exception(arg, { 'name': error.__class__.__name__, 'message': str(error), 'stacktrace': '' })
+
 def fuzz_arg(state: State, arg: bytes, depth: int = 0):
     '''
     fuzz with input
@@ -136,18 +155,74 @@ def fuzz_arg(state: State, arg: bytes, depth: int = 0):
     - depth: depth (or generation)
     '''
     try:
-        cov: CoverageResult = collect(state.entry_module, state.ctx_fname, arg, timeout=EXEC_TIMEOUT)
+        cov: CoverageResult = state.executor.collect(arg, timeout=EXEC_TIMEOUT / 1000)
 
         if cov.exception:
             state.on_exception(cov.args, cov.exception)
         
     except TimeoutError:
         return None
+    except ChildProcessError as ex:
+        report_crash(state, arg, ex)
+        return None
     
     cov.depth = depth + 1
     save_if_interesting(state, cov)
     return cov
 
+def fuzz_batched(state: State, inputs: Iterable[bytes], depth: int = 0) -> Iterator[CoverageResult]:
+    '''
+    fuzz with a stream of inputs, at most `EXEC_BATCH_SIZE` inputs per executor request. 
+    equivalent to calling `fuzz_arg` on each input in order.
+
+    inputs are drawn `EXEC_BATCH_SIZE` per executor worker at a time, and split into one batch
+    per worker, so that a stage of a single entry keeps all workers busy. results are processed
+    in order.
+
+    inputs are drawn lazily, so a generator which mutates a shared buffer must yield a copy.
+
+    Arguments:
+    ---
+    - state: afl state
+    - inputs: inputs
+    - depth: depth (or generation)
+
+    Returns:
+    ---
+    - coverage result of each input. `None` if the input timed out or killed the target, after
+      which the stream ends.
+    '''
+    inputs = iter(inputs)
+    n_workers = state.executor.n_workers
+    timeout = EXEC_TIMEOUT / 1000
+
+    while window := [*islice(inputs, EXEC_BATCH_SIZE * n_workers)]:
+        size = -(-len(window) // n_workers)
+        batches = [window[i:i + size] for i in range(0, len(window), size)]
+
+        if len(batches) > 1 and state.batch_pool:
+            outcomes = state.batch_pool.imap(lambda batch: state.executor.collect_batch(batch, timeout=timeout), batches)
+        else:
+            outcomes = (state.executor.collect_batch(batch, timeout=timeout) for batch in batches)
+
+        for batch, (results, error) in zip(batches, outcomes):
+            for cov in results:
+                if cov.exception:
+                    state.on_exception(cov.args, cov.exception)
+
+                cov.depth = depth + 1
+                save_if_interesting(state, cov)
+
+                yield cov
+
+            if isinstance(error, ChildProcessError):
+                report_crash(state, batch[len(results)], error)
+
+            # results of later batches in flight are dropped
+            if error:
+                yield None
+                return
+
 def next_p2(val: int):
     ret: int = 1
 
@@ -176,14 +251,20 @@ def trim_case(state: State, path: CoverageResult):
 
             out_buf = path.args[:remove_pos] + path.args[(remove_pos + trim_avail):]
 
-            result: CoverageResult = collect(state.entry_module, state.ctx_fname, out_buf)
-            if not result: return False
+            try:
+                result: CoverageResult = state.executor.collect(out_buf, timeout=EXEC_TIMEOUT / 1000)
+            except TimeoutError:
+                return False
+            except ChildProcessError as ex:
+                report_crash(state, out_buf, ex)
+                return False
 
             # If the deletion had no impact on the trace, make it permanent. This
             # isn't perfect for variable-path inputs, but we're just making a
             # best-effort pass, so it's not a big deal if we end up with false
             # negatives every now and then.
             if result.cov_cksum == path.cov_cksum:
+                # same trace. the edge list is only kept for top rated entries
                 path.cov = result.cov
                 path.bitmap_size = result.bitmap_size
                 path.elapsed = result.elapsed
@@ -199,6 +280,9 @@ def trim_case(state: State, path: CoverageResult):
         remove_len >>= 1
 
         if trimmed: 
-            update_bitmap_score(state, path)
+            with state.lock:
+                update_bitmap_score(state, path)
+
+            release_cov(state, path)
 
         return trimmed
\ No newline at end of file
@@ -0,0 +1,58 @@
+'''
+unit test for exec.py
+'''
+
+import unittest
+
+from afl_fuzz.afl.test_util import StateTestCase
+from afl_fuzz.afl.exec import fuzz_arg, fuzz_batched, trim_case
+
+TARGET = '''
+import os
+
+def main(args: bytes):
+    if args[-1:] == b'\\x80':
+        os._exit(3)
+'''
+
+class exec_test(StateTestCase):
+    '''
+    unit test for inputs which kill the target
+    '''
+
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        self.crashes: list[tuple[bytes, dict[str, str]]] = []
+
+        self.state = self.create_state(64, exec_mode='spawn', on_exception=lambda args, ex: self.crashes.append((args, ex)))
+        self.state.use_ctx()
+
+    def tearDown(self):
+        self.state.rm_ctx()
+        super().tearDown()
+
+    def test_fuzz_batched(self):
+        results = [*fuzz_batched(self.state, [b'a\x00', b'a\x80', b'a\x01'])]
+
+        # the stage ends on the crash, and the input is reported
+        self.assertEqual(len(results), 2)
+        self.assertIsNone(results[1])
+        self.assertEqual([args for args, _ in self.crashes], [b'a\x80'])
+        self.assertEqual(self.crashes[0][1]['name'], 'ChildProcessError')
+
+    def test_fuzz_arg(self):
+        self.assertIsNone(fuzz_arg(self.state, b'a\x80'))
+        self.assertEqual([args for args, _ in self.crashes], [b'a\x80'])
+
+    def test_trim_case(self):
+        path = fuzz_arg(self.state, b'aaa\x80aaaa')
+
+        # removing the last chunk leaves 0x80 last
+        self.assertFalse(trim_case(self.state, path))
+        self.assertEqual([args for args, _ in self.crashes], [b'aaa\x80'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
-from afl_fuzz.afl.exec import fuzz_arg, calibrate, trim_case
-from afl_fuzz.afl.score import calculate_score
+from afl_fuzz.afl.exec import fuzz_arg, fuzz_batched, calibrate, trim_case
+from afl_fuzz.afl.score import calculate_score, release_cov
 
 from afl_fuzz.afl.mutation import (
     generate_bitflips, 
@@ -12,15 +12,11 @@ from afl_fuzz.afl.mutation import (
 )
 
 from afl_fuzz.afl.config import (
-    SKIP_FUZZ_PROB, 
-    SKIP_NFAV_NEW_PROB, 
-    SKIP_NFAV_OLD_PROB, 
     SPLICE_CYCLES, 
     HAVOC_CYCLES_INIT, 
     HAVOC_CYCLES, 
     SPLICE_HAVOC, 
     HAVOC_MIN,
-    SKIP_DETERMINISTIC,
     EFF_MIN_LEN, EFF_MAX_PERC
 )
 
@@ -39,11 +35,11 @@ def fuzz_one(state: State, path: CoverageResult):
     - path: coverage result
     '''
     def done():
-        path.fuzzed = True
-
-        if path.favored:
+        if path.favored and not path.fuzzed:
             state.pending_favored -= 1
 
+        path.fuzzed = True
+
         state.op_logger.write('fuzz_one completed')
 
         return True
@@ -52,26 +48,12 @@ def fuzz_one(state: State, path: CoverageResult):
         state.op_logger.write('fuzz_one skipped')
         return False
     
-    if state.pending_favored > 0:
-        # If we have any favored, non-fuzzed new arrivals in the queue,
-        # possibly skip to them at the expense of already-fuzzed or non-favored
-        # cases.
-        if (path.fuzzed or not path.favored) and random.random() < SKIP_FUZZ_PROB:
-            return skip()
-    elif not path.favored and state.n_entries > 10:
-        # Otherwise, still possibly skip non-favored cases, albeit less often.
-        # The odds of skipping stuff are higher for already-fuzzed inputs and
-        # lower for never-fuzzed entries.
-        if state.queue_cycle > 1 and not path.fuzzed:
-            if random.random() < SKIP_NFAV_NEW_PROB:
-                return skip()
-        else:
-            if random.random() < SKIP_NFAV_OLD_PROB:
-                return skip()
+    if state.scheduler.skip(path):
+        return skip()
     
     if not path.calibrated:
         cal_result = bool(calibrate(state, path))
-        path.cov = None
+        release_cov(state, path)
 
         if not cal_result:
             return skip()
@@ -92,13 +74,13 @@ def fuzz_one(state: State, path: CoverageResult):
 
     state.op_logger.write('fuzz_one: begin fuzz')
     
-    if not path.fuzzed and not SKIP_DETERMINISTIC:
+    if not path.fuzzed and not state.skip_deterministic:
         state.op_logger.write('fuzz_one: begin deterministic fuzz')
 
         #region bitflip
         #region bitflip 1/1
-        for _ in generate_bitflips(out_buf, 1):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_bitflips(out_buf, 1)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -109,8 +91,8 @@ def fuzz_one(state: State, path: CoverageResult):
         #endregion
         
         #region bitflip 2/1
-        for _ in generate_bitflips(out_buf, 2):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_bitflips(out_buf, 2)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1   
@@ -119,8 +101,8 @@ def fuzz_one(state: State, path: CoverageResult):
         #endregion
 
         #region bitflip 4/1
-        for _ in generate_bitflips(out_buf, 4):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_bitflips(out_buf, 4)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -137,9 +119,8 @@ def fuzz_one(state: State, path: CoverageResult):
         should_skip32 = lambda i: should_skip16(i) and should_skip16(i + 2)
        
         #region bitflip 8/8
-        for i, _ in generate_byteflips(out_buf, 1):
-            res = fuzz_arg(state, bytes(out_buf), path.depth)
-
+        # no skipping in this stage, so the i-th result is the flip at offset i
+        for i, res in enumerate(fuzz_batched(state, (bytes(out_buf) for _ in generate_byteflips(out_buf, 1)), path.depth)):
             if not res:
                 return done()
             else:
@@ -164,8 +145,8 @@ def fuzz_one(state: State, path: CoverageResult):
 
         #region bitflip 16/8
 
-        for _ in generate_byteflips(out_buf, 2, should_skip=should_skip16):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_byteflips(out_buf, 2, should_skip=should_skip16)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -175,8 +156,8 @@ def fuzz_one(state: State, path: CoverageResult):
 
         #region bitflip 32/8
 
-        for _ in generate_byteflips(out_buf, 4, should_skip=should_skip32):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_byteflips(out_buf, 4, should_skip=should_skip32)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -187,8 +168,8 @@ def fuzz_one(state: State, path: CoverageResult):
 
         #region arith
         #region arith 8/8
-        for _ in generate_arith8(out_buf, should_skip=should_skip8):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_arith8(out_buf, should_skip=should_skip8)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -197,8 +178,8 @@ def fuzz_one(state: State, path: CoverageResult):
         #endregion
 
         #region arith 16/8
-        for _ in generate_arith16(out_buf, should_skip=should_skip16):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_arith16(out_buf, should_skip=should_skip16)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -207,8 +188,8 @@ def fuzz_one(state: State, path: CoverageResult):
         #endregion
 
         #region arith 32/8
-        for _ in generate_arith32(out_buf, should_skip=should_skip32):
-            if not fuzz_arg(state, bytes(out_buf), path.depth):
+        for res in fuzz_batched(state, (bytes(out_buf) for _ in generate_arith32(out_buf, should_skip=should_skip32)), path.depth):
+            if not res:
                 return done()
             else:
                 path_queued += 1
@@ -235,7 +216,7 @@ def fuzz_one(state: State, path: CoverageResult):
         else:
             stage_max = SPLICE_HAVOC * perf_score // state.havoc_diff // 100
 
-        stage_max = max(stage_max, HAVOC_MIN)
+        stage_max = max(int(stage_max), HAVOC_MIN)
 
         for _ in range(stage_max):
             havoc(out_buf)
@@ -0,0 +1,225 @@
+'''
+long-lived fuzzing threads with work stealing
+'''
+from collections import deque
+from threading import Thread, Lock, Condition
+from typing import Callable
+import random
+import time
+
+from afl_fuzz.coverage_collector.result import CoverageResult
+
+# max. seconds a thread without work waits before looking again
+IDLE_WAIT: float = 0.05
+
+class PoolStats:
+    '''
+    statistics of a fuzzing thread
+    '''
+    def __init__(self):
+        self.n_entries: int = 0
+
+        # no. of entries taken from other threads
+        self.n_steals: int = 0
+
+        # seconds spent fuzzing entries
+        self.busy: float = 0
+
+        # seconds spent without work, including ending cycles
+        self.idle: float = 0
+
+    @property
+    def utilization(self) -> float:
+        total = self.busy + self.idle
+        return self.busy / total if total > 0 else 0
+
+    def __repr__(self) -> str:
+        return f'entries: {self.n_entries}, steals: {self.n_steals}, utilization: {self.utilization:.1%}'
+
+class FuzzPool:
+    '''
+    `n_workers` threads, each with a deque of entries. a thread takes entries from the front of its
+    deque, and steals from the back of the others once it runs out.
+
+    there is no barrier between cycles: the first thread which finds all deques empty ends the
+    cycle and refills them through `next_cycle`, while the others finish the entries they hold.
+    '''
+
+    def __init__(
+        self,
+        n_workers: int,
+        fuzz: Callable[[CoverageResult], None],
+        next_cycle: Callable[[], list[CoverageResult]]
+    ):
+        '''
+        Arguments:
+        ---
+        - n_workers: no. of threads. 1 to fuzz in the calling thread
+        - fuzz: called on each entry
+        - next_cycle: returns the entries of the next cycle, `[]` if there is nothing to fuzz
+          until an entry in flight is done, or `None` to stop
+        '''
+        self.n_workers: int = n_workers
+
+        self._fuzz = fuzz
+        self._next_cycle = next_cycle
+
+        self._deques: list[deque[CoverageResult]] = [deque() for _ in range(n_workers)]
+        self._stats: list[PoolStats] = [PoolStats() for _ in range(n_workers)]
+
+        # ids of entries being fuzzed
+        self._in_flight: set[int] = set()
+        self._lock = Lock()
+
+        # held while refilling
+        self._refill_lock = Lock()
+
+        # notified when there may be new work
+        self._changed = Condition()
+
+        self._stopped: bool = False
+        self._error: BaseException = None
+
+    def stats(self) -> list[PoolStats]:
+        '''
+        statistics of each thread
+        '''
+        return self._stats
+
+    def in_flight(self, entry: CoverageResult) -> bool:
+        '''
+        whether a thread is fuzzing an entry
+        '''
+        with self._lock:
+            return id(entry) in self._in_flight
+
+    def run(self):
+        '''
+        fuzz until `next_cycle` returns `None` or `stop` is called. raises the first exception
+        raised in a thread.
+        '''
+        if self.n_workers == 1:
+            self._work(0)
+        else:
+            threads = [Thread(target=self._work, args=(i,), daemon=True) for i in range(self.n_workers)]
+
+            for t in threads:
+                t.start()
+
+            for t in threads:
+                t.join()
+
+        if self._error:
+            raise self._error
+
+    def stop(self):
+        '''
+        stop after the entries in flight
+        '''
+        self._stopped = True
+        self._notify()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _take(self, i: int) -> CoverageResult:
+        '''
+        take an entry from the front of deque `i`, or steal one from the back of another deque
+        '''
+        try:
+            return self._deques[i].popleft()
+        except IndexError:
+            pass
+
+        offset = random.randrange(self.n_workers)
+
+        for k in range(self.n_workers):
+            j = (offset + k) % self.n_workers
+
+            if j == i:
+                continue
+
+            try:
+                el = self._deques[j].pop()
+            except IndexError:
+                continue
+
+            self._stats[i].n_steals += 1
+
+            return el
+
+        return None
+
+    def _refill(self) -> bool:
+        '''
+        end the cycle and refill the deques, unless another thread is at it
+
+        Returns:
+        ---
+        - whether there is work in the deques
+        '''
+        if not self._refill_lock.acquire(blocking=False):
+            return False
+
+        try:
+            if any(self._deques):
+                return True
+
+            entries = self._next_cycle()
+
+            if entries is None:
+                self._stopped = True
+            elif not entries:
+                with self._lock:
+                    # nothing in flight could produce work
+                    self._stopped = not self._in_flight
+
+            for k, el in enumerate(entries or ()):
+                self._deques[k % self.n_workers].append(el)
+
+            return bool(entries)
+        finally:
+            self._refill_lock.release()
+            self._notify()
+
+    def _work(self, i: int):
+        stats = self._stats[i]
+
+        try:
+            while not self._stopped:
+                entry = self._take(i)
+
+                if entry is None:
+                    start = time.time()
+
+                    if not self._refill() and not self._stopped:
+                        with self._changed:
+                            self._changed.wait(IDLE_WAIT)
+
+                    stats.idle += time.time() - start
+                    continue
+
+                with self._lock:
+                    # an entry may be picked more than once in a cycle. drop the pick if
+                    # another thread is fuzzing it
+                    if id(entry) in self._in_flight:
+                        continue
+
+                    self._in_flight.add(id(entry))
+
+                start = time.time()
+
+                try:
+                    self._fuzz(entry)
+                finally:
+                    with self._lock:
+                        self._in_flight.discard(id(entry))
+
+                stats.busy += time.time() - start
+                stats.n_entries += 1
+
+                self._notify()
+        except BaseException as ex:
+            self._error = self._error or ex
+            self.stop()
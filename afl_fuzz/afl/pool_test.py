@@ -0,0 +1,61 @@
+'''
+unit test for pool.py
+'''
+
+import time
+import unittest
+from threading import Lock
+
+from afl_fuzz.afl.pool import FuzzPool
+
+class pool_test(unittest.TestCase):
+    '''
+    unit test for FuzzPool
+    '''
+
+    def run_cycles(self, n_workers: int, cycles: list[list[int]], fuzz=None) -> tuple[FuzzPool, list[int]]:
+        '''
+        run the pool on the given cycles, in order
+
+        Returns:
+        ---
+        - pool
+        - entries fuzzed
+        '''
+        fuzzed: list[int] = []
+        lock = Lock()
+
+        def fuzz_entry(entry: int):
+            fuzz and fuzz(entry)
+
+            with lock:
+                fuzzed.append(entry)
+
+        cycles = iter(cycles)
+        pool = FuzzPool(n_workers, fuzz_entry, lambda: next(cycles, None))
+        pool.run()
+
+        return pool, fuzzed
+
+    def test_sequential(self):
+        _, fuzzed = self.run_cycles(1, [[1, 2, 3], [4, 5]])
+
+        self.assertEqual(fuzzed, [1, 2, 3, 4, 5])
+
+    def test_steal(self):
+        # thread 0 gets the slow entries, so the others steal its fast ones
+        pool, fuzzed = self.run_cycles(4, [[*range(64)]], lambda i: time.sleep(0.05 if i % 4 == 0 else 0.001))
+
+        self.assertEqual(sorted(fuzzed), [*range(64)])
+        self.assertEqual(sum(s.n_entries for s in pool.stats()), 64)
+        self.assertGreater(sum(s.n_steals for s in pool.stats()), 0)
+
+    def test_error(self):
+        def fuzz(entry: int):
+            raise ValueError(entry)
+
+        with self.assertRaises(ValueError):
+            self.run_cycles(2, [[1, 2]], fuzz)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,61 +1,214 @@
-from collections import deque
-from typing import Iterable
+from typing import Iterable, Iterator
 import random
 
 from afl_fuzz.coverage_collector.result import CoverageResult
 
+# a total weight below this is rounding residue of the tree
+MIN_TOTAL_WEIGHT: float = 1e-9
+
+# descents into empty slots before the tree is rebuilt from the weights
+MAX_SAMPLE_RETRIES: int = 16
+
 class Queue:
     '''
-    double linked list. a deque wrapper.
+    FIFO queue with O(1) uniform sampling, O(log n) weighted sampling and O(1) removal.
+
+    entries are kept in a list of slots. popped and removed entries leave an empty slot, and
+    the list is compacted once it holds more than 2 * len + 64 slots. a Fenwick tree over the slots holds
+    the weight of each entry.
     '''
 
     def __init__(self, items: Iterable[CoverageResult] = None):
-        self._queue: deque[CoverageResult] = deque()
+        self.clear()
 
         for el in items or []:
             self.push(el)
 
     def __len__(self):
-        return len(self._queue)
-    
+        return self._len
+
     def __bool__(self):
-        return bool(self._queue)
-    
-    def __iter__(self):
-        return self._queue.__iter__()
+        return self._len > 0
+
+    def __contains__(self, item: CoverageResult) -> bool:
+        return id(item) in self._pos
+
+    def __iter__(self) -> Iterator[CoverageResult]:
+        # iterate over a copy, so that entries can be removed meanwhile
+        return (el for el in self._slots[self._head:] if el is not None)
+
+    def _prefix(self, n: int) -> float:
+        '''
+        total weight of the first `n` slots
+        '''
+        total = 0.0
+
+        while n > 0:
+            total += self._tree[n]
+            n &= n - 1
+
+        return total
+
+    def _add(self, slot: int, delta: float):
+        '''
+        add `delta` to the weight of a slot
+        '''
+        i = slot + 1
+
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _compact(self):
+        '''
+        drop empty slots, and rebuild the tree in O(n)
+        '''
+        live = [slot for slot in range(self._head, len(self._slots)) if self._slots[slot] is not None]
+
+        self._slots = [self._slots[slot] for slot in live]
+        self._weights = [self._weights[slot] for slot in live]
+        self._pos = { id(el): slot for slot, el in enumerate(self._slots) }
+        self._head = 0
+
+        self._tree = [0.0] + self._weights
+
+        for i in range(1, len(self._tree)):
+            parent = i + (i & -i)
+
+            if parent < len(self._tree):
+                self._tree[parent] += self._tree[i]
+
+    def _take(self, slot: int) -> CoverageResult:
+        '''
+        empty a slot
+        '''
+        el = self._slots[slot]
+
+        self._add(slot, -self._weights[slot])
+        self._slots[slot] = None
+        self._weights[slot] = 0.0
+        del self._pos[id(el)]
+        self._len -= 1
+
+        if len(self._slots) > 2 * self._len + 64:
+            self._compact()
+
+        return el
 
     def pop(self):
         '''
         pop item from queue
         '''
-        out: CoverageResult = None
+        while self._head < len(self._slots):
+            slot = self._head
+            self._head += 1
+
+            if self._slots[slot] is not None:
+                return self._take(slot)
 
-        if self._queue:
-            out = self._queue.popleft()
+        return None
 
-        return out
-    
-    def push(self, item: CoverageResult):
+    def push(self, item: CoverageResult, weight: float = 1.0):
         '''
         push item into queue
+
+        Arguments:
+        ---
+        - item: entry. must not be in the queue already
+        - weight: weight for `weighted_sample`
+        '''
+        slot = len(self._slots)
+
+        self._slots.append(item)
+        self._weights.append(weight)
+        self._pos[id(item)] = slot
+        self._len += 1
+
+        # the new node sums the weights of slots (i - lowbit(i), i]
+        i = slot + 1
+        self._tree.append(weight + self._prefix(slot) - self._prefix(i - (i & -i)))
+
+    def extend(self, items: Iterable[CoverageResult]):
+        '''
+        push items into queue, with weight 1
         '''
-        self._queue.append(item)
+        for el in items:
+            self.push(el)
+
+    def remove(self, item: CoverageResult):
+        '''
+        remove item from queue
+        '''
+        self._take(self._pos[id(item)])
+
+    def set_weight(self, item: CoverageResult, weight: float):
+        '''
+        set the weight of an item for `weighted_sample`
+        '''
+        slot = self._pos[id(item)]
+
+        self._add(slot, weight - self._weights[slot])
+        self._weights[slot] = weight
 
     def clear(self):
-        self._queue.clear()
+        self._slots: list[CoverageResult] = []
+        self._weights: list[float] = []
+
+        # fenwick tree, 1-based
+        self._tree: list[float] = [0.0]
+
+        # id of item -> slot
+        self._pos: dict[int, int] = dict()
+
+        # no slot before this holds an item
+        self._head: int = 0
+        self._len: int = 0
 
     def sample(self):
         '''
         sample queue entries with uniform distribution
         '''
         if not self: return None
-        
-        pos = random.randrange(len(self))
-        idx = 0
 
-        for el in self:
-            if idx == pos:
+        # compaction keeps at most 2 * len + 64 slots, so this takes 2 + 64 / len draws on average
+        while True:
+            el = self._slots[random.randrange(self._head, len(self._slots))]
+
+            if el is not None:
                 return el
 
-            idx += 1
-    
+    def weighted_sample(self):
+        '''
+        sample queue entries with probability proportional to their weight
+        '''
+        if not self: return None
+
+        for _ in range(2):
+            n = len(self._slots)
+            total = self._prefix(n)
+
+            # updates leave rounding residue in the tree when all weights drop to zero
+            if total < MIN_TOTAL_WEIGHT:
+                return self.sample()
+
+            for _ in range(MAX_SAMPLE_RETRIES):
+                # descend the tree to the first slot whose prefix sum exceeds r
+                r = random.random() * total
+                slot = 0
+                step = 1 << (n.bit_length() - 1)
+
+                while step:
+                    if slot + step <= n and self._tree[slot + step] <= r:
+                        slot += step
+                        r -= self._tree[slot]
+
+                    step >>= 1
+
+                # an empty slot can only be hit through rounding
+                if slot < n and self._slots[slot] is not None:
+                    return self._slots[slot]
+
+            # the tree drifted from the weights. rebuilding sums the live weights only
+            self._compact()
+
+        return self.sample()
@@ -31,5 +31,58 @@ class queue_test(unittest.TestCase):
         for _ in range(10):
             self.assertIsNotNone(q.sample())
 
+    def test_remove(self):
+        q = Queue(range(200))
+
+        for i in range(0, 200, 2):
+            q.remove(i)
+
+        self.assertEqual(len(q), 100)
+        self.assertEqual(list(q), list(range(1, 200, 2)))
+        self.assertEqual(q.pop(), 1)
+
+        for _ in range(100):
+            self.assertEqual(q.sample() % 2, 1)
+
+    def test_weighted_sample(self):
+        q = Queue()
+
+        for i in range(100):
+            q.push(i, weight=0.0)
+
+        q.set_weight(42, 1.0)
+        q.set_weight(7, 3.0)
+
+        counts = { 7: 0, 42: 0 }
+
+        for _ in range(400):
+            counts[q.weighted_sample()] += 1
+
+        self.assertGreater(counts[7], counts[42])
+
+        q.remove(7)
+        self.assertEqual(q.weighted_sample(), 42)
+
+    def test_weighted_sample_zero(self):
+        q = Queue()
+
+        for i, weight in enumerate([0.1, 0.2, 0.7, 0.3, 0.0]):
+            q.push(i, weight=weight)
+
+        # leaves rounding residue in the tree, while every weight is zero
+        for i in range(4):
+            q.set_weight(i, 0.0)
+
+        for i in range(4):
+            q.remove(i)
+
+        self.assertEqual(q.weighted_sample(), 4)
+
+        # drift above the threshold, on an empty slot
+        q._add(0, 1.0)
+
+        self.assertEqual(q.weighted_sample(), 4)
+        self.assertLess(q._prefix(len(q._slots)), 1.0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,193 @@
+'''
+seed schedulers. a scheduler picks the next queue entry to fuzz.
+
+- 'fifo' goes through the queue in order, and skips non-favored entries with the
+  probabilities in config, like AFL
+- power schedules (AFLFast) pick as many entries as there are in the queue, at random with
+  replacement, with probability proportional to their energy. an entry whose path is exercised
+  by fewer executions gets more energy:
+    - 'explore': every entry gets the same energy
+    - 'fast': energy is 2^s / f, where s is no. of times the entry was picked, and f is no. of
+      executions which took its path
+    - 'coe': energy is 2^s, or 0 if f is above the mean over the queue and the entry is not
+      favored
+'''
+from abc import ABC
+from array import array
+from typing import TYPE_CHECKING
+import random
+
+from afl_fuzz.afl.config import (
+    SKIP_FUZZ_PROB,
+    SKIP_NFAV_NEW_PROB,
+    SKIP_NFAV_OLD_PROB,
+    MAX_FACTOR,
+    N_FUZZ_SIZE
+)
+from afl_fuzz.coverage_collector.result import CoverageResult
+
+if TYPE_CHECKING:
+    from afl_fuzz.afl.state import State
+
+SCHEDULES: list[str] = ['fifo', 'explore', 'fast', 'coe']
+
+class IScheduler(ABC):
+    '''
+    scheduler interface
+    '''
+
+    def __init__(self, state: 'State'):
+        self.state = state
+
+    def next_cycle(self) -> list[CoverageResult]:
+        '''
+        pick the entries to fuzz in the next cycle. called after `cull_queue`.
+
+        Returns:
+        ---
+        - entries, in order
+        '''
+        raise NotImplementedError()
+
+    def done(self, entry: CoverageResult):
+        '''
+        called after `fuzz_one` on an entry returned by `next_cycle`
+        '''
+        raise NotImplementedError()
+
+    def skip(self, entry: CoverageResult) -> bool:
+        '''
+        whether `fuzz_one` should skip an entry
+        '''
+        return False
+
+    def energy(self, entry: CoverageResult) -> float:
+        '''
+        weight of an entry in the queue
+        '''
+        return 1.0
+
+    def on_exec(self, cov: CoverageResult):
+        '''
+        called on every execution result. `state.lock` is held.
+        '''
+        pass
+
+class FifoScheduler(IScheduler):
+    '''
+    fuzz entries in queue order, and move them to `fuzzed_queue` once done
+    '''
+
+    def next_cycle(self) -> list[CoverageResult]:
+        with self.state.lock:
+            return [*self.state.queue]
+
+    def done(self, entry: CoverageResult):
+        with self.state.lock:
+            # `cull_queue` may have dropped it meanwhile
+            if entry in self.state.queue:
+                self.state.queue.remove(entry)
+                self.state.fuzzed_queue.push(entry)
+
+    def skip(self, entry: CoverageResult) -> bool:
+        state = self.state
+
+        if state.pending_favored > 0:
+            # If we have any favored, non-fuzzed new arrivals in the queue,
+            # possibly skip to them at the expense of already-fuzzed or non-favored
+            # cases.
+            return (entry.fuzzed or not entry.favored) and random.random() < SKIP_FUZZ_PROB
+        elif not entry.favored and state.n_entries > 10:
+            # Otherwise, still possibly skip non-favored cases, albeit less often.
+            # The odds of skipping stuff are higher for already-fuzzed inputs and
+            # lower for never-fuzzed entries.
+            if state.queue_cycle > 1 and not entry.fuzzed:
+                return random.random() < SKIP_NFAV_NEW_PROB
+            else:
+                return random.random() < SKIP_NFAV_OLD_PROB
+
+        return False
+
+class PowerScheduler(IScheduler):
+    '''
+    AFLFast power schedules. entries stay in the queue, weighted by their energy.
+    '''
+
+    def __init__(self, state: 'State', schedule: str):
+        '''
+        Arguments:
+        ---
+        - state: afl state
+        - schedule: 'explore', 'fast' or 'coe'
+        '''
+        super().__init__(state)
+
+        self.schedule: str = schedule
+
+        # path checksum -> no. of executions which took the path
+        self.n_fuzz = array('I', bytes(4 * N_FUZZ_SIZE))
+
+        # mean path frequency over the queue, for 'coe'
+        self.mean_freq: float = 0.0
+
+    def freq(self, entry: CoverageResult) -> int:
+        '''
+        no. of executions which took the path of an entry
+        '''
+        return self.n_fuzz[entry.cov_cksum % N_FUZZ_SIZE] if entry.cov_cksum is not None else 0
+
+    def energy(self, entry: CoverageResult) -> float:
+        if self.schedule == 'explore':
+            return 1.0
+
+        f = max(self.freq(entry), 1)
+        factor = float(1 << min(entry.fuzz_level, 16))
+
+        if self.schedule == 'coe':
+            if f > self.mean_freq and not entry.favored:
+                return 0.0
+        else:
+            factor /= f
+
+        return min(factor, MAX_FACTOR)
+
+    def on_exec(self, cov: CoverageResult):
+        i = cov.cov_cksum % N_FUZZ_SIZE
+
+        # saturate
+        if self.n_fuzz[i] < 0xffffffff:
+            self.n_fuzz[i] += 1
+
+    def next_cycle(self) -> list[CoverageResult]:
+        with self.state.lock:
+            queue = self.state.queue
+
+            if not queue:
+                return []
+
+            self.mean_freq = sum(self.freq(el) for el in queue) / len(queue)
+
+            for el in queue:
+                queue.set_weight(el, self.energy(el))
+
+            return [queue.weighted_sample() for _ in range(len(queue))]
+
+    def done(self, entry: CoverageResult):
+        with self.state.lock:
+            entry.fuzz_level += 1
+
+def create_scheduler(schedule: str, state: 'State') -> IScheduler:
+    '''
+    create a scheduler
+
+    Arguments:
+    ---
+    - schedule: one of `SCHEDULES`
+    - state: afl state
+    '''
+    if schedule == 'fifo':
+        return FifoScheduler(state)
+    elif schedule in SCHEDULES:
+        return PowerScheduler(state, schedule)
+    else:
+        raise ValueError(f'unknown schedule {schedule}. expected one of {SCHEDULES}')
@@ -0,0 +1,79 @@
+'''
+unit test for schedule.py
+'''
+
+import unittest
+from array import array
+
+from afl_fuzz.afl.state import State
+from afl_fuzz.afl.test_util import StateTestCase
+from afl_fuzz.afl.config import MAX_FACTOR
+from afl_fuzz.coverage_collector.result import CoverageResult, EDGE_SHIFT
+
+class schedule_test(StateTestCase):
+    '''
+    unit test for schedulers
+    '''
+
+    def entry(self, state: State, bucket: int, n_execs: int) -> CoverageResult:
+        '''
+        push an entry whose path was taken by `n_execs` executions
+        '''
+        cov = CoverageResult(b'x', array('I', [(bucket << EDGE_SHIFT) | 1]))
+
+        for _ in range(n_execs):
+            state.scheduler.on_exec(cov)
+
+        state.queue.push(cov)
+
+        return cov
+
+    def test_fifo(self):
+        state = self.create_state(schedule='fifo')
+        a = self.entry(state, 0, 1)
+        b = self.entry(state, 1, 1)
+
+        self.assertEqual(state.scheduler.next_cycle(), [a, b])
+
+        state.scheduler.done(a)
+        self.assertEqual([*state.queue], [b])
+        self.assertEqual([*state.fuzzed_queue], [a])
+
+    def test_fast(self):
+        state = self.create_state(schedule='fast')
+        common = self.entry(state, 0, 100)
+        rare = self.entry(state, 1, 2)
+
+        self.assertEqual(state.scheduler.energy(common), 1 / 100)
+        self.assertEqual(state.scheduler.energy(rare), 1 / 2)
+
+        rare.fuzz_level = 10
+        self.assertEqual(state.scheduler.energy(rare), MAX_FACTOR)
+
+    def test_coe(self):
+        state = self.create_state(schedule='coe')
+        common = self.entry(state, 0, 100)
+        rare = self.entry(state, 1, 2)
+
+        state.scheduler.next_cycle()
+
+        self.assertEqual(state.scheduler.energy(common), 0)
+        self.assertEqual(state.scheduler.energy(rare), 1)
+
+        common.favored = True
+        self.assertEqual(state.scheduler.energy(common), 1)
+
+    def test_next_cycle(self):
+        state = self.create_state(schedule='coe')
+        a = self.entry(state, 0, 100)
+        b = self.entry(state, 1, 2)
+
+        # `a` is cut off, so `b` is picked for the whole cycle
+        self.assertEqual(state.scheduler.next_cycle(), [b, b])
+
+        state.scheduler.done(b)
+        self.assertEqual(b.fuzz_level, 1)
+        self.assertEqual(len(state.queue), 2)
+
+if __name__ == '__main__':
+    unittest.main()
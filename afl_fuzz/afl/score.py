@@ -1,7 +1,6 @@
 from afl_fuzz.afl.state import State
 from afl_fuzz.afl.config import HAVOC_MAX_MULT, PREFER_QUEUE_CAPACITY
-from afl_fuzz.afl.queue import Queue
-from afl_fuzz.coverage_collector.result import CoverageResult
+from afl_fuzz.coverage_collector.result import CoverageResult, EDGE_SHIFT
 
 import random
 
@@ -90,27 +89,42 @@ def update_bitmap_score(state: State, cov: CoverageResult):
     '''
     factor = cov.elapsed * len(cov.args)
 
-    for i in range(state.n_buckets):
-        if not cov.cov[i]: continue
-
-        tr = state.top_rated[i]
+    for edge in cov.cov:
+        i = edge >> EDGE_SHIFT
+        tr = state.top_rated.get(i)
 
         if tr and factor > tr.elapsed * len(tr.args):
             continue
 
         state.top_rated[i] = cov
+        state.dirty_buckets.add(i)
         cov.cov_ref += 1
         state.score_changed = True
         
         if tr:
             tr.cov_ref -= 1
-        
-            if tr.cov_ref <= 0:
+
+            # `cull_queue` needs the edge list of a favored entry, and releases it
+            if tr.cov_ref <= 0 and not tr.favored:
                 tr.cov = None
 
     state.op_logger.write('update_bitmap_score completed')
 
 
+def release_cov(state: State, cov: CoverageResult):
+    '''
+    drop the edge list of a calibrated entry, unless it is top rated. `cull_queue` needs the
+    edge lists of top rated entries.
+
+    Arguments:
+    ---
+    - state: afl state
+    - cov: coverage result
+    '''
+    with state.lock:
+        if cov.cov_ref <= 0:
+            cov.cov = None
+
 def cull_queue(state: State):
     '''
     cull queue.
@@ -121,43 +135,68 @@ def cull_queue(state: State):
     '''
     with state.lock:
         # join queue
-        state.queue._queue.extend(state.fuzzed_queue)
+        state.queue.extend(state.fuzzed_queue)
         state.fuzzed_queue.clear()
 
         if not state.score_changed: return
 
         state.score_changed = False
-        state.pending_favored = 0
 
-        covered = [False] * state.n_buckets
+        if state.dirty_buckets:
+            # greedy set cover, like AFL: in order of buckets, favor the top rated entry of a
+            # bucket which no favored entry covers yet, then mark all its buckets covered. picks
+            # before the first bucket whose top rated entry changed stay the same, so only the
+            # picks from there on are made again
+            start = min(state.dirty_buckets)
+            state.dirty_buckets.clear()
+
+            dropped = [el for i, el in state.favored_at.items() if i >= start]
+            favored_at = { i: el for i, el in state.favored_at.items() if i < start }
+            cover = { j: i for j, i in state.favored_cover.items() if i < start }
+
+            for i in sorted(j for j in state.top_rated if j >= start):
+                if i in cover:
+                    continue
+
+                tr = state.top_rated[i]
+                favored_at[i] = tr
+
+                for edge in tr.cov or ():
+                    cover.setdefault(edge >> EDGE_SHIFT, i)
+
+                cover[i] = i
 
-        for el in state.queue:
-            el.favored = False
+                if not tr.favored:
+                    tr.favored = True
 
-        for i in range(state.n_buckets):
-            if not state.top_rated[i] or covered[i]:
-                continue
-                
-            for j in range(state.n_buckets):
-                covered[i] |= bool(state.top_rated[j])
+                    if not tr.fuzzed:
+                        state.pending_favored += 1
 
-            if not state.top_rated[i].favored:
-                state.pending_favored += 1
+            state.favored_at = favored_at
+            state.favored_cover = cover
+            picked = set(map(id, favored_at.values()))
 
-            state.top_rated[i].favored = True
+            for el in dropped:
+                if id(el) in picked:
+                    continue
+
+                if not el.fuzzed:
+                    state.pending_favored -= 1
+
+                el.favored = False
+
+                # no longer top rated for any bucket
+                if el.cov_ref <= 0:
+                    el.cov = None
 
         # drop unfavored items from queue probalistically
         if len(state.queue) > PREFER_QUEUE_CAPACITY and PREFER_QUEUE_CAPACITY > state.pending_favored:
             # expected no. of items after drop = PREFER_QUEUE_CAPACITY
             keep_prob = (PREFER_QUEUE_CAPACITY - state.pending_favored) / len(state.queue)
 
-            new_queue = Queue()
-
             for el in state.queue:
-                if el.favored or random.random() < keep_prob:
-                    new_queue.push(el)
-
-            state.queue = new_queue
+                if not el.favored and random.random() >= keep_prob:
+                    state.queue.remove(el)
 
         state.n_entries = len(state.queue)
 
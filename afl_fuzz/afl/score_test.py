@@ -0,0 +1,127 @@
+'''
+unit test for score.py
+'''
+
+import random
+import unittest
+from array import array
+
+from afl_fuzz.afl.test_util import StateTestCase
+from afl_fuzz.afl.score import update_bitmap_score, cull_queue
+from afl_fuzz.coverage_collector.result import CoverageResult, EDGE_SHIFT
+
+class cull_queue_test(StateTestCase):
+    '''
+    unit test for cull_queue
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.state = self.create_state()
+
+    def push(self, elapsed: int, buckets: list[int]) -> CoverageResult:
+        cov = CoverageResult(b'x', array('I', ((i << EDGE_SHIFT) | 1 for i in buckets)), elapsed)
+
+        self.state.queue.push(cov)
+        update_bitmap_score(self.state, cov)
+
+        return cov
+
+    def greedy(self) -> list[CoverageResult]:
+        '''
+        favored entries of the greedy set cover over all buckets, like AFL
+        '''
+        covered: set[int] = set()
+        favored: list[CoverageResult] = []
+
+        for i in sorted(self.state.top_rated):
+            if i not in covered:
+                tr = self.state.top_rated[i]
+                favored.append(tr)
+                covered.update(edge >> EDGE_SHIFT for edge in tr.cov)
+
+        return favored
+
+    def test_cull(self):
+        a = self.push(10, [0, 1, 2])
+        b = self.push(20, [1, 3])
+        c = self.push(5, [2])
+        d = self.push(30, [0, 2])
+
+        # top rated: 0 -> a, 1 -> a, 2 -> c, 3 -> b. a covers 0, 1 and 2, then b covers 3.
+        cull_queue(self.state)
+
+        self.assertEqual([a.favored, b.favored, c.favored, d.favored], [True, True, False, False])
+        self.assertEqual(self.state.pending_favored, 2)
+
+    def test_incremental(self):
+        a = self.push(10, [0, 1])
+        b = self.push(20, [2])
+
+        cull_queue(self.state)
+        self.assertEqual([a.favored, b.favored], [True, True])
+
+        # c takes all buckets of a, and bucket 2 from b
+        c = self.push(5, [0, 1, 2])
+
+        cull_queue(self.state)
+
+        self.assertEqual([a.favored, b.favored, c.favored], [False, False, True])
+        self.assertEqual(self.state.pending_favored, 1)
+        self.assertEqual(self.state.favored_at, { 0: c })
+        self.assertEqual(self.state.favored_cover, { 0: 0, 1: 0, 2: 0 })
+        self.assertIsNone(a.cov)
+
+    def test_partial_takeover(self):
+        a = self.push(10, [0, 1])
+        b = self.push(20, [1, 2])
+
+        cull_queue(self.state)
+        self.assertEqual([a.favored, b.favored], [True, True])
+
+        # c takes bucket 0 only. a is still top rated for bucket 1, which c does not cover
+        c = self.push(5, [0])
+        cull_queue(self.state)
+
+        self.assertEqual([a.favored, b.favored, c.favored], [True, True, True])
+
+        # d takes buckets 0 and 1, so a is no longer picked
+        d = self.push(1, [0, 1])
+        cull_queue(self.state)
+
+        self.assertEqual([a.favored, b.favored, c.favored, d.favored], [False, True, False, True])
+        self.assertEqual(self.state.pending_favored, 2)
+
+    def test_random(self):
+        rng = random.Random(0)
+
+        for n in range(200):
+            self.push(rng.randint(1, 100), rng.sample(range(16), rng.randint(1, 4)))
+
+            if n % 3 == 0:
+                cull_queue(self.state)
+
+                # same as culling from scratch
+                favored = [el for el in self.state.queue if el.favored]
+                self.assertEqual(sorted(map(id, favored)), sorted(map(id, self.greedy())))
+                self.assertEqual(self.state.pending_favored, len(favored))
+
+    def test_rerated(self):
+        a = self.push(10, [0, 1])
+
+        cull_queue(self.state)
+
+        # a loses its buckets, then takes them back once trimmed
+        c = self.push(5, [0, 1])
+
+        a.elapsed = 1
+        update_bitmap_score(self.state, a)
+
+        cull_queue(self.state)
+
+        self.assertEqual([a.favored, c.favored], [True, False])
+        self.assertEqual(self.state.favored_at, { 0: a })
+        self.assertIsNotNone(a.cov)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,27 @@
 from threading import Lock
+from multiprocessing.pool import ThreadPool
 from uuid import uuid4
 import os
 import random
 from typing import Callable
 
 from afl_fuzz.afl.queue import Queue
-from afl_fuzz.coverage_collector.result import CoverageResult, bitmap_size
+from afl_fuzz.coverage_collector.result import CoverageResult, EDGE_SHIFT, EDGE_MASK, bitmap_size
 from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.executor import IExecutor, create_executor
+from afl_fuzz.afl.config import (
+    TRACE_BUCKETS,
+    EXEC_MODE,
+    TRACE_BACKEND,
+    TRACE_MODE,
+    DEP_ALLOW,
+    DEP_DENY,
+    POWER_SCHEDULE,
+    SKIP_DETERMINISTIC
+)
+from afl_fuzz.afl.schedule import IScheduler, create_scheduler
 from afl_fuzz.logger.base import ILogger, devNullLogger
 
-
 class State:
     '''
     AFL state
@@ -21,8 +33,17 @@ class State:
         ctx_fname: str = None, 
         exception_logger: ILogger = None, 
         op_logger: ILogger = None, 
-        n_buckets: int = 1024,
-        on_exception: Callable[[bytes, dict[str, str]], None] = None
+        n_buckets: int = TRACE_BUCKETS,
+        on_exception: Callable[[bytes, dict[str, str]], None] = None,
+        exec_mode: str = EXEC_MODE,
+        exec_options: dict = None,
+        trace_backend: str = TRACE_BACKEND,
+        trace_mode: str = TRACE_MODE,
+        dep_allow: list[str] = DEP_ALLOW,
+        dep_deny: list[str] = DEP_DENY,
+        schedule: str = POWER_SCHEDULE,
+        skip_deterministic: bool = SKIP_DETERMINISTIC,
+        ctx: Context = None
     ):
         '''
         Arguments:
@@ -31,7 +52,16 @@ class State:
         - ctx_fname: context filename. random generate one if `None`
         - exception_logger: exception logger
         - op_logger: operation logger
-        - n_buckets: no. of trace buckets
+        - n_buckets: no. of trace buckets, a power of two up to `MAX_BUCKETS`. ignored if `ctx` is set
+        - exec_mode: executor used to run the entry point. see `EXECUTORS`
+        - exec_options: options passed to the executor
+        - trace_backend: tracing backend. see `TRACE_BACKENDS`
+        - trace_mode: lines which record an edge. see `TRACE_MODES`
+        - dep_allow: globs on the paths of dependencies to trace. all if empty
+        - dep_deny: globs on the paths of dependencies not to trace
+        - schedule: seed scheduler. see `SCHEDULES`
+        - skip_deterministic: skip deterministic stages
+        - ctx: coverage context, e.g. shared with other instances. created from `entry_point` if `None`
         '''
         self.queue = Queue()
         self.queue_cycle: int = 0
@@ -48,18 +78,36 @@ class State:
         self.exception_logger = exception_logger or devNullLogger
         self.op_logger = op_logger or devNullLogger
         
-        self.n_buckets: int = n_buckets
+        self.n_buckets: int = ctx.n_buckets if ctx else n_buckets
 
         # substring before .py
         self.entry_module: str = entry_point[:entry_point.rindex('.')]
 
-        self.ctx = Context.create(n_buckets, entry_point)
+        self.dep_allow: list[str] = dep_allow
+        self.dep_deny: list[str] = dep_deny
+
+        self.ctx = ctx or Context.create(self.n_buckets, entry_point, trace_backend, trace_mode, dep_allow, dep_deny)
         self.ctx_fname = ctx_fname or f'{uuid4()}.ctx'
 
+        self.exec_mode: str = exec_mode
+        self.exec_options: dict = exec_options or dict()
+        self.executor: IExecutor = None
+
+        # runs batches of one stage on several executor workers at once
+        self.batch_pool: ThreadPool = None
+
         # global coverage bitmap
-        self.covered = bytearray(n_buckets)
+        self.covered = bytearray(self.n_buckets)
+
+        # bucket -> best entry which covers it
+        self.top_rated: dict[int, CoverageResult] = dict()
+        # buckets whose top rated entry changed since the last `cull_queue`
+        self.dirty_buckets: set[int] = set()
+        # bucket -> favored entry picked by the greedy set cover at that bucket
+        self.favored_at: dict[int, CoverageResult] = dict()
+        # bucket -> bucket of the favored entry which covers it, see `favored_at`
+        self.favored_cover: dict[int, int] = dict()
 
-        self.top_rated: list[CoverageResult] = [None] * self.n_buckets
         self.pending_favored: int = 0
         
         self.score_changed: bool = False
@@ -71,48 +119,75 @@ class State:
 
         self.on_exception = on_exception or (lambda *_: None)
 
+        # called with each new entry while `lock` is held, before its edge list is released
+        self.on_new_entry: Callable[[CoverageResult], None] = lambda _: None
+
         self.n_entries: int = 0
 
+        # no. of executions since start
+        self.total_execs: int = 0
+
+        self.scheduler: IScheduler = create_scheduler(schedule, self)
+
+        self.skip_deterministic: bool = skip_deterministic
+
     def use_ctx(self):
         '''
-        write context file
+        write context file and start executor
         '''
         self.ctx.write(self.ctx_fname)
+        self.executor = create_executor(self.exec_mode, self.entry_module, self.ctx_fname, self.n_buckets, **self.exec_options)
+
+        if self.executor.n_workers > 1:
+            self.batch_pool = ThreadPool(self.executor.n_workers)
 
     def rm_ctx(self):
         '''
-        delete context file
+        stop executor and delete context file
         '''
+        if self.batch_pool:
+            self.batch_pool.terminate()
+            self.batch_pool = None
+
+        if self.executor:
+            self.executor.close()
+            self.executor = None
+
         os.path.exists(self.ctx_fname) and os.remove(self.ctx_fname)
 
-    def update_coverage(self, cov: CoverageResult):
+    def update_coverage(self, cov: CoverageResult) -> int:
         '''
-        update global coverage
+        merge a trace into global coverage, like `has_new_bits` in AFL. hold `lock` when calling.
 
         Arguments:
         ---
-        - trace_bits: coverage bitmap
+        - cov: coverage result
 
         Returns:
         ---
-        - `True` if global coverage map changed. else `False`.
+        - 2 if the trace covers a new edge, 1 if it only covers new hitcount buckets of covered edges, else 0
         '''
         changed: int = 0
+        covered = self.covered
+
+        for edge in cov.cov:
+            i = edge >> EDGE_SHIFT
+            old = covered[i]
+            new = old | (edge & EDGE_MASK)
+
+            if new != old:
+                covered[i] = new
+                changed = 2 if not old else max(changed, 1)
 
-        for i in range(self.n_buckets):
-            covered = self.covered[i]
-            new_covered = covered | cov.cov[i]
+        if not changed:
+            return 0
 
-            if new_covered != covered:
-                self.covered[i] = new_covered
-                changed = 1 + int(not covered)
-                self.coverage_updated = True
+        self.coverage_updated = True
 
-        if changed:
-            self.op_logger.write(f'new area covered by input: {cov.arg_head()}')
+        self.op_logger.write(f'new area covered by input: {cov.arg_head()}')
 
-            if cov.exception:
-                self.exception_logger.write(f'new exception covered by input: {cov.arg_head()}, exception: {cov.exception}')
+        if cov.exception:
+            self.exception_logger.write(f'new exception covered by input: {cov.arg_head()}, exception: {cov.exception}')
 
         return changed
 
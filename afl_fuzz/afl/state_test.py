@@ -0,0 +1,45 @@
+'''
+unit test for state.py
+'''
+
+import unittest
+
+from afl_fuzz.afl.test_util import StateTestCase
+from afl_fuzz.coverage_collector.result import CoverageResult, to_edges
+
+class state_test(StateTestCase):
+    '''
+    unit test for State
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.state = self.create_state()
+
+    def result(self, binned: dict[int, int]) -> CoverageResult:
+        cov = bytearray(16)
+
+        for i, c in binned.items():
+            cov[i] = c
+
+        return CoverageResult(b'', to_edges(cov))
+
+    def test_update_coverage(self):
+        state = self.state
+
+        self.assertEqual(state.update_coverage(self.result({ 1: 1, 9: 3 })), 2)
+        self.assertEqual(state.update_coverage(self.result({ 1: 1 })), 0)
+
+        # new hitcount bucket of a covered edge
+        self.assertEqual(state.update_coverage(self.result({ 1: 2, 9: 3 })), 1)
+        self.assertEqual(state.update_coverage(self.result({ 1: 2 })), 0)
+
+        self.assertEqual(state.update_coverage(self.result({ 1: 4, 15: 1 })), 2)
+
+        self.assertEqual(state.covered[1], 0b1011)
+        self.assertEqual(state.covered[9], 0b100)
+        self.assertEqual(state.covered[15], 1)
+        self.assertEqual(state.estimate_coverage(), 3 / 16)
+
+if __name__ == '__main__':
+    unittest.main()
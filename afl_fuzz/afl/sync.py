@@ -0,0 +1,251 @@
+'''
+exchange queue entries between fuzzer instances, like AFL's -M/-S mode.
+
+with a sync directory, each instance owns `<sync_dir>/<sync_id>`:
+
+- `queue/id_<n>`: inputs of the entries it found, numbered in order
+- `stats.json`: its stats
+- `bitmap`: its coverage bitmap
+'''
+from abc import ABC
+from itertools import chain
+from threading import Lock
+import json
+import os
+import time
+
+from afl_fuzz.afl.state import State
+from afl_fuzz.afl.exec import save_if_interesting
+from afl_fuzz.afl.config import EXEC_TIMEOUT, SYNC_INTERVAL
+from afl_fuzz.coverage_collector.result import bitmap_size
+
+def write_atomic(fname: str, data: bytes):
+    '''
+    write a file, so that readers never see it partly written
+    '''
+    tmp = f'{fname}.tmp'
+
+    with open(tmp, 'wb') as f:
+        f.write(data)
+
+    os.replace(tmp, fname)
+
+class SyncError(Exception):
+    '''
+    a request was rejected by another instance or the coordinator
+    '''
+    pass
+
+class ISyncer(ABC):
+    '''
+    exchanges entries with other instances. an imported entry is only kept if it covers
+    something new locally.
+    '''
+
+    def __init__(self, state: State):
+        '''
+        Arguments:
+        ---
+        - state: afl state
+        '''
+        self.state = state
+
+        self.n_exported: int = 0
+        self.n_imported: int = 0
+
+        self.start: float = time.time()
+        self.last_sync: float = 0
+
+        # no. of syncs, and seconds spent in them
+        self.n_syncs: int = 0
+        self.sync_time: float = 0
+        # no. of syncs which failed
+        self.n_errors: int = 0
+
+        # held while syncing
+        self._lock = Lock()
+
+    def export_entries(self):
+        '''
+        send entries found since the last sync
+        '''
+        raise NotImplementedError()
+
+    def import_entries(self):
+        '''
+        receive entries other instances found since the last sync
+        '''
+        raise NotImplementedError()
+
+    def write_stats(self):
+        '''
+        publish `stats`
+        '''
+        raise NotImplementedError()
+
+    def close(self):
+        '''
+        release resources held by the syncer
+        '''
+        pass
+
+    def stats(self) -> dict:
+        '''
+        stats of this instance
+        '''
+        state = self.state
+
+        with state.lock:
+            return {
+                'execs': state.total_execs,
+                'cycles': state.queue_cycle,
+                'entries': len(state.queue) + len(state.fuzzed_queue),
+                'covered': bitmap_size(state.covered),
+                'exported': self.n_exported,
+                'imported': self.n_imported,
+                'elapsed': time.time() - self.start,
+                'syncs': self.n_syncs,
+                'sync_errors': self.n_errors,
+                'sync_time': self.sync_time
+            }
+
+    def sync(self, force: bool = False):
+        '''
+        export and import entries, at most every `SYNC_INTERVAL` seconds. does nothing if another
+        thread is syncing. a sync which fails, e.g. because the coordinator is unreachable, is
+        retried on the next interval.
+
+        Arguments:
+        ---
+        - force: sync even if the last sync is recent
+        '''
+        if not force and time.time() - self.last_sync < SYNC_INTERVAL:
+            return
+
+        if not self._lock.acquire(blocking=False):
+            return
+
+        start = time.time()
+
+        try:
+            self.export_entries()
+            self.import_entries()
+            self.write_stats()
+        except (OSError, SyncError) as ex:
+            self.n_errors += 1
+            self.state.exception_logger.write(f'sync failed: {ex}')
+        finally:
+            self.last_sync = time.time()
+            self.n_syncs += 1
+            self.sync_time += self.last_sync - start
+            self._lock.release()
+
+class DirSyncer(ISyncer):
+    '''
+    exchange entries through a sync directory. each instance writes the inputs of the entries it
+    found, and runs the inputs other instances found.
+    '''
+
+    def __init__(self, state: State, sync_dir: str, sync_id: str):
+        '''
+        Arguments:
+        ---
+        - state: afl state
+        - sync_dir: sync directory shared by all instances
+        - sync_id: name of this instance
+        '''
+        super().__init__(state)
+
+        self.sync_dir = sync_dir
+        self.sync_id = sync_id
+
+        self.dir = os.path.join(sync_dir, sync_id)
+        os.makedirs(os.path.join(self.dir, 'queue'), exist_ok=True)
+
+        # instance -> no. of its entries imported
+        self.cursors: dict[str, int] = dict()
+
+    def export_entries(self):
+        with self.state.lock:
+            entries = [el for el in chain(self.state.queue, self.state.fuzzed_queue) if not el.synced]
+
+            for el in entries:
+                el.synced = True
+
+        for el in entries:
+            write_atomic(os.path.join(self.dir, 'queue', f'id_{self.n_exported:06d}'), el.args)
+            self.n_exported += 1
+
+    def import_entries(self):
+        for peer in sorted(os.listdir(self.sync_dir)):
+            queue_dir = os.path.join(self.sync_dir, peer, 'queue')
+
+            if peer == self.sync_id or not os.path.isdir(queue_dir):
+                continue
+
+            i = self.cursors.get(peer, 0)
+
+            while os.path.exists(fname := os.path.join(queue_dir, f'id_{i:06d}')):
+                with open(fname, 'rb') as f:
+                    args = f.read()
+
+                i += 1
+
+                # skipped, and not retried, if it hangs or kills the target
+                try:
+                    cov = self.state.executor.collect(args, timeout=EXEC_TIMEOUT / 1000)
+                except (TimeoutError, ChildProcessError):
+                    continue
+
+                # not exported again
+                cov.synced = True
+
+                if cov.exception:
+                    self.state.on_exception(cov.args, cov.exception)
+
+                self.n_imported += save_if_interesting(self.state, cov)
+
+            self.cursors[peer] = i
+
+    def write_stats(self):
+        stats = self.stats()
+
+        with self.state.lock:
+            bitmap = bytes(self.state.covered)
+
+        write_atomic(os.path.join(self.dir, 'stats.json'), json.dumps(stats).encode())
+        write_atomic(os.path.join(self.dir, 'bitmap'), bitmap)
+
+def read_stats(sync_dir: str) -> dict:
+    '''
+    aggregate the stats of all instances in a sync directory
+
+    Returns:
+    ---
+    - `instances`: stats of each instance, by name. `execs`: total no. of executions.
+      `covered`: no. of buckets covered by any instance
+    '''
+    instances: dict[str, dict] = dict()
+
+    # union of the bitmaps, as an int
+    covered: int = 0
+    n_buckets: int = 0
+
+    for name in sorted(os.listdir(sync_dir)):
+        try:
+            with open(os.path.join(sync_dir, name, 'stats.json')) as f:
+                instances[name] = json.load(f)
+
+            with open(os.path.join(sync_dir, name, 'bitmap'), 'rb') as f:
+                bitmap = f.read()
+        except FileNotFoundError:
+            continue
+
+        covered |= int.from_bytes(bitmap, 'little')
+        n_buckets = len(bitmap)
+
+    return {
+        'instances': instances,
+        'execs': sum(el['execs'] for el in instances.values()),
+        'covered': bitmap_size(covered.to_bytes(n_buckets, 'little'))
+    }
@@ -0,0 +1,91 @@
+'''
+unit test for sync.py
+'''
+
+import os
+import unittest
+
+from afl_fuzz.afl.test_util import StateTestCase
+from afl_fuzz.afl.sync import DirSyncer, read_stats
+from afl_fuzz.coverage_collector.result import CoverageResult, bitmap_size
+
+TARGET = '''
+import os
+
+def main(args: bytes):
+    if args[:1] == b'a':
+        print('a')
+    elif args[:1] == b'b':
+        print('b')
+    elif args[:1] == b'c':
+        os._exit(1)
+'''
+
+class sync_test(StateTestCase):
+    '''
+    unit test for DirSyncer
+    '''
+
+    target = 'sync_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        self.states = [self.create_state(64, exec_mode='spawn') for _ in range(2)]
+
+        for state in self.states:
+            state.use_ctx()
+
+        self.syncers = [DirSyncer(state, 'sync', f'instance{i}') for i, state in enumerate(self.states)]
+
+    def tearDown(self):
+        for state in self.states:
+            state.rm_ctx()
+
+        super().tearDown()
+
+    def test_sync(self):
+        a, b = self.states
+
+        a.queue.push(CoverageResult(b'a'))
+        self.syncers[0].sync()
+        self.syncers[1].sync()
+
+        # imported, but not exported back
+        self.assertEqual([el.args for el in b.queue], [b'a'])
+        self.assertEqual(self.syncers[1].n_imported, 1)
+        self.assertEqual(self.syncers[1].n_exported, 0)
+
+        # only kept if it covers something new
+        a.queue.push(CoverageResult(b'aa'))
+        self.syncers[0].sync(force=True)
+        self.syncers[1].sync(force=True)
+
+        self.assertEqual(len(b.queue), 1)
+        self.assertEqual(self.syncers[1].cursors['instance0'], 2)
+
+        stats = read_stats('sync')
+
+        self.assertEqual([*stats['instances']], ['instance0', 'instance1'])
+        # `a` only has entries pushed by hand
+        self.assertGreater(stats['covered'], 0)
+        self.assertEqual(stats['covered'], bitmap_size(b.covered))
+
+    def test_crash(self):
+        b = self.states[1]
+        # created by the syncer of instance0
+        queue_dir = os.path.join('sync', 'instance0', 'queue')
+
+        for i, args in enumerate([b'c', b'a']):
+            with open(os.path.join(queue_dir, f'id_{i:06d}'), 'wb') as f:
+                f.write(args)
+
+        # the entry which kills the target is skipped
+        self.syncers[1].sync()
+
+        self.assertEqual([el.args for el in b.queue], [b'a'])
+        self.assertEqual(self.syncers[1].cursors['instance0'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
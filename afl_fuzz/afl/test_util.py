@@ -0,0 +1,31 @@
+'''
+fixture shared by the unit tests of afl
+'''
+
+from afl_fuzz.afl.state import State
+from afl_fuzz.afl.config import TRACE_BACKEND, TRACE_MODE, DEP_ALLOW, DEP_DENY
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+
+class StateTestCase(TargetTestCase):
+    '''
+    `TargetTestCase` which builds afl states of the target
+    '''
+
+    def create_context(self, n_buckets: int) -> Context:
+        '''
+        context of the target, as `State` creates it, with the cache in the temporary directory
+        '''
+        return super().create_context(n_buckets, None, TRACE_BACKEND, TRACE_MODE, DEP_ALLOW, DEP_DENY)
+
+    def create_state(self, n_buckets: int = 16, ctx: Context = None, **kwargs) -> State:
+        '''
+        afl state of the target
+
+        Arguments:
+        ---
+        - n_buckets: no. of trace buckets
+        - ctx: coverage context. `create_context` if `None`
+        - kwargs: passed to `State`
+        '''
+        return State(self.target, n_buckets=n_buckets, ctx=ctx or self.create_context(n_buckets), **kwargs)
@@ -0,0 +1,92 @@
+'''
+tracing backends.
+
+a backend records the edges executed between `start()` and `stop()` into `data`, a `Hitcount`.
+'''
+
+import sys
+from abc import ABC
+from typing import MutableSequence
+
+from afl_fuzz.coverage_collector.pos_enc import Hitcount
+
+# 'settrace': coverage.py with the lossy `PyTracer` on `sys.settrace`
+# 'monitoring': `sys.monitoring` events, python 3.12+
+# 'instrument': counters inserted into the AST of encoded files at import time
+TRACE_BACKENDS: list[str] = ['settrace', 'monitoring', 'instrument']
+DEFAULT_BACKEND: str = 'monitoring' if hasattr(sys, 'monitoring') else 'settrace'
+
+class ITraceBackend(ABC):
+    data: Hitcount
+
+    def start(self):
+        '''
+        start tracing. `data` is not reset.
+        '''
+        raise NotImplementedError()
+
+    def stop(self):
+        '''
+        stop tracing. safe to call more than once.
+        '''
+        raise NotImplementedError()
+
+class SettraceBackend(ITraceBackend):
+    '''
+    coverage.py with the lossy `PyTracer` override
+    '''
+    def __init__(self, buckets: MutableSequence[int] = None):
+        '''
+        Arguments:
+        ---
+        - buckets: buffer the hitcounts are written into. a new one if `None`
+        '''
+        import afl_fuzz.override
+
+        from coverage import Coverage
+        from afl_fuzz.coverage_collector.collector import Collector
+
+        Collector.buckets = buckets
+
+        self._c = Coverage(branch=True, data_file=None, data_suffix=True, timid=True)
+
+        # a timeout raised inside the trace function uninstalls it, which is expected here
+        self._c.set_option('run:disable_warnings', ['trace-changed'])
+
+        # build the collector once
+        self._c.start()
+        self._c.stop()
+
+    @property
+    def data(self) -> Hitcount:
+        return self._c._collector.data
+
+    def start(self):
+        self._c.start()
+
+    def stop(self):
+        self._c.stop()
+
+def create_backend(name: str, buckets: MutableSequence[int] = None) -> ITraceBackend:
+    '''
+    create tracing backend. the context must be loaded.
+
+    Arguments:
+    ---
+    - name: backend name, see `TRACE_BACKENDS`
+    - buckets: buffer the hitcounts are written into. a new one if `None`
+
+    Returns:
+    ---
+    - backend
+    '''
+    if name == 'settrace':
+        return SettraceBackend(buckets)
+    elif name == 'monitoring':
+        from afl_fuzz.coverage_collector.monitor import MonitoringBackend
+        return MonitoringBackend(buckets)
+    elif name == 'instrument':
+        from afl_fuzz.coverage_collector.instrument import InstrumentBackend
+        return InstrumentBackend(buckets)
+
+    raise ValueError(f'unknown trace backend {name}. expected one of {TRACE_BACKENDS}')
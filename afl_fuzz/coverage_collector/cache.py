@@ -0,0 +1,200 @@
+'''
+persistent cache of analyzed files, so that `Context.create` does not parse unchanged files again.
+
+each file has an entry with the imports and the positional encoding of the file, keyed by its
+path. an entry is valid if the mtime and size of the file did not change, or if only the mtime
+changed but the source hash did not. the import graph of an entry point is cached as well, and
+only the imports of the files which changed are resolved again.
+'''
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import tempfile
+from array import array
+from functools import partial
+
+from .pos_enc import DEFAULT_TRACE_MODE, encode_file
+from .dep_analyzer import ast_imports, get_dep_graph, pmap
+
+CONTEXT_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), 'afl_fuzz_cache', 'context')
+
+# bump when the analysis changes, to invalidate the cache
+_CACHE_VERSION: int = 1
+
+# mtime in ns, size, sha1 of the source, imports length, no. of lines
+_ENTRY = struct.Struct('<qQ20sII')
+
+def _key(*parts: str) -> str:
+    return hashlib.sha1('\0'.join([str(_CACHE_VERSION), *parts]).encode()).hexdigest()
+
+def _analyze_file(path: str, trace_mode: str) -> tuple[list[str], array]:
+    return ast_imports(path), encode_file(path, trace_mode)
+
+def _write_atomic(fname: str, data: bytes):
+    # concurrent campaigns never read a partial file
+    tmp = f'{fname}.{os.getpid()}'
+
+    with open(tmp, 'wb') as f:
+        f.write(data)
+
+    os.replace(tmp, fname)
+
+class ContextCache:
+    '''
+    cache of analyzed files in a directory, shared by all campaigns
+    '''
+    def __init__(self, cache_dir: str = CONTEXT_CACHE_DIR, trace_mode: str = DEFAULT_TRACE_MODE, n_jobs: int = None):
+        '''
+        Arguments:
+        ---
+        - cache_dir: cache directory. created if missing
+        - trace_mode: lines to mark, see `TRACE_MODES`
+        - n_jobs: no. of processes analyzing files. `None` for no. of cores
+        '''
+        self.cache_dir = cache_dir
+        self.trace_mode = trace_mode
+        self.n_jobs = n_jobs
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # path -> (imports, positional encoding), of entries loaded or analyzed
+        self._entries: dict[str, tuple[list[str], array]] = dict()
+
+        self.n_hits: int = 0
+        self.n_misses: int = 0
+
+    def _read_entry(self, fname: str) -> tuple[int, int, bytes, list[str], array]:
+        '''
+        Returns:
+        ---
+        - mtime, size and hash of the file, its imports and positional encoding. `None` if missing
+        '''
+        try:
+            with open(fname, 'rb') as f:
+                data = f.read()
+
+            mtime, size, digest, n_imports, n_lines = _ENTRY.unpack_from(data)
+        except (OSError, struct.error):
+            return None
+
+        pos = _ENTRY.size
+        imports = data[pos:pos + n_imports].decode().split('\n') if n_imports else []
+        pos += n_imports
+
+        pe = array('I')
+        pe.frombytes(data[pos:pos + 4 * n_lines])
+
+        if sys.byteorder != 'little':
+            pe.byteswap()
+
+        return mtime, size, digest, imports, pe
+
+    def _write_entry(self, fname: str, st: os.stat_result, digest: bytes, imports: list[str], pe: array):
+        encoded = '\n'.join(imports).encode()
+        markers = array('I', pe)
+
+        if sys.byteorder != 'little':
+            markers.byteswap()
+
+        _write_atomic(fname, _ENTRY.pack(st.st_mtime_ns, st.st_size, digest, len(encoded), len(pe)) + encoded + markers.tobytes())
+
+    def analyze(self, paths: list[str]) -> list[tuple[list[str], array]]:
+        '''
+        imports and positional encoding of files, from the cache if they did not change. the others
+        are analyzed in a process pool if there are many.
+        '''
+        # (path, entry filename, stat, source hash) of files to analyze
+        misses: list[tuple[str, str, os.stat_result, bytes]] = []
+
+        for path in paths:
+            if path in self._entries:
+                continue
+
+            st = os.stat(path)
+            fname = os.path.join(self.cache_dir, f'{_key(path, self.trace_mode)}.bin')
+            entry = self._read_entry(fname)
+
+            if entry and entry[:2] == (st.st_mtime_ns, st.st_size):
+                self.n_hits += 1
+                self._entries[path] = entry[3:]
+                continue
+
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).digest()
+
+            if entry and entry[2] == digest:
+                # only the mtime changed
+                self.n_hits += 1
+                self._entries[path] = entry[3:]
+                self._write_entry(fname, st, *entry[2:])
+            else:
+                misses.append((path, fname, st, digest))
+
+        results = pmap(partial(_analyze_file, trace_mode=self.trace_mode), [el[0] for el in misses], self.n_jobs)
+
+        for (path, fname, st, digest), (imports, pe) in zip(misses, results):
+            self.n_misses += 1
+            self._entries[path] = imports, pe
+            self._write_entry(fname, st, digest, imports, pe)
+
+        return [self._entries[el] for el in paths]
+
+    def imports(self, path: str) -> list[str]:
+        '''
+        imported package names of a file, see `ast_imports`
+        '''
+        return self.analyze([path])[0][0]
+
+    def file_pe(self, path: str) -> array:
+        '''
+        positional encoding of a file, see `encode_file`
+        '''
+        return self.analyze([path])[0][1]
+
+    def deps(self, entry: str, allow: list[str] = None, deny: list[str] = None) -> list[str]:
+        '''
+        dependencies of an entry point, see `get_dep_graph`. if some of them changed, only those
+        are analyzed again. found again from scratch if one was deleted, or if the working directory
+        or `sys.path` is different.
+
+        Arguments:
+        ---
+        - entry: entry point
+        - allow, deny: globs on resolved paths, see `matches`
+        '''
+        key = _key(os.path.realpath(entry), os.getcwd(), *sys.path, '\1', *(allow or ()), '\1', *(deny or ()))
+        fname = os.path.join(self.cache_dir, f'deps-{key}.json')
+
+        graph: dict[str, list[tuple[str, str]]] = None
+        changed: set[str] = None
+
+        try:
+            with open(fname) as f:
+                cached = json.load(f)
+
+            changed = {
+                path for path, (mtime, size) in cached['stat'].items()
+                if (st := os.stat(path)).st_mtime_ns != mtime or st.st_size != size
+            }
+            graph = cached['graph']
+        except (OSError, ValueError, KeyError):
+            changed = None
+
+        if graph is not None and not changed:
+            return [*graph]
+
+        graph = get_dep_graph(
+            entry,
+            allow=allow,
+            deny=deny,
+            parse=lambda files: [imports for imports, _ in self.analyze(files)],
+            graph=graph,
+            changed=changed
+        )
+
+        stat = { path: ((st := os.stat(path)).st_mtime_ns, st.st_size) for path in graph }
+        _write_atomic(fname, json.dumps({ 'graph': graph, 'stat': stat }).encode())
+
+        return [*graph]
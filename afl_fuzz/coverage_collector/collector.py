@@ -8,7 +8,10 @@ from afl_fuzz.coverage_collector.pos_enc import Hitcount
 from afl_fuzz.coverage_collector.context import Context
 
 class Collector(_Collector):
+    # if set, hitcounts are written into this buffer instead of a new list
+    buckets = None
+
     def reset(self):
         super().reset()
         
-        self.data = Hitcount(n_buckets=Context.get().n_buckets)
\ No newline at end of file
+        self.data = Hitcount(n_buckets=Context.get().n_buckets, buckets=Collector.buckets)
\ No newline at end of file
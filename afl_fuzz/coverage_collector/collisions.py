@@ -0,0 +1,116 @@
+'''
+estimate how many edges of a target share a bucket, at several map sizes.
+
+the edges are found statically: each arc of coverage.py's parser between two lines of the same
+code object is an edge from the marked line executed last to the marked target. edges of calls
+and returns between code objects are not counted, so the estimate is a lower bound.
+
+usage: python -m afl_fuzz.coverage_collector.collisions <entry point> [trace mode]
+'''
+import sys
+from typing import Iterable, Sequence
+
+from afl_fuzz.coverage_collector.pos_enc import MAX_BUCKETS, DEFAULT_TRACE_MODE, line_marker, parse_arcs
+from afl_fuzz.coverage_collector.context import Context
+
+def static_edges(fname: str, file_pe: Sequence[int]) -> set[tuple[int, int]]:
+    '''
+    edges the tracer may record inside the code objects of a file
+
+    Arguments:
+    ---
+    - fname: filename
+    - file_pe: positional encoding of the file, see `encode_file`
+
+    Returns:
+    ---
+    - (marker of the source >> 1, marker of the target) of each edge, as passed to `Hitcount.add`
+    '''
+    arcs = parse_arcs(fname)
+    pred: dict[int, set[int]] = dict()
+
+    for s, t in arcs:
+        pred.setdefault(t, set()).add(s)
+
+    def source(line: int) -> int:
+        # unmarked lines are inside the block of their only predecessor, see `block_leaders`
+        seen: set[int] = set()
+
+        while line > 0 and not line_marker(file_pe, line) and line not in seen:
+            seen.add(line)
+            p = pred.get(line, ())
+            line = next(iter(p)) if len(p) == 1 else 0
+
+        return line_marker(file_pe, line) if line > 0 else 0
+
+    edges: set[tuple[int, int]] = set()
+
+    for s, t in arcs:
+        if s < 0 or t < 0 or not line_marker(file_pe, t):
+            continue
+
+        if m := source(s):
+            edges.add((m >> 1, line_marker(file_pe, t)))
+
+    return edges
+
+def collisions(edges: Iterable[tuple[int, int]], n_buckets: int) -> tuple[int, float]:
+    '''
+    buckets of edges
+
+    Arguments:
+    ---
+    - edges: (source, target) pairs, see `static_edges`
+    - n_buckets: no. of buckets, a power of two
+
+    Returns:
+    ---
+    - no. of distinct buckets. collision rate: share of the edges which do not get a bucket of their own
+    '''
+    edges = set(edges)
+    mask = n_buckets - 1
+
+    n = len({ (s ^ t) & mask for s, t in edges })
+
+    return n, 1 - n / len(edges) if edges else 0
+
+def context_edges(ctx: Context) -> set[tuple[int, int]]:
+    '''
+    edges of all files of a context, see `static_edges`
+    '''
+    edges: set[tuple[int, int]] = set()
+
+    for fname, file_pe in ctx._pe.items():
+        edges |= static_edges(fname, file_pe)
+
+    return edges
+
+def collision_report(edges: set[tuple[int, int]], sizes: Iterable[int] = None) -> dict[int, tuple[int, float]]:
+    '''
+    estimate the collision rate at several map sizes
+
+    Arguments:
+    ---
+    - edges: edges of a context, see `context_edges`
+    - sizes: no. of buckets. powers of two from 2^10 to `MAX_BUCKETS` if `None`
+
+    Returns:
+    ---
+    - map: no. of buckets => no. of distinct buckets and collision rate, see `collisions`
+    '''
+    sizes = sizes or [1 << i for i in range(10, MAX_BUCKETS.bit_length())]
+
+    return { n: collisions(edges, n) for n in sizes }
+
+if __name__ == '__main__':
+    entry = sys.argv[1]
+    trace_mode = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_TRACE_MODE
+
+    ctx = Context.create(MAX_BUCKETS, entry, trace_mode=trace_mode)
+    edges = context_edges(ctx)
+
+    print(f'{len(ctx._pe)} files, {len(edges)} edges')
+    print(f'{"buckets":>10}{"used":>10}{"collisions":>12}')
+
+    for n, (used, rate) in collision_report(edges).items():
+        print(f'{n:>10}{used:>10}{rate:>12.2%}')
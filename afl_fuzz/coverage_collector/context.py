@@ -1,6 +1,34 @@
-from .pos_enc import get_positional_encoding
+'''
+coverage collection context: the no. of buckets, the tracing backend and the positional
+encoding of each traced file.
+
+contexts are written in a binary format, so that a traced process maps the file and uses the
+encodings in place, without parsing:
+
+```
+<magic: 4s><n_buckets: u32><n_files: u32><backend length: u32><backend>
+n_files * <name length: u32><offset: u64><n_lines: u32><name>
+n_files * <marker of each line: u32 * n_lines>, at the offsets above
+```
+
+integers are little-endian, and the markers of each file are 4-byte aligned.
+'''
+from .pos_enc import DEFAULT_TRACE_MODE, check_n_buckets, get_positional_encoding
 from .dep_analyzer import get_deps
-import json
+from .backend import DEFAULT_BACKEND
+from .cache import CONTEXT_CACHE_DIR, ContextCache
+from array import array
+from typing import Sequence, Union
+import mmap
+import struct
+import sys
+
+_MAGIC: bytes = b'AFC1'
+
+# magic, n_buckets, n_files, backend length
+_HEADER = struct.Struct('<4sIII')
+# name length, offset, n_lines
+_FILE = struct.Struct('<IQI')
 
 class Context:
     '''
@@ -8,45 +36,147 @@ class Context:
     '''
     _instance = None
 
-    def __init__(self, n_buckets: int, pe: dict[str, dict[int, int]] = None):
+    def __init__(self, n_buckets: int, pe: dict[str, Sequence[int]] = None, backend: str = DEFAULT_BACKEND):
+        '''
+        Arguments:
+        ---
+        - n_buckets: no. of trace buckets, a power of two up to `MAX_BUCKETS`
+        - pe: map: filename => marker of each line, see `encode_file`
+        - backend: tracing backend, see `TRACE_BACKENDS`
+        '''
+        check_n_buckets(n_buckets)
+
         self._n_buckets = n_buckets
         self._pe = pe or dict()
+        self._backend = backend
+
+    def __reduce__(self):
+        # encodings may be views of a mapped file
+        return Context.loads, (self.dumps(),)
 
     @property
     def n_buckets(self) -> int:
         return self._n_buckets
 
+    @property
+    def backend(self) -> str:
+        '''
+        tracing backend used by executors, see `TRACE_BACKENDS`
+        '''
+        return self._backend
+
     @staticmethod
-    def create(n_nuckets: int, entry: str):
-        src = get_deps(entry)
-        pe = get_positional_encoding(src)
-        return Context(n_nuckets, pe)
+    def create(
+        n_nuckets: int,
+        entry: str,
+        backend: str = DEFAULT_BACKEND,
+        trace_mode: str = DEFAULT_TRACE_MODE,
+        allow: list[str] = None,
+        deny: list[str] = None,
+        cache_dir: str = CONTEXT_CACHE_DIR,
+        n_jobs: int = None
+    ):
+        '''
+        analyze an entry point and its dependencies
+
+        Arguments:
+        ---
+        - n_nuckets: no. of trace buckets
+        - entry: entry point
+        - backend: tracing backend
+        - trace_mode: lines to mark, see `TRACE_MODES`
+        - allow, deny: globs on the paths of dependencies to trace, see `matches`. e.g. deny
+          `*/site-packages/*` to skip third-party packages
+        - cache_dir: cache of analyzed files, so that unchanged files are not parsed again. `None` to
+          parse all files
+        - n_jobs: no. of processes parsing files. `None` for no. of cores
+        '''
+        if cache_dir is None:
+            src = get_deps(entry, allow=allow, deny=deny, n_jobs=n_jobs)
+            pe = get_positional_encoding(src, trace_mode)
+        else:
+            cache = ContextCache(cache_dir, trace_mode, n_jobs)
+            src = cache.deps(entry, allow, deny)
+            pe = dict(zip(src, (file_pe for _, file_pe in cache.analyze(src))))
+
+        return Context(n_nuckets, pe, backend)
 
     @staticmethod
-    def read(f: str):
-        with open(f, 'r') as io:
-            obj = json.load(io)
+    def loads(data: Union[bytes, mmap.mmap]) -> 'Context':
+        '''
+        deserialize a context written by `dumps`. the encodings are views of `data`
+        '''
+        buf = memoryview(data)
+        magic, n_buckets, n_files, n = _HEADER.unpack_from(buf)
+
+        if magic != _MAGIC:
+            raise ValueError(f'not a context. magic: {magic}')
+
+        pos = _HEADER.size
+        backend = bytes(buf[pos:pos + n]).decode()
+        pos += n
+
+        pe: dict[str, Sequence[int]] = dict()
+
+        for _ in range(n_files):
+            n, offset, n_lines = _FILE.unpack_from(buf, pos)
+            pos += _FILE.size
 
-            pe = obj['pe']
-            for k in pe.keys():
-                pe[k] = dict(pe[k])
+            name = bytes(buf[pos:pos + n]).decode()
+            pos += n
 
-            n_buckets = int(obj['n_buckets'])
+            file_pe = buf[offset:offset + 4 * n_lines].cast('I')
 
-            Context._instance = Context(n_buckets=n_buckets, pe=obj['pe'])
+            if sys.byteorder != 'little':
+                file_pe = array('I', file_pe)
+                file_pe.byteswap()
+
+            pe[name] = file_pe
+
+        return Context(n_buckets=n_buckets, pe=pe, backend=backend)
+
+    @staticmethod
+    def read(f: str):
+        '''
+        map a context file and use it as the current context
+        '''
+        with open(f, 'rb') as io:
+            mm = mmap.mmap(io.fileno(), 0, access=mmap.ACCESS_READ)
+
+        Context._instance = Context.loads(mm)
 
     @staticmethod
     def get():
         return Context._instance
 
-    def write(self, f: str):
-        serialized_pe = dict(self._pe)
+    def dumps(self) -> bytes:
+        '''
+        serialize context
+        '''
+        backend = self.backend.encode()
+        names = [f.encode() for f in self._pe]
+
+        header = [_HEADER.pack(_MAGIC, self.n_buckets, len(names), len(backend)), backend]
 
-        for k in self._pe.keys():
-            serialized_pe[k] = [*self._pe[k].items()]
+        # markers start 4-byte aligned after the file table
+        table_size = _HEADER.size + len(backend) + sum(_FILE.size + len(n) for n in names)
+        pos = table_size + -table_size % 4
 
-        with open(f, 'w') as io:
-            json.dump({
-                'pe': serialized_pe,
-                'n_buckets': self.n_buckets
-            }, io)
\ No newline at end of file
+        body = [bytes(pos - table_size)]
+
+        for name, file_pe in zip(names, self._pe.values()):
+            file_pe = array('I', file_pe)
+
+            if sys.byteorder != 'little':
+                file_pe.byteswap()
+
+            header += [_FILE.pack(len(name), pos, len(file_pe)), name]
+            body.append(file_pe.tobytes())
+
+            pos += 4 * len(file_pe)
+
+        return b''.join(header + body)
+
+    def write(self, f: str):
+        with open(f, 'wb') as io:
+            io.write(self.dumps())
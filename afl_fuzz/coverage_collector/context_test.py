@@ -0,0 +1,96 @@
+'''
+unit test for context.py and cache.py
+'''
+
+import os
+import unittest
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.cache import ContextCache
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+
+TARGET = '''
+import ctx_dep
+
+def main(args: bytes):
+    if args:
+        ctx_dep.f()
+'''
+
+DEP = '''
+def f():
+    return 1
+'''
+
+class context_test(TargetTestCase):
+    '''
+    unit test for Context and ContextCache
+    '''
+
+    target = 'ctx_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        # found through the temporary directory in `sys.path`
+        with open('ctx_dep.py', 'w') as f:
+            f.write(DEP)
+
+    def test_read(self):
+        ctx = Context.create(64, 'ctx_target.py', 'settrace', cache_dir=None)
+        ctx.write('ctx_target.ctx')
+        Context.read('ctx_target.ctx')
+
+        loaded = Context.get()
+
+        self.assertEqual(loaded.n_buckets, 64)
+        self.assertEqual(loaded.backend, 'settrace')
+        self.assertEqual({ f: list(pe) for f, pe in loaded._pe.items() }, { f: list(pe) for f, pe in ctx._pe.items() })
+
+    def test_cache(self):
+        dep = os.path.realpath('ctx_dep.py')
+
+        cache = ContextCache('cache')
+        pe = { f: list(cache.file_pe(f)) for f in cache.deps('ctx_target.py') }
+
+        self.assertEqual((cache.n_hits, cache.n_misses), (0, 2))
+        self.assertIn(dep, pe)
+
+        # same markers, without parsing
+        cache = ContextCache('cache')
+        self.assertEqual({ f: list(cache.file_pe(f)) for f in cache.deps('ctx_target.py') }, pe)
+        self.assertEqual((cache.n_hits, cache.n_misses), (2, 0))
+
+        # touched only
+        st = os.stat(dep)
+        os.utime(dep, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+        cache = ContextCache('cache')
+        self.assertEqual(list(cache.file_pe(dep)), pe[dep])
+        self.assertEqual((cache.n_hits, cache.n_misses), (1, 0))
+
+        # only the changed file and the new one are parsed
+        with open('ctx_dep2.py', 'w') as f:
+            f.write(DEP)
+
+        with open(dep, 'a') as f:
+            f.write('\nimport ctx_dep2\n')
+
+        cache = ContextCache('cache')
+        deps = cache.deps('ctx_target.py')
+
+        self.assertIn(os.path.realpath('ctx_dep2.py'), deps)
+        self.assertGreater(len(cache.file_pe(dep)), len(pe[dep]))
+        self.assertEqual((cache.n_hits, cache.n_misses), (0, 2))
+
+    def test_filter(self):
+        ctx = Context.create(64, 'ctx_target.py', deny=['*/ctx_dep.py'], cache_dir=None)
+        self.assertEqual([*ctx._pe], [os.path.realpath('ctx_target.py')])
+
+        # the entry point is always analyzed
+        ctx = Context.create(64, 'ctx_target.py', allow=['*/ctx_dep.py'], cache_dir=None)
+        self.assertEqual(len(ctx._pe), 2)
+
+if __name__ == '__main__':
+    unittest.main()
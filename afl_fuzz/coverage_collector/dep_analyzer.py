@@ -1,7 +1,16 @@
+import os
 import ast
 import pathlib
+from fnmatch import fnmatch
 from importlib.util import find_spec
-from typing import Callable
+from typing import Callable, Iterable, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# files are parsed in a process pool only if at least this many are parsed at once, so that
+# small projects do not pay for starting it
+PARALLEL_MIN_FILES: int = 32
 
 class _ImportFinder(ast.NodeVisitor):
     def __init__(self):
@@ -46,56 +55,158 @@ def ast_imports(fname: str) -> list[str]:
     
     return ['.' * lvl + name for name, lvl in visiter.imports]
 
-def get_deps(entry: str, omit: list[Callable[[pathlib.Path], bool]] = None) -> list[str]:
+def pmap(f: Callable[[T], R], items: list[T], n_jobs: int = 1) -> list[R]:
     '''
-    get dependencies of a python file
+    map in a process pool of `n_jobs` processes, or in this process if there are few items
+
+    Arguments:
+    ---
+    - f: picklable function
+    - items: arguments
+    - n_jobs: no. of processes. `None` for no. of cores
+    '''
+    n_jobs = min(n_jobs or os.cpu_count(), len(items) // PARALLEL_MIN_FILES)
+
+    if n_jobs <= 1:
+        return [f(el) for el in items]
+
+    # imported here: it imports the `queue` module, which afl/queue.py shadows when run from there
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(n_jobs) as pool:
+        return [*pool.map(f, items, chunksize=PARALLEL_MIN_FILES // 4)]
+
+def matches(path: str, allow: Iterable[str] = None, deny: Iterable[str] = None) -> bool:
+    '''
+    whether a file passes glob filters
+
+    Arguments:
+    ---
+    - path: resolved path
+    - allow: globs. if any, the file must match one of them
+    - deny: globs. the file must match none of them
+    '''
+    if allow and not any(fnmatch(path, el) for el in allow):
+        return False
+
+    return not any(fnmatch(path, el) for el in deny or ())
+
+def get_dep_graph(
+    entry: str,
+    omit: list[Callable[[pathlib.Path], bool]] = None,
+    allow: list[str] = None,
+    deny: list[str] = None,
+    n_jobs: int = 1,
+    parse: Callable[[list[str]], list[list[str]]] = None,
+    graph: dict[str, list[tuple[str, str]]] = None,
+    changed: Iterable[str] = None
+) -> dict[str, list[tuple[str, str]]]:
+    '''
+    get the import graph of a python file, breadth first. the files of each level are parsed at
+    once, in a process pool if there are many. `find_spec` is called once per imported name.
 
     Arguments:
     ---
     - entry: entry point
     - omit: list of functions. omit a file from analysis if any returns `True`.
+    - allow, deny: globs on resolved paths, see `matches`. the entry point is always analyzed
+    - n_jobs: no. of processes parsing files. `None` for no. of cores
+    - parse: returns the imported package names of several files, e.g. from a cache. `ast_imports`
+      on each file if `None`
+    - graph: graph of an earlier call, to update. the imports of its files are reused, except for
+      those in `changed`
+    - changed: files changed since `graph` was found
 
     Returns:
     ---
-    - list of dependencies
+    - map: file => (file, package) of each dependency it imports, for the entry point and all of its
+      dependencies
     '''
     omit = omit or []
+    parse = parse or (lambda files: pmap(ast_imports, files, n_jobs))
 
-    entry: pathlib.Path = pathlib.Path(entry).resolve()
+    old = graph or dict()
+    changed = set(changed or ())
 
-    stack: list[tuple[pathlib.Path, str]] = [(entry, '')]
-    deps: set[str] = set()
-    deps.add(str(entry))
+    # (name, package of relative imports) => (file, package) of the imported module
+    specs: dict[tuple[str, str], tuple[str, str]] = dict()
 
-    # dfs
-    while stack:
-        fname, pkg = stack.pop()
-        
-        for name in ast_imports(fname):
-            try:
-                spec = find_spec(name, pkg)
-            except:
-                continue
+    def resolve(name: str, pkg: str) -> tuple[str, str]:
+        key = (name, pkg if name.startswith('.') else '')
 
-            # sys modules: has_location = False
-            if spec == None or not spec.has_location:
-                continue
+        if key in specs:
+            return specs[key]
 
-            origin = pathlib.Path(spec.origin).resolve()
-            is_pkg = origin.name == '__init__.py'
+        specs[key] = None
 
-            if any(o(origin) for o in omit):
-                continue
+        try:
+            spec = find_spec(name, pkg)
+        except Exception:
+            return None
 
-            # already visited
-            if str(origin) in deps:
-                continue
-            else:
-                deps.add(str(origin))
+        # sys modules: has_location = False
+        if spec == None or not spec.has_location:
+            return None
+
+        origin = pathlib.Path(spec.origin).resolve()
+        is_pkg = origin.name == '__init__.py'
 
-            if not is_pkg:
-                name = spec.parent
+        # extension modules have no source
+        if origin.suffix != '.py':
+            return None
 
-            stack.append((str(origin), name))
+        if any(o(origin) for o in omit) or not matches(str(origin), allow, deny):
+            return None
 
-    return list(deps)
\ No newline at end of file
+        specs[key] = str(origin), spec.name if is_pkg else spec.parent
+
+        return specs[key]
+
+    entry = str(pathlib.Path(entry).resolve())
+    graph: dict[str, list[tuple[str, str]]] = dict()
+
+    frontier: list[tuple[str, str]] = [(entry, '')]
+    seen: set[str] = { entry }
+
+    # bfs
+    while frontier:
+        todo = [fname for fname, _ in frontier if fname not in old or fname in changed]
+        imports = dict(zip(todo, parse(todo)))
+
+        level, frontier = frontier, []
+
+        for fname, pkg in level:
+            if fname in imports:
+                graph[fname] = [dep for name in imports[fname] if (dep := resolve(name, pkg))]
+            else:
+                graph[fname] = [tuple(el) for el in old[fname]]
+
+            for dep, dep_pkg in graph[fname]:
+                if dep not in seen:
+                    seen.add(dep)
+                    frontier.append((dep, dep_pkg))
+
+    return graph
+
+def get_deps(
+    entry: str,
+    omit: list[Callable[[pathlib.Path], bool]] = None,
+    allow: list[str] = None,
+    deny: list[str] = None,
+    n_jobs: int = 1
+) -> list[str]:
+    '''
+    get dependencies of a python file
+
+    Arguments:
+    ---
+    - entry: entry point
+    - omit: list of functions. omit a file from analysis if any returns `True`.
+    - allow, deny: globs on resolved paths, see `matches`
+    - n_jobs: no. of processes parsing files. `None` for no. of cores
+
+    Returns:
+    ---
+    - list of dependencies, including the entry point
+    '''
+    return [*get_dep_graph(entry, omit, allow, deny, n_jobs)]
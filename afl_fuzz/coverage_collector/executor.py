@@ -0,0 +1,234 @@
+'''
+executors: run the entry point with an input and collect coverage
+'''
+
+import os
+from abc import ABC
+from queue import Queue
+from threading import local, Lock, BoundedSemaphore
+
+from afl_fuzz.coverage_collector.ipc import SharedBuckets
+from afl_fuzz.coverage_collector.process import collect
+from afl_fuzz.coverage_collector.forkserver import ForkServer, WorkerStats
+from afl_fuzz.coverage_collector.persistent import PersistentServer
+from afl_fuzz.coverage_collector.result import CoverageResult
+
+class IExecutor(ABC):
+    def __init__(self, src: str, ctx: str, n_buckets: int):
+        '''
+        Arguments:
+        ---
+        - src: entry point module
+        - ctx: context file
+        - n_buckets: no. of trace buckets
+        '''
+        self.src = src
+        self.ctx = ctx
+        self.n_buckets = n_buckets
+
+        # max. no. of requests served at once
+        self.n_workers: int = 1
+
+    def collect(self, args: bytes, timeout: int = None) -> CoverageResult:
+        '''
+        collect coverage data
+
+        Arguments:
+        ---
+        - args: input passed to <src>.main()
+        - timeout: timeout in seconds
+
+        Returns:
+        ---
+        - coverage data
+        '''
+        raise NotImplementedError()
+
+    def collect_batch(self, inputs: list[bytes], timeout: int = None) -> tuple[list[CoverageResult], Exception]:
+        '''
+        collect coverage data of a batch of inputs. stops at the first input which times out
+        or crashes.
+
+        Arguments:
+        ---
+        - inputs: inputs passed to <src>.main()
+        - timeout: timeout in seconds per input
+
+        Returns:
+        ---
+        - coverage data of the inputs completed, in order
+        - exception raised by input `len(results)`. `None` if all inputs completed.
+        '''
+        results: list[CoverageResult] = []
+
+        for args in inputs:
+            try:
+                results.append(self.collect(args, timeout=timeout))
+            except (TimeoutError, ChildProcessError) as ex:
+                return results, ex
+
+        return results, None
+
+    def stats(self) -> list[WorkerStats]:
+        '''
+        statistics of each worker process
+        '''
+        return []
+
+    def close(self):
+        '''
+        release resources held by the executor
+        '''
+        pass
+
+class SpawnExecutor(IExecutor):
+    '''
+    spawn a fresh interpreter for each input. at most `n_workers` children run at once, 
+    one set of shared buckets per thread.
+    '''
+    def __init__(self, src: str, ctx: str, n_buckets: int, n_workers: int = 1):
+        '''
+        Arguments:
+        ---
+        - src: entry point module
+        - ctx: context file
+        - n_buckets: no. of trace buckets
+        - n_workers: max. no. of concurrent children. `None` for no. of cores
+        '''
+        super().__init__(src, ctx, n_buckets)
+
+        self._local = local()
+        self._shms: list[SharedBuckets] = []
+        self._lock = Lock()
+
+        self.n_workers = n_workers or os.cpu_count()
+        self._slots = BoundedSemaphore(self.n_workers)
+
+    def _shm(self) -> SharedBuckets:
+        shm: SharedBuckets = getattr(self._local, 'shm', None)
+
+        if shm is None:
+            shm = SharedBuckets(self.n_buckets)
+            self._local.shm = shm
+
+            with self._lock:
+                self._shms.append(shm)
+
+        return shm
+
+    def collect(self, args: bytes, timeout: int = None) -> CoverageResult:
+        with self._slots:
+            return collect(self.src, self.ctx, args, self._shm(), timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            for shm in self._shms:
+                shm.close()
+
+            self._shms.clear()
+
+        self._local = local()
+
+class ForkServerExecutor(IExecutor):
+    '''
+    pool of `n_workers` warm fork servers which fork a child for each input. 
+    
+    a caller takes an idle server from the pool for the duration of a request, and waits 
+    if there is none. a server which crashes, hangs or exceeds `max_rss` is restarted on its
+    next request.
+    '''
+    def __init__(self, src: str, ctx: str, n_buckets: int, n_workers: int = 1, max_rss: int = None):
+        '''
+        Arguments:
+        ---
+        - src: entry point module
+        - ctx: context file
+        - n_buckets: no. of trace buckets
+        - n_workers: no. of server processes. `None` for no. of cores
+        - max_rss: restart a server when its resident set size exceeds this many bytes. `None` for no limit.
+        '''
+        super().__init__(src, ctx, n_buckets)
+
+        self.max_rss = max_rss
+        self.n_workers = n_workers or os.cpu_count()
+        self._servers: list[ForkServer] = [self._create_server() for _ in range(self.n_workers)]
+        self._idle: Queue[ForkServer] = Queue()
+
+        for server in self._servers:
+            # import the target in all workers up front
+            server.start()
+            self._idle.put(server)
+
+    def _create_server(self) -> ForkServer:
+        return ForkServer(self.src, self.ctx, self.n_buckets, max_rss=self.max_rss)
+
+    def collect(self, args: bytes, timeout: int = None) -> CoverageResult:
+        server = self._idle.get()
+
+        try:
+            return server.collect(args, timeout=timeout)
+        finally:
+            self._idle.put(server)
+
+    def collect_batch(self, inputs: list[bytes], timeout: int = None) -> tuple[list[CoverageResult], Exception]:
+        server = self._idle.get()
+
+        try:
+            return server.collect_batch(inputs, timeout=timeout)
+        finally:
+            self._idle.put(server)
+
+    def stats(self) -> list[WorkerStats]:
+        return [server.stats for server in self._servers]
+
+    def close(self):
+        for server in self._servers:
+            server.close()
+
+class PersistentExecutor(ForkServerExecutor):
+    '''
+    pool of `n_workers` long-lived servers which call `main` in a loop.
+    '''
+    def __init__(self, src: str, ctx: str, n_buckets: int, n_workers: int = 1, max_rss: int = None, **kwargs):
+        '''
+        Arguments:
+        ---
+        - src: entry point module
+        - ctx: context file
+        - n_buckets: no. of trace buckets
+        - n_workers: no. of server processes. `None` for no. of cores
+        - max_rss: restart a server when its resident set size exceeds this many bytes. `None` for no limit.
+        - kwargs: passed to `PersistentServer`, i.e. `max_iters` and `restore`
+        '''
+        self._kwargs = kwargs
+        super().__init__(src, ctx, n_buckets, n_workers=n_workers, max_rss=max_rss)
+
+    def _create_server(self) -> ForkServer:
+        return PersistentServer(self.src, self.ctx, self.n_buckets, max_rss=self.max_rss, **self._kwargs)
+
+EXECUTORS: dict[str, type[IExecutor]] = {
+    'spawn': SpawnExecutor,
+    'forkserver': ForkServerExecutor,
+    'persistent': PersistentExecutor
+}
+
+def create_executor(mode: str, src: str, ctx: str, n_buckets: int, **kwargs) -> IExecutor:
+    '''
+    create executor
+
+    Arguments:
+    ---
+    - mode: executor name, see `EXECUTORS`
+    - src: entry point module
+    - ctx: context file
+    - n_buckets: no. of trace buckets
+    - kwargs: executor options
+
+    Returns:
+    ---
+    - executor
+    '''
+    if mode not in EXECUTORS:
+        raise ValueError(f'unknown executor {mode}. expected one of {[*EXECUTORS.keys()]}')
+
+    return EXECUTORS[mode](src, ctx, n_buckets, **kwargs)
@@ -0,0 +1,516 @@
+'''
+fork server.
+
+a long-lived process which imports coverage.py, the overrides, the context and the
+entry point once, then forks a child to trace each input.
+
+each request carries a batch of inputs. the server runs them in order and stops at the
+first timeout or crash. the response carries the metadata and compact coverage of each
+input that completed, so a batch costs one round trip.
+'''
+
+import os
+import sys
+import struct
+import select
+import signal
+import time
+import importlib
+import subprocess
+from threading import Lock
+from types import ModuleType
+from typing import BinaryIO, Callable, Union
+
+from afl_fuzz.coverage_collector.result import CoverageResult, cksum
+from afl_fuzz.coverage_collector.ipc import SharedBuckets, pack_meta, unpack_meta, pack_edges, unpack_cov
+from afl_fuzz.coverage_collector.pos_enc import Hitcount
+from afl_fuzz.coverage_collector.process import trace_main
+from afl_fuzz.coverage_collector.backend import ITraceBackend
+
+_BOOTSTRAP = 'import sys; from afl_fuzz.coverage_collector.forkserver import serve; serve(*sys.argv[1:])'
+
+# request header: no. of inputs, timeout in seconds per input (0 for no timeout)
+_REQ = struct.Struct('<Id')
+
+# length of an input or of a metadata entry
+_LEN = struct.Struct('<I')
+
+# response header: status, no. of inputs completed, payload length
+_RESP = struct.Struct('<BII')
+
+STATUS_OK: int = 0
+STATUS_TIMEOUT: int = 1
+STATUS_CRASH: int = 2
+
+# seconds a server may take on top of the per input timeouts before it is considered hung
+HANG_GRACE: float = 2.0
+
+def rss(pid: int) -> int:
+    '''
+    resident set size of a process in bytes. 0 if unknown (e.g. no /proc).
+    '''
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _read_exact(io: BinaryIO, n: int) -> bytes:
+    '''
+    read exactly `n` bytes
+
+    Returns:
+    ---
+    - bytes read. `None` if end of file is reached.
+    '''
+    buf = bytearray()
+
+    while len(buf) < n:
+        chunk = io.read(n - len(buf))
+
+        if not chunk:
+            return None
+
+        buf += chunk
+
+    return bytes(buf)
+
+def _read_all(fd: int) -> bytes:
+    '''
+    read from file descriptor until end of file
+    '''
+    chunks: list[bytes] = []
+
+    while chunk := os.read(fd, 1 << 16):
+        chunks.append(chunk)
+
+    return b''.join(chunks)
+
+def setup_server(src: str, ctx: str, shm: str) -> tuple[BinaryIO, BinaryIO, int, ModuleType, ITraceBackend]:
+    '''
+    common setup of server processes: redirect stdout, read context, import entry point
+    and build the tracing backend which writes hitcounts into the shared buckets.
+
+    Arguments:
+    ---
+    - src: entry point module
+    - ctx: context file
+    - shm: shared buckets filename
+
+    Returns:
+    ---
+    - request stream, response stream, /dev/null file descriptor, entry point module, tracing backend
+    '''
+    from afl_fuzz.coverage_collector.context import Context
+    from afl_fuzz.coverage_collector.backend import create_backend
+
+    # keep the protocol channel, and send anything the target prints to /dev/null
+    req = sys.stdin.buffer
+    resp = os.fdopen(os.dup(1), 'wb')
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 1)
+
+    Context.read(ctx)
+
+    # before the import, which the instrumentation backend hooks
+    c = create_backend(Context.get().backend, SharedBuckets(Context.get().n_buckets, shm).buf)
+
+    # module level code is executed once here and is not traced
+    module = importlib.import_module(src)
+
+    return req, resp, devnull, module, c
+
+def read_request(req: BinaryIO) -> Union[tuple[list[bytes], float], None]:
+    '''
+    read one request
+
+    Returns:
+    ---
+    - inputs and timeout. `None` if the client closed the channel.
+    '''
+    header = _read_exact(req, _REQ.size)
+
+    if header is None:
+        return None
+
+    n, timeout = _REQ.unpack(header)
+    inputs: list[bytes] = []
+
+    for _ in range(n):
+        size = _read_exact(req, _LEN.size)
+        args = size and _read_exact(req, _LEN.unpack(size)[0])
+
+        if args is None:
+            return None
+
+        inputs.append(args)
+
+    return inputs, timeout
+
+def pack_run(output: dict, data: Hitcount) -> bytes:
+    '''
+    serialize the metadata and coverage of a run, as read by `ForkServer`. only the buckets
+    the run wrote are visited.
+
+    Arguments:
+    ---
+    - output: run time and exception, see `trace_main`
+    - data: binned hitcounts of the run
+
+    Returns:
+    ---
+    - bytes
+    '''
+    meta = pack_meta(output['elapsed'], output['exception'])
+    edges = data.edges()
+
+    return _LEN.pack(len(meta)) + meta + pack_edges(edges, cksum(edges))
+
+def serve_batches(
+    req: BinaryIO, 
+    resp: BinaryIO, 
+    run_one: Callable[[bytes, float], tuple[int, bytes]]
+):
+    '''
+    server main loop. reads requests from `req` and writes responses to `resp`.
+
+    Arguments:
+    ---
+    - req: request stream
+    - resp: response stream
+    - run_one: run one input with a timeout. returns status, and metadata and coverage (see
+      `pack_run`)
+    '''
+    while request := read_request(req):
+        inputs, timeout = request
+
+        status = STATUS_OK
+        n_done = 0
+        payload = bytearray()
+
+        for args in inputs:
+            status, run = run_one(args, timeout)
+
+            if status != STATUS_OK:
+                break
+
+            payload += run
+            n_done += 1
+
+        resp.write(_RESP.pack(status, n_done, len(payload)))
+        resp.write(payload)
+        resp.flush()
+
+def serve(src: str, ctx: str, shm: str):
+    '''
+    fork server main loop. reads requests from stdin and writes responses to stdout.
+
+    Arguments:
+    ---
+    - src: entry point module
+    - ctx: context file
+    - shm: shared buckets filename
+    '''
+    req, resp, devnull, module, c = setup_server(src, ctx, shm)
+    main = module.main
+
+    def run_one(args: bytes, timeout: float) -> tuple[int, bytes]:
+        # children inherit the collector with empty buckets. each child clears the buckets it
+        # wrote, so this only clears them on the first run
+        c.data.reset()
+
+        r, w = os.pipe()
+        pid = os.fork()
+
+        if pid == 0:
+            # child
+            os.close(r)
+            os.dup2(devnull, 0)
+
+            try:
+                output = trace_main(c, main, args)
+                payload = pack_run(output, c.data)
+                c.data.reset()
+
+                with os.fdopen(w, 'wb') as io:
+                    io.write(payload)
+            finally:
+                os._exit(0)
+
+        os.close(w)
+
+        ready, _, _ = select.select([r], [], [], timeout or None)
+
+        if ready:
+            payload = _read_all(r)
+            os.waitpid(pid, 0)
+            status = STATUS_OK if payload else STATUS_CRASH
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            payload = b''
+            status = STATUS_TIMEOUT
+
+        os.close(r)
+
+        if status != STATUS_OK:
+            # the child did not clear the buckets it wrote
+            c.data.reset(full=True)
+
+        return status, payload
+
+    serve_batches(req, resp, run_one)
+
+class WorkerStats:
+    '''
+    statistics of a server, across restarts
+    '''
+    def __init__(self):
+        self.n_execs: int = 0
+
+        # seconds spent waiting for responses
+        self.busy: float = 0
+
+        # no. of restarts after a crash, hang, RSS limit or recycle
+        self.n_respawns: int = 0
+
+    @property
+    def execs_per_sec(self) -> float:
+        return self.n_execs / self.busy if self.busy > 0 else 0
+
+    def __repr__(self) -> str:
+        return f'execs: {self.n_execs}, execs/s: {self.execs_per_sec:.1f}, respawns: {self.n_respawns}'
+
+class ForkServer:
+    '''
+    client of a fork server process
+    '''
+    _BOOTSTRAP: str = _BOOTSTRAP
+
+    # restart the server after an input times out or crashes. runs are forked, so the server is
+    # not affected
+    _RESTART_AFTER_ERROR: bool = False
+
+    def __init__(self, src: str, ctx: str, n_buckets: int, max_rss: int = None):
+        '''
+        Arguments:
+        ---
+        - src: entry point module
+        - ctx: context file
+        - n_buckets: no. of trace buckets
+        - max_rss: restart the server when its resident set size exceeds this many bytes. `None` for no limit.
+        '''
+        self._src = src
+        self._ctx = ctx
+        self._n_buckets = n_buckets
+        self._p: subprocess.Popen = None
+        self._shm: SharedBuckets = None
+        self._lock = Lock()
+
+        self.max_rss = max_rss
+        self.stats = WorkerStats()
+
+        # no. of executions by the current server process
+        self.n_execs: int = 0
+
+        # `True` once a server has been started, so later starts count as respawns
+        self._started: bool = False
+
+    @property
+    def alive(self) -> bool:
+        return self._p is not None and self._p.poll() is None
+
+    def start(self):
+        '''
+        launch fork server
+        '''
+        self._shm = SharedBuckets(self._n_buckets)
+
+        self._p = subprocess.Popen(
+            [sys.executable, '-c', self._BOOTSTRAP, self._src, self._ctx, self._shm.fname, *self._server_args()],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            # own process group, so a hung server can be killed with its children
+            start_new_session=True
+        )
+
+        self.n_execs = 0
+
+        if self._started:
+            self.stats.n_respawns += 1
+
+        self._started = True
+
+    def _server_args(self) -> list[str]:
+        '''
+        extra command line arguments passed to the server
+        '''
+        return []
+
+    def _should_recycle(self) -> bool:
+        '''
+        restart the server before the next execution if `True`
+        '''
+        return bool(self.max_rss) and self.alive and rss(self._p.pid) > self.max_rss
+
+    def close(self):
+        '''
+        terminate fork server
+        '''
+        if self._p is None:
+            return
+
+        try:
+            self._p.stdin.close()
+            self._p.wait(timeout=1)
+        except Exception:
+            self._p.kill()
+            self._p.wait()
+        finally:
+            self._p.stdout.close()
+            self._p = None
+
+            self._shm.close()
+            self._shm = None
+
+    def _kill(self):
+        '''
+        kill a hung server and its children. it is restarted on next call
+        '''
+        try:
+            os.killpg(self._p.pid, signal.SIGKILL)
+        except OSError:
+            self._p.kill()
+
+        self.close()
+
+    def _batch_limit(self) -> int:
+        '''
+        max. no. of inputs sent to the current server in one request
+        '''
+        return sys.maxsize
+
+    def _request(self, inputs: list[bytes], timeout: float) -> tuple[list[CoverageResult], Exception]:
+        '''
+        send one request to the server. must hold the lock.
+        '''
+        if not self.alive or self._should_recycle():
+            self.close()
+            self.start()
+
+        self.n_execs += len(inputs)
+        start = time.time()
+
+        try:
+            self._p.stdin.write(_REQ.pack(len(inputs), timeout or 0))
+
+            for args in inputs:
+                self._p.stdin.write(_LEN.pack(len(args)))
+                self._p.stdin.write(args)
+
+            self._p.stdin.flush()
+
+            # health check: a server which does not respond in time is hung, e.g. a
+            # persistent target stuck in native code where the alarm cannot fire
+            deadline = timeout and len(inputs) * timeout + HANG_GRACE
+            ready, _, _ = select.select([self._p.stdout], [], [], deadline or None)
+
+            if not ready:
+                self._kill()
+                return [], TimeoutError(f'server did not respond within {deadline} seconds')
+
+            header = _read_exact(self._p.stdout, _RESP.size)
+            status, n_done, n = _RESP.unpack(header)
+            payload = _read_exact(self._p.stdout, n)
+        except (OSError, TypeError, struct.error):
+            # fork server died. restart it on next call
+            self.close()
+            return [], ChildProcessError('fork server exited unexpectedly')
+        finally:
+            self.stats.busy += time.time() - start
+
+        results: list[CoverageResult] = []
+        pos = 0
+
+        for i in range(n_done):
+            n, = _LEN.unpack_from(payload, pos)
+            pos += _LEN.size
+
+            elapsed, exception = unpack_meta(payload[pos:(pos + n)])
+            pos += n
+
+            cov, cov_cksum, pos = unpack_cov(payload, pos)
+
+            self.stats.n_execs += 1
+
+            results.append(CoverageResult(
+                args=inputs[i],
+                cov=cov,
+                elapsed=elapsed,
+                exception=exception,
+                cov_cksum=cov_cksum
+            ))
+
+        error: Exception = None
+
+        if status == STATUS_TIMEOUT:
+            error = TimeoutError(f'execution timed out after {timeout} seconds')
+        elif status == STATUS_CRASH:
+            error = ChildProcessError('target exited without reporting coverage')
+
+        if error and self._RESTART_AFTER_ERROR:
+            self.close()
+
+        return results, error
+
+    def collect_batch(self, inputs: list[bytes], timeout: int = None) -> tuple[list[CoverageResult], Exception]:
+        '''
+        collect coverage data of a batch of inputs. stops at the first input which times out
+        or crashes.
+
+        Arguments:
+        ---
+        - inputs: inputs passed to <src>.main()
+        - timeout: timeout in seconds per input
+
+        Returns:
+        ---
+        - coverage data of the inputs completed, in order
+        - exception raised by input `len(results)`. `None` if all inputs completed.
+        '''
+        inputs = [bytes(args) for args in inputs]
+        results: list[CoverageResult] = []
+
+        with self._lock:
+            while len(results) < len(inputs):
+                limit = max(self._batch_limit(), 1)
+                chunk = inputs[len(results):(len(results) + limit)]
+
+                out, error = self._request(chunk, timeout)
+                results += out
+
+                if error:
+                    return results, error
+
+        return results, None
+
+    def collect(self, args: bytes, timeout: int = None) -> CoverageResult:
+        '''
+        collect coverage data in a forked process
+
+        Arguments:
+        ---
+        - args: input passed to <src>.main()
+        - timeout: timeout in seconds
+
+        Returns:
+        ---
+        - coverage data
+        '''
+        results, error = self.collect_batch([args], timeout=timeout)
+
+        if error:
+            raise error
+
+        return results[0]
@@ -0,0 +1,110 @@
+'''
+unit test for forkserver.py
+'''
+
+import unittest
+
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+from afl_fuzz.coverage_collector.forkserver import ForkServer
+from afl_fuzz.coverage_collector.pos_enc import MAX_BUCKETS
+from afl_fuzz.coverage_collector.result import EDGE_SHIFT
+
+TARGET = '''
+import time
+
+calls = []
+
+def main(args: bytes):
+    calls.append(args)
+
+    if len(calls) > 1:
+        raise RuntimeError('state leaked between runs')
+
+    if args == b'hang':
+        time.sleep(10)
+
+    if args == b'raise':
+        raise ValueError(args)
+
+    if args and args[0] == 0:
+        print('zero')
+    else:
+        print('non-zero')
+'''
+
+class fork_server_test(TargetTestCase):
+    '''
+    unit test for ForkServer
+    '''
+
+    target = 'fs_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        self.create_context().write('fs_target.ctx')
+        self.server = ForkServer('fs_target', 'fs_target.ctx', 1024)
+
+    def tearDown(self):
+        self.server.close()
+        super().tearDown()
+
+    def test_collect(self):
+        r0 = self.server.collect(bytes([0]))
+        r1 = self.server.collect(bytes([1]))
+
+        self.assertIsNone(r0.exception)
+        self.assertIsNone(r1.exception)
+        self.assertGreater(r0.bitmap_size, 0)
+        self.assertNotEqual(r0.cov_cksum, r1.cov_cksum)
+        self.assertEqual(r0.cov_cksum, self.server.collect(bytes([0])).cov_cksum)
+
+    def test_exception(self):
+        r = self.server.collect(b'raise')
+
+        self.assertEqual(r.exception['name'], 'ValueError')
+
+    def test_timeout(self):
+        r = self.server.collect(bytes([0]))
+
+        with self.assertRaises(TimeoutError):
+            self.server.collect(b'hang', timeout=0.2)
+
+        # server survives a timed out child, and clears the buckets it wrote
+        self.assertIsNone(self.server.collect(bytes([0])).exception)
+        self.assertEqual(self.server.collect(bytes([0])).cov_cksum, r.cov_cksum)
+
+    def test_large_map(self):
+        self.create_context(MAX_BUCKETS).write('fs_large.ctx')
+        server = ForkServer('fs_target', 'fs_large.ctx', MAX_BUCKETS)
+
+        try:
+            r0 = server.collect(bytes([0]))
+            r1 = server.collect(bytes([0]))
+        finally:
+            server.close()
+
+        self.assertEqual(r0.cov, r1.cov)
+        self.assertGreater(max(r0.cov) >> EDGE_SHIFT, 1024)
+        self.assertLess(max(r0.cov) >> EDGE_SHIFT, MAX_BUCKETS)
+
+    def test_batch(self):
+        inputs = [bytes([0]), bytes([1]), b'raise', bytes([0])]
+        results, error = self.server.collect_batch(inputs)
+
+        self.assertIsNone(error)
+        self.assertEqual([r.args for r in results], inputs)
+        self.assertEqual(results[2].exception['name'], 'ValueError')
+        self.assertEqual(results[0].cov_cksum, results[3].cov_cksum)
+        self.assertEqual(results[0].cov_cksum, self.server.collect(bytes([0])).cov_cksum)
+
+    def test_batch_timeout(self):
+        results, error = self.server.collect_batch([bytes([0]), b'hang', bytes([1])], timeout=0.2)
+
+        # stops at the input which timed out
+        self.assertIsInstance(error, TimeoutError)
+        self.assertEqual(len(results), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+'''
+harness of spawned processes.
+
+usage: python -m afl_fuzz.coverage_collector.harness <entry point module> <context file> <shared buckets file>
+
+reads the input from stdin, writes hitcounts into the shared buckets and run metadata to stdout.
+the harness is a fixed module so its bytecode is cached, and the cost of starting it does not
+depend on the input size.
+'''
+
+import importlib
+import os
+import sys
+
+def run_harness(src: str, ctx: str, shm: str):
+    '''
+    trace `<src>.main(<stdin>)`
+
+    Arguments:
+    ---
+    - src: entry point module
+    - ctx: context file
+    - shm: shared buckets filename
+    '''
+    from afl_fuzz.coverage_collector.context import Context
+    from afl_fuzz.coverage_collector.backend import create_backend
+    from afl_fuzz.coverage_collector.ipc import SharedBuckets, pack_meta
+    from afl_fuzz.coverage_collector.process import trace_main
+
+    args = sys.stdin.buffer.read()
+
+    # metadata goes to stdout, anything the target prints goes to /dev/null
+    meta = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    Context.read(ctx)
+    c = create_backend(Context.get().backend, SharedBuckets(Context.get().n_buckets, shm).buf)
+
+    def run(args: bytes):
+        # the entry point is imported under tracing
+        importlib.import_module(src).main(args)
+
+    output = trace_main(c, run, args)
+
+    meta.write(pack_meta(output['elapsed'], output['exception']))
+    meta.flush()
+
+if __name__ == '__main__':
+    run_harness(*sys.argv[1:])
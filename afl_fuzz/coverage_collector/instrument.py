@@ -0,0 +1,263 @@
+'''
+instrumentation backend.
+
+encoded files are rewritten at import time, so no trace callback is needed. before each
+statement with a marker, the rewriter inserts
+
+```
+__afl_map__[__afl_prev__[0] ^ (marker & mask)] += 1
+__afl_prev__[0] = (marker >> 1) & mask
+```
+
+where `mask` is the no. of buckets - 1, so the bucket of `prev -> marker` is the same as
+`Hitcount.add` gives, with both constants masked at rewrite time. `__afl_map__` is a dict of
+the buckets hit, so resetting and reading it costs the same on any no. of buckets.
+
+the instrumented code is cached on disk, keyed by the source, the markers of the file and
+the no. of buckets. cached code is run by the target, so the cache is a directory of the current
+user which others cannot write to, and is not used otherwise.
+'''
+
+import os
+import sys
+import ast
+import marshal
+import hashlib
+import stat
+from collections import defaultdict
+from types import CodeType, ModuleType
+from typing import MutableSequence, Sequence
+from importlib.abc import MetaPathFinder
+from importlib.machinery import ModuleSpec, PathFinder, SourceFileLoader
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.pos_enc import Hitcount, line_marker
+from afl_fuzz.coverage_collector.backend import ITraceBackend
+
+# instrumented code cache, per user. `None`, or `AFL_FUZZ_NO_CODE_CACHE` set in the environment of
+# the target, to disable it
+CACHE_DIR: str = None if os.environ.get('AFL_FUZZ_NO_CODE_CACHE') else os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'afl_fuzz', 'instrument'
+)
+
+# bump when the rewrite changes, to invalidate the cache
+_REWRITE_VERSION: int = 2
+
+# globals injected into instrumented modules. dunder names are neither mangled in class
+# bodies nor restored by persistent mode
+MAP_NAME: str = '__afl_map__'
+PREV_NAME: str = '__afl_prev__'
+
+def _private_dir(path: str) -> bool:
+    '''
+    create a directory which only the current user can access, if missing
+
+    Returns:
+    ---
+    - whether the directory is owned by the current user, and others cannot write to it
+    '''
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+    except OSError:
+        return False
+
+    owned = not hasattr(os, 'getuid') or st.st_uid == os.getuid()
+
+    return stat.S_ISDIR(st.st_mode) and owned and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+def _is_docstring(stmt: ast.stmt) -> bool:
+    return isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str)
+
+def _is_future(stmt: ast.stmt) -> bool:
+    return isinstance(stmt, ast.ImportFrom) and stmt.module == '__future__'
+
+class _Instrumenter(ast.NodeTransformer):
+    '''
+    insert a counter update before each statement with a marker
+    '''
+    def __init__(self, file_pe: Sequence[int], n_buckets: int):
+        self._pe = file_pe
+        self._mask = n_buckets - 1
+
+    def _counter(self, stmt: ast.stmt, marker: int) -> list[ast.stmt]:
+        counter = ast.parse(
+            f'{MAP_NAME}[{PREV_NAME}[0] ^ {marker & self._mask}] += 1\n'
+            f'{PREV_NAME}[0] = {(marker >> 1) & self._mask}'
+        ).body
+
+        for node in counter:
+            ast.copy_location(node, stmt)
+
+        return counter
+
+    def _marker(self, stmt: ast.stmt) -> int:
+        pe = line_marker(self._pe, stmt.lineno)
+
+        # coverage.py may place a decorated definition on its first decorator
+        if not pe and getattr(stmt, 'decorator_list', None):
+            pe = line_marker(self._pe, stmt.decorator_list[0].lineno)
+
+        return pe
+
+    def _body(self, body: list[ast.stmt], has_docstring: bool) -> list[ast.stmt]:
+        out: list[ast.stmt] = []
+
+        for i, stmt in enumerate(body):
+            pe = self._marker(stmt)
+
+            # docstrings and __future__ imports must stay first
+            if pe and not (i == 0 and has_docstring) and not _is_future(stmt):
+                out += self._counter(stmt, pe)
+
+            out.append(stmt)
+
+        return out
+
+    def generic_visit(self, node: ast.AST) -> ast.AST:
+        super().generic_visit(node)
+
+        can_have_docstring = isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, list) and value and isinstance(value[0], ast.stmt):
+                has_docstring = field == 'body' and can_have_docstring and _is_docstring(value[0])
+                setattr(node, field, self._body(value, has_docstring))
+
+        return node
+
+def instrument(src: bytes, path: str, file_pe: Sequence[int], n_buckets: int) -> CodeType:
+    '''
+    compile instrumented source
+
+    Arguments:
+    ---
+    - src: source
+    - path: filename
+    - file_pe: positional encoding of the file
+    - n_buckets: no. of trace buckets
+
+    Returns:
+    ---
+    - code object of the module
+    '''
+    tree = _Instrumenter(file_pe, n_buckets).visit(ast.parse(src, path))
+    ast.fix_missing_locations(tree)
+
+    return compile(tree, path, 'exec', dont_inherit=True)
+
+class InstrumentingLoader(SourceFileLoader):
+    '''
+    load an encoded file with instrumentation
+    '''
+    def __init__(self, fullname: str, path: str, backend: 'InstrumentBackend'):
+        super().__init__(fullname, path)
+        self._backend = backend
+
+    def get_code(self, fullname: str) -> CodeType:
+        src = self.get_data(self.path)
+        file_pe = self._backend.file_pe(self.path)
+        n_buckets = self._backend.data._n
+
+        if not CACHE_DIR or not _private_dir(CACHE_DIR):
+            return instrument(src, self.path, file_pe, n_buckets)
+
+        key = hashlib.sha256(src)
+        key.update(file_pe)
+        key.update(f'{n_buckets}:{_REWRITE_VERSION}:{sys.version}'.encode())
+
+        cached = os.path.join(CACHE_DIR, f'{key.hexdigest()}.bin')
+
+        try:
+            with open(cached, 'rb') as f:
+                return marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        code = instrument(src, self.path, file_pe, n_buckets)
+
+        try:
+            # write and rename, so that concurrent workers never read a partial file
+            tmp = f'{cached}.{os.getpid()}'
+
+            with open(tmp, 'wb') as f:
+                marshal.dump(code, f)
+
+            os.replace(tmp, cached)
+        except OSError:
+            pass
+
+        return code
+
+    def exec_module(self, module: ModuleType):
+        setattr(module, MAP_NAME, self._backend.counts)
+        setattr(module, PREV_NAME, self._backend.prev)
+
+        super().exec_module(module)
+
+class InstrumentingFinder(MetaPathFinder):
+    '''
+    find modules in encoded files, and load them with `InstrumentingLoader`
+    '''
+    def __init__(self, backend: 'InstrumentBackend'):
+        self._backend = backend
+
+    def find_spec(self, fullname: str, path: Sequence[str] = None, target: ModuleType = None) -> ModuleSpec:
+        spec = PathFinder.find_spec(fullname, path, target)
+
+        if spec is None or not isinstance(spec.loader, SourceFileLoader):
+            return None
+
+        if not self._backend.file_pe(spec.origin):
+            return None
+
+        spec.loader = InstrumentingLoader(fullname, spec.origin, self._backend)
+
+        return spec
+
+class InstrumentBackend(ITraceBackend):
+    '''
+    instrumentation backend. modules imported after it is created are instrumented.
+
+    counters are only folded into `data` for the code executed between `start()` and `stop()`.
+    '''
+    def __init__(self, buckets: MutableSequence[int] = None):
+        '''
+        Arguments:
+        ---
+        - buckets: buffer the hitcounts are written into. a new one if `None`
+        '''
+        ctx = Context.get()
+
+        self.data = Hitcount(ctx.n_buckets, buckets)
+
+        # encoded files by real path
+        self._pe = { os.path.realpath(f): pe for f, pe in ctx._pe.items() }
+
+        # shared by all instrumented modules. bucket -> no. of hits
+        self.counts: defaultdict[int, int] = defaultdict(int)
+        self.prev: list[int] = [0]
+
+        self._running: bool = False
+
+        sys.meta_path.insert(0, InstrumentingFinder(self))
+
+    def file_pe(self, path: str) -> Sequence[int]:
+        '''
+        positional encoding of a file. `None` if not encoded.
+        '''
+        return self._pe.get(os.path.realpath(path))
+
+    def start(self):
+        self.counts.clear()
+        self.prev[0] = 0
+        self._running = True
+
+    def stop(self):
+        if not self._running:
+            return
+
+        self._running = False
+
+        for i, n in self.counts.items():
+            self.data.add_hits(i, n)
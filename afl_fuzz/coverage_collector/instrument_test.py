@@ -0,0 +1,102 @@
+'''
+unit test for instrument.py
+'''
+
+import os
+import sys
+import importlib
+import unittest
+
+from afl_fuzz.coverage_collector import instrument
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.backend import create_backend
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+
+TARGET = '''\'\'\'
+module docstring
+\'\'\'
+from __future__ import annotations
+
+def check(x: int) -> int:
+    \'\'\'
+    function docstring
+    \'\'\'
+    if x > 3:
+        return 1
+
+    return 0
+
+def main(args: bytes):
+    total = 0
+
+    for b in args:
+        total += check(b)
+
+    return total
+'''
+
+class instrument_backend_test(TargetTestCase):
+    '''
+    unit test for InstrumentBackend
+    '''
+
+    target = 'ins_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+        Context._instance = self.create_context()
+
+    def tearDown(self):
+        sys.meta_path[:] = [f for f in sys.meta_path if not isinstance(f, instrument.InstrumentingFinder)]
+        sys.modules.pop('ins_target', None)
+        super().tearDown()
+
+    def trace(self, inputs: list[bytes]) -> list[bytes]:
+        sys.modules.pop('ins_target', None)
+
+        c = create_backend('instrument')
+        target = importlib.import_module('ins_target')
+        bitmaps = []
+
+        self.assertEqual(target.__doc__.strip(), 'module docstring')
+        self.assertEqual(target.check.__doc__.strip(), 'function docstring')
+
+        for args in inputs:
+            c.data.reset()
+            c.start()
+            target.main(args)
+            c.stop()
+
+            c.data.bin()
+            bitmaps.append(bytes(c.data._buckets))
+
+        return bitmaps
+
+    def test_trace(self):
+        inputs = [b'', b'\x00', b'\x00\x01', b'\x09']
+        bitmaps = self.trace(inputs)
+
+        self.assertNotEqual(bitmaps[0], bytes(1024))
+        self.assertNotEqual(bitmaps[1], bitmaps[2])
+        self.assertNotEqual(bitmaps[1], bitmaps[3])
+
+        # the second import loads the cached code
+        self.assertEqual(len(os.listdir(instrument.CACHE_DIR)), 1)
+        self.assertEqual(self.trace(inputs), bitmaps)
+        self.assertEqual(len(os.listdir(instrument.CACHE_DIR)), 1)
+
+    def test_shared_cache(self):
+        os.makedirs(instrument.CACHE_DIR)
+        os.chmod(instrument.CACHE_DIR, 0o777)
+
+        # others can write to the cache, so it is not used
+        bitmaps = self.trace([b'\x09'])
+
+        self.assertEqual(os.listdir(instrument.CACHE_DIR), [])
+
+        instrument.CACHE_DIR = None
+        self.assertEqual(self.trace([b'\x09']), bitmaps)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+'''
+data shared between an executor and the traced process
+'''
+
+import os
+import mmap
+import struct
+import sys
+import tempfile
+from uuid import uuid4
+from array import array
+from typing import Union
+
+from afl_fuzz.coverage_collector.result import cksum, to_edges
+
+# shared memory is a tmpfs on linux. fall back to temp dir elsewhere
+SHM_DIR: str = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+# elapsed, has exception
+_META = struct.Struct('<d?')
+_STR_LEN = struct.Struct('<I')
+
+# no. of edges, checksum
+_COV = struct.Struct('<IQ')
+
+class SharedBuckets:
+    '''
+    coverage buckets in shared memory. the executor creates it and the traced process
+    attaches to it by filename, then writes the hitcounts into it directly.
+    '''
+    def __init__(self, n_buckets: int, fname: str = None):
+        '''
+        Arguments:
+        ---
+        - n_buckets: no. of buckets
+        - fname: attach to an existing file if set. else create a new one.
+        '''
+        self._n = n_buckets
+        self._owner = fname is None
+        self.fname = fname or os.path.join(SHM_DIR, f'afl-{uuid4()}.cov')
+
+        with open(self.fname, 'w+b' if self._owner else 'r+b') as f:
+            if self._owner:
+                f.truncate(n_buckets)
+
+            self._mm = mmap.mmap(f.fileno(), n_buckets)
+
+        self.buf = memoryview(self._mm)
+
+    def read(self) -> bytes:
+        '''
+        copy buckets
+        '''
+        return self.buf.tobytes()
+
+    def clear(self):
+        '''
+        set all buckets to 0
+        '''
+        self.buf[:] = bytes(self._n)
+
+    def close(self):
+        '''
+        unmap. delete the file if this instance created it
+        '''
+        if self._mm is None:
+            return
+
+        self.buf.release()
+        self._mm.close()
+        self._mm = None
+
+        if self._owner and os.path.exists(self.fname):
+            os.remove(self.fname)
+
+def pack_meta(elapsed: float, exception: Union[dict[str, str], None]) -> bytes:
+    '''
+    serialize run metadata
+
+    Arguments:
+    ---
+    - elapsed: run time
+    - exception: exception if any
+
+    Returns:
+    ---
+    - bytes
+    '''
+    out = bytearray(_META.pack(elapsed, exception is not None))
+
+    if exception is not None:
+        for k in ['name', 'message', 'stacktrace']:
+            s = exception[k].encode('utf-8', errors='replace')
+            out += _STR_LEN.pack(len(s))
+            out += s
+
+    return bytes(out)
+
+def unpack_meta(payload: bytes) -> tuple[float, Union[dict[str, str], None]]:
+    '''
+    deserialize run metadata
+
+    Returns:
+    ---
+    - run time, exception
+    '''
+    elapsed, has_exception = _META.unpack_from(payload)
+
+    if not has_exception:
+        return elapsed, None
+
+    exception = dict()
+    pos = _META.size
+
+    for k in ['name', 'message', 'stacktrace']:
+        n, = _STR_LEN.unpack_from(payload, pos)
+        pos += _STR_LEN.size
+        exception[k] = payload[pos:(pos + n)].decode('utf-8')
+        pos += n
+
+    return elapsed, exception
+
+def pack_cov(buckets: bytes) -> bytes:
+    '''
+    serialize buckets as an edge list and its checksum. traces usually touch a small fraction
+    of the buckets, so this is much smaller than the buckets, and the executor only copies it.
+
+    Arguments:
+    ---
+    - buckets: binned hitcounts
+
+    Returns:
+    ---
+    - bytes
+    '''
+    edges = to_edges(buckets)
+
+    return pack_edges(edges, cksum(edges))
+
+def pack_edges(edges: array, cov_cksum: int) -> bytes:
+    '''
+    serialize an edge list and its checksum, for `unpack_cov`. little-endian, as it is also sent
+    between hosts
+
+    Arguments:
+    ---
+    - edges: edge list, see `to_edges`
+    - cov_cksum: checksum of the edge list
+
+    Returns:
+    ---
+    - bytes
+    '''
+    if sys.byteorder != 'little':
+        edges = array('I', edges)
+        edges.byteswap()
+
+    return _COV.pack(len(edges), cov_cksum) + edges.tobytes()
+
+def unpack_cov(payload: bytes, pos: int = 0) -> tuple[array, int, int]:
+    '''
+    deserialize buckets
+
+    Arguments:
+    ---
+    - payload: buffer
+    - pos: offset in buffer
+
+    Returns:
+    ---
+    - edge list, see `to_edges`. its checksum. offset after the serialized buckets
+    '''
+    n, cov_cksum = _COV.unpack_from(payload, pos)
+    pos += _COV.size
+
+    edges = array('I')
+    end = pos + n * edges.itemsize
+    edges.frombytes(payload[pos:end])
+
+    if sys.byteorder != 'little':
+        edges.byteswap()
+
+    return edges, cov_cksum, end
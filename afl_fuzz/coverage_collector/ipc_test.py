@@ -0,0 +1,61 @@
+'''
+unit test for ipc.py
+'''
+
+import os
+import struct
+import unittest
+
+from afl_fuzz.coverage_collector.ipc import SharedBuckets, pack_meta, unpack_meta, pack_cov, pack_edges, unpack_cov
+from afl_fuzz.coverage_collector.result import cksum, to_edges
+
+class shared_buckets_test(unittest.TestCase):
+    '''
+    unit test for SharedBuckets
+    '''
+
+    def test_attach(self):
+        owner = SharedBuckets(16)
+        other = SharedBuckets(16, owner.fname)
+
+        other.buf[3] = 7
+        self.assertEqual(owner.read()[3], 7)
+
+        owner.clear()
+        self.assertEqual(other.read(), bytes(16))
+
+        other.close()
+        self.assertTrue(os.path.exists(owner.fname))
+
+        owner.close()
+        self.assertFalse(os.path.exists(owner.fname))
+
+class meta_test(unittest.TestCase):
+    '''
+    unit test for pack_meta and unpack_meta
+    '''
+
+    def test(self):
+        buckets = bytearray(64)
+        buckets[0] = 1
+        buckets[10:13] = b'\x02\x03\x04'
+        buckets[63] = 8
+
+        payload = b'xx' + pack_cov(buckets) + b'yy'
+        cov, cov_cksum, pos = unpack_cov(payload, 2)
+
+        self.assertEqual(list(cov), [(0 << 8) | 1, (10 << 8) | 2, (11 << 8) | 4, (12 << 8) | 8, (63 << 8) | 128])
+        self.assertEqual(cov, to_edges(buckets))
+        self.assertEqual(cov_cksum, cksum(cov))
+        self.assertEqual(payload[pos:], b'yy')
+
+        self.assertEqual(len(unpack_cov(pack_cov(bytes(64)))[0]), 0)
+
+    def test_byte_order(self):
+        edges = to_edges(b'\x01\x00\x02')
+
+        # sent between hosts, so independent of the native byte order
+        self.assertEqual(pack_edges(edges, 7), struct.pack('<IQII', 2, 7, (0 << 8) | 1, (2 << 8) | 2))
+
+if __name__ == '__main__':
+    unittest.main()
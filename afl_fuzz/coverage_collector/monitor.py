@@ -0,0 +1,163 @@
+'''
+lossy tracer on `sys.monitoring` (python 3.12+).
+
+records the same edges as `PyTracer` in tracer.py, without a python callback for code
+outside the context:
+
+- `PY_START` and `PY_RESUME` are global. they return `DISABLE` in code objects of files
+  without positional encoding, so those code objects never raise an event again.
+- `LINE`, `JUMP`, `PY_RETURN` and `PY_YIELD` are registered on the code objects of encoded files only.
+- `LINE` returns `DISABLE` on lines without a marker, which never change the trace.
+- `JUMP` is only needed for backward jumps within a line (e.g. `for i in x: f(i)`), which
+  `sys.settrace` reports as a 'line' event. other jumps return `DISABLE`.
+- `PY_UNWIND` (a frame exited by an exception) can only be global, and is ignored outside
+  encoded files.
+'''
+
+import sys
+from types import CodeType
+from typing import MutableSequence, Sequence
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.pos_enc import Hitcount, line_marker
+from afl_fuzz.coverage_collector.backend import ITraceBackend
+
+monitoring = getattr(sys, 'monitoring', None)
+
+if monitoring:
+    DISABLE = monitoring.DISABLE
+    TOOL_ID: int = monitoring.COVERAGE_ID
+
+    _events = monitoring.events
+
+    GLOBAL_EVENTS: int = _events.PY_START | _events.PY_RESUME | _events.PY_UNWIND
+    LOCAL_EVENTS: int = _events.LINE | _events.JUMP | _events.PY_RETURN | _events.PY_YIELD
+
+def _offset_lines(code: CodeType) -> dict[int, int]:
+    '''
+    map bytecode offset to line number
+    '''
+    lines: dict[int, int] = dict()
+
+    for start, end, line in code.co_lines():
+        for offset in range(start, end, 2):
+            lines[offset] = line
+
+    return lines
+
+class MonitoringBackend(ITraceBackend):
+    '''
+    `sys.monitoring` backend
+    '''
+    def __init__(self, buckets: MutableSequence[int] = None):
+        '''
+        Arguments:
+        ---
+        - buckets: buffer the hitcounts are written into. a new one if `None`
+        '''
+        if not monitoring:
+            raise RuntimeError('sys.monitoring requires python 3.12+')
+
+        ctx = Context.get()
+
+        self.data = Hitcount(ctx.n_buckets, buckets)
+        self._pe = ctx._pe
+
+        # id of code objects with local events -> (code object, positional encoding of file, offset to line).
+        # keyed by id because code objects compare by value, e.g. the code of a reloaded module
+        # equals the old one but has no local events. the code object is kept so that its id is not reused.
+        self._codes: dict[int, tuple[CodeType, Sequence[int], dict[int, int]]] = dict()
+
+        self.last_line: int = 0
+        self.data_stack: list[int] = []
+
+        if monitoring.get_tool(TOOL_ID) != 'afl_fuzz':
+            monitoring.use_tool_id(TOOL_ID, 'afl_fuzz')
+
+        monitoring.register_callback(TOOL_ID, _events.PY_START, self._on_start)
+        monitoring.register_callback(TOOL_ID, _events.PY_RESUME, self._on_start)
+        monitoring.register_callback(TOOL_ID, _events.LINE, self._on_line)
+        monitoring.register_callback(TOOL_ID, _events.JUMP, self._on_jump)
+        monitoring.register_callback(TOOL_ID, _events.PY_RETURN, self._on_return)
+        monitoring.register_callback(TOOL_ID, _events.PY_YIELD, self._on_return)
+        monitoring.register_callback(TOOL_ID, _events.PY_UNWIND, self._on_unwind)
+
+    def start(self):
+        # fresh data stack, like coverage.py rebuilding `PyTracer` on every start
+        self.last_line = 0
+        self.data_stack = []
+
+        monitoring.set_events(TOOL_ID, GLOBAL_EVENTS)
+
+    def stop(self):
+        # local events stay registered, so persistent servers do not re-instrument the target
+        # on every run. encoded code which runs between `stop()` and the next `reset()` of
+        # `data` is recorded.
+        monitoring.set_events(TOOL_ID, _events.NO_EVENTS)
+
+    def _on_start(self, code: CodeType, offset: int):
+        '''
+        entering a frame, same as 'call' in `PyTracer`
+        '''
+        entry = self._codes.get(id(code))
+
+        if entry is None:
+            file_pe = self._pe.get(code.co_filename)
+
+            if not file_pe:
+                return DISABLE
+
+            entry = self._codes[id(code)] = (code, file_pe, _offset_lines(code))
+            monitoring.set_local_events(TOOL_ID, code, LOCAL_EVENTS)
+
+        _, file_pe, lines = entry
+
+        # module code starts at line 0
+        pe = line_marker(file_pe, lines.get(offset) or code.co_firstlineno)
+
+        self.data_stack.append(self.last_line)
+
+        if self.last_line != 0 and pe:
+            self.data.add(self.last_line, pe)
+
+        self.last_line = 0
+
+    def _on_line(self, code: CodeType, line: int):
+        pe = line_marker(self._codes[id(code)][1], line)
+
+        if not pe:
+            return DISABLE
+
+        if self.last_line != 0:
+            self.data.add(self.last_line, pe)
+
+        self.last_line = pe >> 1
+
+    def _on_jump(self, code: CodeType, src: int, dst: int):
+        if dst > src:
+            return DISABLE
+
+        lines = self._codes[id(code)][2]
+        line = lines.get(dst)
+
+        if line is None or line != lines.get(src):
+            # a new line. handled by `LINE`
+            return DISABLE
+
+        return self._on_line(code, line)
+
+    def _on_return(self, code: CodeType, offset: int, _):
+        '''
+        leaving a frame, same as 'return' in `PyTracer`
+        '''
+        if not self.data_stack:
+            return
+
+        if self.last_line != 0:
+            self.data.add(self.last_line, self.data_stack[-1])
+
+        self.last_line = self.data_stack.pop()
+
+    def _on_unwind(self, code: CodeType, offset: int, exception: BaseException):
+        if id(code) in self._codes:
+            self._on_return(code, offset, exception)
@@ -0,0 +1,78 @@
+'''
+unit test for monitor.py
+'''
+
+import sys
+import importlib
+import unittest
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.backend import create_backend
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+
+TARGET = '''
+def gen(n):
+    for i in range(n): yield i
+
+def check(x):
+    if x > 3:
+        raise ValueError(x)
+
+def main(args: bytes):
+    total = sum([i for i in gen(len(args))])
+
+    for b in args:
+        if b % 2:
+            total += 1
+
+    try:
+        check(total)
+    except ValueError:
+        total = 0
+
+    return total
+'''
+
+@unittest.skipUnless(hasattr(sys, 'monitoring'), 'requires python 3.12+')
+class monitoring_backend_test(TargetTestCase):
+    '''
+    unit test for MonitoringBackend
+    '''
+
+    target = 'mon_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        Context._instance = self.create_context()
+        self.main = importlib.import_module('mon_target').main
+
+    def tearDown(self):
+        sys.modules.pop('mon_target', None)
+        super().tearDown()
+
+    def trace(self, backend: str, inputs: list[bytes]) -> list[bytes]:
+        c = create_backend(backend)
+        bitmaps = []
+
+        for args in inputs:
+            c.data.reset()
+            c.start()
+            self.main(args)
+            c.stop()
+
+            c.data.bin()
+            bitmaps.append(bytes(c.data._buckets))
+
+        return bitmaps
+
+    def test_same_as_settrace(self):
+        inputs = [b'', b'\x00', b'\x01\x02', b'\x01\x03\x05\x07\x09']
+        bitmaps = self.trace('monitoring', inputs)
+
+        self.assertEqual(bitmaps, self.trace('settrace', inputs))
+        self.assertNotEqual(bitmaps[1], bitmaps[3])
+
+if __name__ == '__main__':
+    unittest.main()
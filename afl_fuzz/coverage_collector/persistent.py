@@ -0,0 +1,199 @@
+'''
+persistent mode.
+
+a long-lived process which imports the entry point once and calls `main` in a loop,
+resetting the tracer state and restoring module globals between iterations.
+'''
+
+import os
+import sys
+import copy
+import signal
+import importlib
+from types import ModuleType, FunctionType, BuiltinFunctionType
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.process import trace_main
+from afl_fuzz.coverage_collector.forkserver import (
+    ForkServer,
+    setup_server, 
+    serve_batches, 
+    pack_run,
+    STATUS_OK, 
+    STATUS_TIMEOUT, 
+    STATUS_CRASH
+)
+
+_BOOTSTRAP = 'import sys; from afl_fuzz.coverage_collector.persistent import serve; serve(*sys.argv[1:])'
+
+# no. of iterations before the server is restarted
+DEFAULT_MAX_ITERS: int = 1000
+
+# how module state is restored between iterations:
+# - 'none': do not restore. only for targets without global state
+# - 'deepcopy': deep copy globals of traced modules after import, restore the copy after each iteration
+# - 'reload': re-execute the body of the entry point module after each iteration
+RESTORE_MODES: list[str] = ['none', 'deepcopy', 'reload']
+DEFAULT_RESTORE: str = 'deepcopy'
+
+class _Timeout(BaseException):
+    '''
+    raised by the alarm handler. derived from `BaseException` so that `except Exception`
+    in the target does not swallow it.
+    '''
+    pass
+
+def _on_alarm(*_):
+    raise _Timeout()
+
+def _is_static(name: str, val) -> bool:
+    '''
+    `True` if a global does not need to be restored
+    '''
+    return name.startswith('__') or isinstance(val, (ModuleType, FunctionType, BuiltinFunctionType, type))
+
+class ModuleSnapshot:
+    '''
+    snapshot of module globals
+    '''
+    def __init__(self, modules: list[ModuleType]):
+        '''
+        Arguments:
+        ---
+        - modules: modules to snapshot
+        '''
+        self._snapshot: list[tuple[dict, set[str], dict]] = []
+
+        for m in modules:
+            d = vars(m)
+            saved = dict()
+
+            for k, v in d.items():
+                if _is_static(k, v):
+                    continue
+
+                try:
+                    saved[k] = copy.deepcopy(v)
+                except Exception:
+                    # not copyable (e.g. locks, open files). keep the reference
+                    continue
+
+            self._snapshot.append((d, set(d.keys()), saved))
+
+    def restore(self):
+        '''
+        restore module globals to the snapshot
+        '''
+        for d, keys, saved in self._snapshot:
+            # drop globals created by the last iteration
+            for k in [k for k in d.keys() if k not in keys]:
+                del d[k]
+
+            for k, v in saved.items():
+                d[k] = copy.deepcopy(v)
+
+def traced_modules() -> list[ModuleType]:
+    '''
+    loaded modules with positional encoding in the current context
+    '''
+    files = set(os.path.realpath(f) for f in Context.get()._pe.keys())
+
+    return [
+        m for m in list(sys.modules.values())
+        if isinstance(getattr(m, '__file__', None), str) and os.path.realpath(m.__file__) in files
+    ]
+
+def serve(src: str, ctx: str, shm: str, restore: str = DEFAULT_RESTORE):
+    '''
+    persistent server main loop. reads requests from stdin and writes responses to stdout.
+
+    Arguments:
+    ---
+    - src: entry point module
+    - ctx: context file
+    - shm: shared buckets filename
+    - restore: restore mode, see `RESTORE_MODES`
+    '''
+    req, resp, _, module, c = setup_server(src, ctx, shm)
+    main = module.main
+
+    snapshot = ModuleSnapshot(traced_modules()) if restore == 'deepcopy' else None
+
+    signal.signal(signal.SIGALRM, _on_alarm)
+
+    def run_one(args: bytes, timeout: float) -> tuple[int, bytes]:
+        nonlocal module, main
+
+        # fresh buckets. the tracer and its data stack are rebuilt by `c.start()`
+        c.data.reset()
+
+        try:
+            signal.setitimer(signal.ITIMER_REAL, timeout or 0)
+
+            try:
+                output = trace_main(c, main, args)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+            payload = pack_run(output, c.data)
+            status = STATUS_OK
+        except BaseException as ex:
+            # timeout, or `main` raised something `trace_main` does not catch
+            c.stop()
+
+            payload = b''
+            status = STATUS_TIMEOUT if isinstance(ex, _Timeout) else STATUS_CRASH
+
+        if snapshot:
+            snapshot.restore()
+        elif restore == 'reload':
+            module = importlib.reload(module)
+            main = module.main
+
+        return status, payload
+
+    serve_batches(req, resp, run_one)
+
+class PersistentServer(ForkServer):
+    '''
+    client of a persistent server process. the server is restarted after an input times out or
+    crashes, since the aborted iteration may leave state behind which restoring globals misses
+    '''
+    _BOOTSTRAP: str = _BOOTSTRAP
+    _RESTART_AFTER_ERROR: bool = True
+
+    def __init__(
+        self, 
+        src: str, 
+        ctx: str, 
+        n_buckets: int, 
+        max_iters: int = DEFAULT_MAX_ITERS, 
+        restore: str = DEFAULT_RESTORE,
+        max_rss: int = None
+    ):
+        '''
+        Arguments:
+        ---
+        - src: entry point module
+        - ctx: context file
+        - n_buckets: no. of trace buckets
+        - max_iters: no. of iterations before the server is restarted
+        - restore: how module state is restored between iterations, see `RESTORE_MODES`
+        - max_rss: restart the server when its resident set size exceeds this many bytes. `None` for no limit.
+        '''
+        super().__init__(src, ctx, n_buckets, max_rss=max_rss)
+
+        if restore not in RESTORE_MODES:
+            raise ValueError(f'unknown restore mode {restore}. expected one of {RESTORE_MODES}')
+
+        self.max_iters = max_iters
+        self.restore = restore
+
+    def _server_args(self) -> list[str]:
+        return [self.restore]
+
+    def _should_recycle(self) -> bool:
+        return self.n_execs >= self.max_iters or super()._should_recycle()
+
+    def _batch_limit(self) -> int:
+        return self.max_iters - self.n_execs if self.alive else self.max_iters
@@ -0,0 +1,134 @@
+'''
+unit test for persistent.py
+'''
+
+import unittest
+
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+from afl_fuzz.coverage_collector.persistent import PersistentServer
+
+TARGET = '''
+import time
+
+calls = []
+
+def main(args: bytes):
+    calls.append(args)
+
+    if len(calls) > 1:
+        raise RuntimeError('state leaked between runs')
+
+    if args == b'hang':
+        while True:
+            pass
+
+    if args == b'block':
+        # the alarm cannot interrupt this. imported here to keep signal.py out of the context
+        signal = __import__('signal')
+        signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+
+        while True:
+            pass
+
+    if args == b'exit':
+        raise SystemExit()
+
+    if args and args[0] == 0:
+        print('zero')
+    else:
+        print('non-zero')
+'''
+
+class persistent_server_test(TargetTestCase):
+    '''
+    unit test for PersistentServer
+    '''
+
+    target = 'ps_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+        self.create_context().write('ps_target.ctx')
+
+    def run_inputs(self, server: PersistentServer, inputs: list[bytes]):
+        try:
+            return [server.collect(args, timeout=1) for args in inputs]
+        finally:
+            server.close()
+
+    def test_restore(self):
+        for restore in ['deepcopy', 'reload']:
+            r0, r1, r2 = self.run_inputs(PersistentServer('ps_target', 'ps_target.ctx', 1024, restore=restore), [bytes([0]), bytes([1]), bytes([0])])
+
+            self.assertIsNone(r0.exception)
+            self.assertIsNone(r1.exception)
+            self.assertIsNone(r2.exception)
+            self.assertNotEqual(r0.cov_cksum, r1.cov_cksum)
+            self.assertEqual(r0.cov_cksum, r2.cov_cksum)
+
+    def test_no_restore(self):
+        _, r1 = self.run_inputs(PersistentServer('ps_target', 'ps_target.ctx', 1024, restore='none'), [bytes([0]), bytes([0])])
+
+        self.assertEqual(r1.exception['name'], 'RuntimeError')
+
+    def test_recycle(self):
+        server = PersistentServer('ps_target', 'ps_target.ctx', 1024, max_iters=2, restore='none')
+        r0, r1, r2 = self.run_inputs(server, [bytes([0]), bytes([0]), bytes([0])])
+
+        self.assertIsNone(r0.exception)
+        self.assertIsNotNone(r1.exception)
+        self.assertIsNone(r2.exception)
+
+    def test_timeout(self):
+        server = PersistentServer('ps_target', 'ps_target.ctx', 1024)
+
+        try:
+            with self.assertRaises(TimeoutError):
+                server.collect(b'hang', timeout=0.2)
+
+            with self.assertRaises(ChildProcessError):
+                server.collect(b'exit')
+
+            self.assertIsNone(server.collect(bytes([0])).exception)
+        finally:
+            server.close()
+
+    def test_restart(self):
+        server = PersistentServer('ps_target', 'ps_target.ctx', 1024, restore='none')
+
+        try:
+            with self.assertRaises(ChildProcessError):
+                server.collect(b'exit')
+
+            # `calls` of the aborted iteration is gone with the server
+            self.assertIsNone(server.collect(bytes([0])).exception)
+            self.assertEqual(server.stats.n_respawns, 1)
+        finally:
+            server.close()
+
+    def test_hang(self):
+        server = PersistentServer('ps_target', 'ps_target.ctx', 1024)
+
+        try:
+            with self.assertRaises(TimeoutError):
+                server.collect(b'block', timeout=0.2)
+
+            self.assertIsNone(server.collect(bytes([0])).exception)
+            self.assertEqual(server.stats.n_respawns, 1)
+        finally:
+            server.close()
+
+    def test_max_rss(self):
+        server = PersistentServer('ps_target', 'ps_target.ctx', 1024, max_rss=1)
+        self.run_inputs(server, [bytes([0]), bytes([0]), bytes([0])])
+
+        self.assertEqual(server.stats.n_execs, 3)
+        self.assertEqual(server.stats.n_respawns, 2)
+
+    def test_invalid_restore(self):
+        with self.assertRaises(ValueError):
+            PersistentServer('ps_target', 'ps_target.ctx', 1024, restore='fork')
+
+if __name__ == '__main__':
+    unittest.main()
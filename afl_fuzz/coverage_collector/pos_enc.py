@@ -1,17 +1,28 @@
 from coverage.parser import PythonParser
 from coverage.config import DEFAULT_EXCLUDE
 from coverage.misc import join_regex
-from typing import Iterable
+from typing import Iterable, MutableSequence, Sequence
+from array import array
 import random
 
+from .result import BITMAP_TABLE, EDGE_SHIFT, to_edges
+
 # max 4-byte unsigned int
 MAX_INT = 2 ** 32 - 1
 
+# max no. of buckets. edge lists hold bucket indices on 24 bits, see `EDGE_SHIFT`
+MAX_BUCKETS: int = 1 << 20
+
+# 'line': a marker on every line of the parsed arcs
+# 'block': markers on the first lines of basic blocks only, see `block_leaders`
+TRACE_MODES: list[str] = ['line', 'block']
+DEFAULT_TRACE_MODE: str = 'line'
+
 def randint():
     '''
-    generate random 4-byte integer
+    generate random non-zero 4-byte integer
     '''
-    return random.randint(0, MAX_INT)
+    return random.randint(1, MAX_INT)
 
 def to_binned(val: int):
     '''
@@ -38,18 +49,43 @@ def to_binned(val: int):
     else:
         return val
 
+# hitcount -> binned hitcount, for `bytes.translate`
+BIN_TABLE: bytes = bytes(to_binned(i) for i in range(256))
+
+# buckets are visited one by one if at most 1 in this many was written, else all at once
+SPARSE_RATIO: int = 32
+
+def check_n_buckets(n_buckets: int):
+    '''
+    raise `ValueError` unless `n_buckets` is a power of two, at most `MAX_BUCKETS`
+    '''
+    if not (0 < n_buckets <= MAX_BUCKETS and n_buckets & (n_buckets - 1) == 0):
+        raise ValueError(f'no. of buckets must be a power of two up to {MAX_BUCKETS}. got {n_buckets}')
+
 class Hitcount:
     '''
-    Approximated branch hitcount
+    Approximated branch hitcount. one byte per bucket, saturating at 128.
+
+    buckets written by `add` since the last `reset` are tracked, so that `reset`, `bin` and
+    `edges` only visit those, and cost the same on large maps.
     '''
-    def __init__(self, n_buckets: int):
+    def __init__(self, n_buckets: int, buckets: MutableSequence[int] = None):
         '''
         Arguments:
         ---
-        - n_buckets: no. of buckets
+        - n_buckets: no. of buckets, a power of two
+        - buckets: write hitcounts into this byte buffer (e.g. shared memory) if set. its buckets
+          are not tracked until the first `reset`
         '''
+        check_n_buckets(n_buckets)
+
         self._n = n_buckets
-        self._buckets = [0] * n_buckets
+        self._mask = n_buckets - 1
+        self._buckets = buckets if buckets is not None else bytearray(n_buckets)
+
+        # buckets written since the last reset. only complete if `_tracked`
+        self._touched: list[int] = []
+        self._tracked: bool = buckets is None
 
     def add(self, s: int, t: int):
         '''
@@ -60,10 +96,72 @@ class Hitcount:
         - s: source
         - t: target
         '''
-        hash = (s ^ t) % self._n
-        self._buckets[hash] = min(self._buckets[hash] + 1, 128)
+        hash = (s ^ t) & self._mask
+        count = self._buckets[hash]
+
+        if count < 128:
+            if not count:
+                self._touched.append(hash)
+
+            self._buckets[hash] = count + 1
+
+    def add_hits(self, i: int, n: int):
+        '''
+        add `n` hits to bucket `i`
+        '''
+        count = self._buckets[i]
+
+        if not count:
+            self._touched.append(i)
+
+        self._buckets[i] = min(count + n, 128)
+
+    def _sparse(self) -> bool:
+        return self._tracked and len(self._touched) * SPARSE_RATIO <= self._n
+
+    def reset(self, full: bool = False):
+        '''
+        clear all buckets
+
+        Arguments:
+        ---
+        - full: clear every bucket, e.g. after another process wrote into shared buckets
+        '''
+        if self._sparse() and not full:
+            buckets = self._buckets
+
+            for i in self._touched:
+                buckets[i] = 0
+        else:
+            self._buckets[:] = bytes(self._n)
+
+        self._touched.clear()
+        self._tracked = True
+
+    def bin(self):
+        '''
+        replace hitcounts with binned hitcounts in place
+        '''
+        if self._sparse():
+            buckets = self._buckets
 
-    def get_binned(self) -> list[int]:
+            for i in self._touched:
+                buckets[i] = BIN_TABLE[buckets[i]]
+        else:
+            self._buckets[:] = self.get_binned()
+
+    def edges(self) -> array:
+        '''
+        edge list of binned hitcounts, see `to_edges`
+        '''
+        if not self._tracked:
+            return to_edges(self._buckets)
+
+        buckets = self._buckets
+
+        return array('I', sorted((i << EDGE_SHIFT) | BITMAP_TABLE[buckets[i]] for i in self._touched))
+
+    def get_binned(self) -> bytes:
         '''
         get binned hitcounts
 
@@ -71,46 +169,125 @@ class Hitcount:
         ---
         - binned hitcounts
         '''
-        out: list[int] = self._buckets[:]
+        return bytes(self._buckets).translate(BIN_TABLE)
+
+def line_marker(file_pe: Sequence[int], line: int) -> int:
+    '''
+    marker of a line
+
+    Arguments:
+    ---
+    - file_pe: positional encoding of a file
+    - line: line number
 
-        for i in range(self._n):
-            out[i] = to_binned(out[i])
+    Returns:
+    ---
+    - marker, 0 if the line has none
+    '''
+    return file_pe[line] if 0 < line < len(file_pe) else 0
 
-        return out
-            
-def get_positional_encoding(files: Iterable[str]):
+def block_leaders(arcs: Iterable[tuple[int, int]]) -> set[int]:
     '''
-    get positional encodings
+    first lines of basic blocks. a line is in the block of the line before it if that line only
+    goes to it, and it is only reached from that line. code objects start a block, so that calls
+    are recorded.
 
     Arguments:
     ---
-    - files to be marked
+    - arcs: arcs of coverage.py's parser. negative lines are entries and exits of code objects
+
+    Returns:
+    ---
+    - leaders
+    '''
+    succ: dict[int, set[int]] = dict()
+    pred: dict[int, set[int]] = dict()
+
+    leaders: set[int] = set()
+
+    for s, t in arcs:
+        succ.setdefault(s, set()).add(t)
+        pred.setdefault(t, set()).add(s)
+
+        # entry or exit of a code object
+        for line in (s, t):
+            if line < 0:
+                leaders.add(-line)
+
+    for line, p in pred.items():
+        if line < 0 or line in leaders:
+            continue
+
+        if len(p) != 1:
+            leaders.add(line)
+            continue
+
+        s, = p
+
+        if s < 0 or s == line or len(succ[s]) != 1:
+            leaders.add(line)
+
+    return leaders
+
+def parse_arcs(fname: str) -> set[tuple[int, int]]:
+    '''
+    arcs of a file, from coverage.py's parser. negative lines are entries and exits of code objects
+    '''
+    p = PythonParser(filename=fname, exclude=join_regex(DEFAULT_EXCLUDE[:]))
+    p.parse_source()
+
+    return p.arcs()
+
+def encode_file(fname: str, trace_mode: str = DEFAULT_TRACE_MODE) -> array:
+    '''
+    get the positional encoding of a file
+
+    Arguments:
+    ---
+    - fname: file to be marked
+    - trace_mode: lines to mark, see `TRACE_MODES`
 
     Returns:
     ---
-    - map: filename => (lineno => marker)
+    - marker of each line, indexed by line number. 0 for lines without one
     '''
-    enc: dict[str, dict[int, int]] = dict()
-    exclude_re = join_regex(DEFAULT_EXCLUDE[:])
-    
-    for f in files:
-        p = PythonParser(filename=f, exclude=exclude_re)
-        p.parse_source()
+    if trace_mode not in TRACE_MODES:
+        raise ValueError(f'unknown trace mode {trace_mode}. expected one of {TRACE_MODES}')
+
+    arcs = parse_arcs(fname)
+    lines: set[int] = set()
+
+    for s, t in arcs:
+        lines.add(abs(s))
+        lines.add(abs(t))
+
+    pe = array('I', bytes(4 * (max(lines, default=0) + 1)))
 
-        pe = dict()
-        enc[f] = pe
+    for line in sorted(lines):
+        pe[line] = randint()
 
-        pe[-1] = randint()
+    if trace_mode == 'block':
+        leaders = block_leaders(arcs)
 
-        for s, t in p.arcs():
-            s = abs(s)
-            t = abs(t)
+        for line in lines - leaders:
+            pe[line] = 0
 
-            if s not in pe:
-                pe[s] = randint()
+    # index 0 is never a line
+    pe[0] = 0
 
-            if t not in pe:
-                pe[t] = randint()
+    return pe
 
-    return enc
-    
\ No newline at end of file
+def get_positional_encoding(files: Iterable[str], trace_mode: str = DEFAULT_TRACE_MODE) -> dict[str, array]:
+    '''
+    get positional encodings
+
+    Arguments:
+    ---
+    - files to be marked
+    - trace_mode: lines to mark, see `TRACE_MODES`
+
+    Returns:
+    ---
+    - map: filename => marker of each line, see `encode_file`
+    '''
+    return { f: encode_file(f, trace_mode) for f in files }
@@ -0,0 +1,103 @@
+'''
+unit test for pos_enc.py
+'''
+
+import os
+import random
+import tempfile
+import unittest
+
+from afl_fuzz.coverage_collector.pos_enc import Hitcount, to_binned, encode_file
+from afl_fuzz.coverage_collector.result import to_bitmap, to_edges
+
+class hitcount_test(unittest.TestCase):
+    '''
+    unit test for Hitcount
+    '''
+
+    def test_saturate(self):
+        h = Hitcount(16)
+
+        for _ in range(300):
+            h.add(1, 2)
+
+        h.add(5, 2)
+
+        self.assertEqual(h._buckets[3], 128)
+        self.assertEqual(h._buckets[7], 1)
+
+    def test_binned(self):
+        h = Hitcount(256, bytearray(range(256)))
+        h._buckets[129:] = bytes(127)
+
+        binned = h.get_binned()
+
+        self.assertEqual(list(binned), [to_binned(c) for c in h._buckets])
+        self.assertEqual(list(to_bitmap(binned)), [(1 << (c - 1)) if c else 0 for c in binned])
+
+        h.bin()
+        self.assertEqual(h._buckets, binned)
+
+    def test_tracked(self):
+        random.seed(0)
+
+        # sparse and dense maps, over a new and a shared buffer
+        for n, buf in [(1 << 16, None), (64, None), (1 << 16, bytearray(b'x' * (1 << 16)))]:
+            h = Hitcount(n, buf)
+            h.reset()
+
+            for _ in range(3):
+                for _ in range(500):
+                    h.add(random.getrandbits(32), random.getrandbits(32) if random.random() < 0.5 else 7)
+
+                h.add_hits(5, 300)
+
+                binned = h.get_binned()
+                h.bin()
+
+                self.assertEqual(h._buckets, binned)
+                self.assertEqual(h.edges(), to_edges(binned))
+                self.assertEqual(h._buckets[5], 8)
+
+                h.reset()
+                self.assertEqual(h._buckets.count(0), n)
+
+    def test_n_buckets(self):
+        for n in [0, 1000, 1 << 21]:
+            with self.assertRaises(ValueError):
+                Hitcount(n)
+
+SRC = '''
+def f(x):
+    a = 1
+    b = 2
+    if x:
+        c = 3
+        d = 4
+    else:
+        c = 5
+    return c
+'''
+
+class encode_test(unittest.TestCase):
+    '''
+    unit test for encode_file
+    '''
+
+    def test_block(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            fname = os.path.join(tmp, 'blocks.py')
+
+            with open(fname, 'w') as f:
+                f.write(SRC)
+
+            lines = [i for i, m in enumerate(encode_file(fname, 'line')) if m]
+            leaders = [i for i, m in enumerate(encode_file(fname, 'block')) if m]
+
+        # `else` is not a line
+        self.assertEqual(lines, [1, 2, 3, 4, 5, 6, 7, 9, 10])
+        # module and function entries, both branches, join
+        self.assertEqual(leaders, [1, 2, 3, 6, 9, 10])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,109 +1,102 @@
 import subprocess
+import traceback
 import sys
-import json
-import uuid
-import os
-from afl_fuzz.coverage_collector.result import CoverageResult
+import time
+from typing import Callable
+
+from afl_fuzz.coverage_collector.result import CoverageResult, to_edges
+from afl_fuzz.coverage_collector.ipc import SharedBuckets, unpack_meta
+from afl_fuzz.coverage_collector.backend import ITraceBackend
 
-def _compile_code(src: str, out: str, args: str, ctx: str) -> str:
+def trace_main(c: ITraceBackend, main: Callable[[bytes], None], args: bytes) -> dict:
     '''
-    compile template
+    trace `main(args)`. hitcounts are binned in place afterwards.
 
     Arguments:
     ---
-    - src: entry point module
-    - out: temp file
-    - kwargs: kwargs in json
+    - c: tracing backend with empty data
+    - main: entry point
+    - args: input
 
     Returns:
     ---
-    - code
+    - run time and exception
     '''
+    elapsed = time.time()
+    stopped = False
 
-    return f'''
-from coverage import Coverage
-import traceback
-import json
-import time
-import afl_fuzz.override
-
-from afl_fuzz.coverage_collector.context import Context
-
-Context.read("{ctx}")
-
-c = Coverage(branch=True, data_file=None, data_suffix=True, timid=True)
-elapsed = time.time()
-stopped = False
-
-output = dict()
+    output = dict()
 
-try:
-    c.start()
-    
-    from {src} import main;
-    main({args})
-
-    c.stop()
-    elapsed = time.time() - elapsed
-    stopped = True
+    try:
+        c.start()
 
-    output["exception"] = None
+        main(args)
 
-except Exception as ex:
-    if not stopped:
         c.stop()
         elapsed = time.time() - elapsed
-        stopped = False
+        stopped = True
+
+        output['exception'] = None
 
-    output["exception"] = {{
-        "name": ex.__class__.__name__,
-        "message": str(ex),
-        "stacktrace": traceback.format_exc()
-    }}
+    except Exception as ex:
+        if not stopped:
+            c.stop()
+            elapsed = time.time() - elapsed
+            stopped = False
 
-output["cov"] = c._collector.data.get_binned()
-output["elapsed"] = elapsed
+        output['exception'] = {
+            'name': ex.__class__.__name__,
+            'message': str(ex),
+            'stacktrace': traceback.format_exc()
+        }
 
-with open("{out}", 'w') as f:
-    json.dump(output, f)
-'''
+    c.data.bin()
+    output['elapsed'] = elapsed
 
-def collect(src: str, ctx: str, args: bytes, out: str = None, timeout: int = None) -> CoverageResult:
+    return output
+
+def collect(src: str, ctx: str, args: bytes, shm: SharedBuckets, timeout: int = None) -> CoverageResult:
     '''
     collect coverage data in a spawned process
 
     Arguments:
     ---
     - src: entry point module
-    - kwargs: kwargs passed to <src>.main()
-    - out: temp file name. use uuid to generate temp file name if set to `None`.
+    - ctx: context file
+    - args: input passed to <src>.main()
+    - shm: shared buckets. the spawned process writes hitcounts into it
+    - timeout: timeout in seconds
 
     Returns:
     ---
     - coverage data
     '''
-    out = out or f'{uuid.uuid4()}.cov'
+    shm.clear()
 
     p = subprocess.Popen(
-        [sys.executable, '-c', _compile_code(src, out, args, ctx)], 
-        stdout=subprocess.DEVNULL,
+        [sys.executable, '-m', 'afl_fuzz.coverage_collector.harness', src, ctx, shm.fname],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
         #stderr=subprocess.DEVNULL
     )
 
     try:
-        p.wait(timeout=timeout)
-
-        with open(out, 'r') as f:
-            result = json.load(f)
-
-        return CoverageResult(
-            args=args,
-            cov=result['cov'],
-            elapsed=result['elapsed'],
-            exception=result['exception']
-        )
+        meta, _ = p.communicate(input=args, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise TimeoutError(f'execution timed out after {timeout} seconds')
     finally:
         # kill children
-        p.terminate()
+        p.kill()
+        p.wait()
+
+    if not meta:
+        raise ChildProcessError('target exited without reporting coverage')
 
-        os.path.exists(out) and os.remove(out)
\ No newline at end of file
+    elapsed, exception = unpack_meta(meta)
+
+    return CoverageResult(
+        args=args,
+        cov=to_edges(shm.read()),
+        elapsed=elapsed,
+        exception=exception
+    )
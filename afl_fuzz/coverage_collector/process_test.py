@@ -0,0 +1,61 @@
+'''
+unit test for process.py
+'''
+
+import os
+import unittest
+
+from afl_fuzz.coverage_collector.test_util import TargetTestCase
+from afl_fuzz.coverage_collector.ipc import SharedBuckets
+from afl_fuzz.coverage_collector.process import collect
+
+TARGET = '''
+def main(args: bytes):
+    if len(args) > 1024:
+        raise ValueError(len(args))
+'''
+
+class collect_test(TargetTestCase):
+    '''
+    unit test for collect
+    '''
+
+    target = 'p_target.py'
+    source = TARGET
+
+    def setUp(self):
+        super().setUp()
+
+        self.create_context().write('p_target.ctx')
+        self.shm = SharedBuckets(1024)
+
+    def tearDown(self):
+        self.shm.close()
+        super().tearDown()
+
+    def test_large_input(self):
+        # larger than the limit of a single command line argument
+        args = bytes(range(256)) * 4096
+        r = collect('p_target', 'p_target.ctx', args, self.shm)
+
+        self.assertEqual(r.args, args)
+        self.assertEqual(r.exception['name'], 'ValueError')
+        self.assertEqual(r.exception['message'], str(len(args)))
+        self.assertGreater(r.bitmap_size, 0)
+
+    def test_package(self):
+        # the entry point is a module of a package
+        os.mkdir('p_pkg')
+        open(os.path.join('p_pkg', '__init__.py'), 'w').close()
+
+        with open(os.path.join('p_pkg', 'p_target.py'), 'w') as f:
+            f.write(TARGET)
+
+        self.create_context(1024, os.path.join('p_pkg', 'p_target.py')).write('p_pkg.ctx')
+        r = collect('p_pkg.p_target', 'p_pkg.ctx', bytes(2048), self.shm)
+
+        self.assertEqual(r.exception['name'], 'ValueError')
+        self.assertGreater(r.bitmap_size, 0)
+
+if __name__ == '__main__':
+    unittest.main()
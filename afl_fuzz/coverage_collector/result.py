@@ -1,56 +1,111 @@
-from hashlib import md5
+import zlib
+from array import array
 from typing import Union
 
+# binned hitcount -> bitmap byte, for `bytes.translate`
+BITMAP_TABLE: bytes = bytes((1 << (c - 1)) if 0 < c <= 8 else 0 for c in range(256))
+
+# an edge list is a sorted `array('I')` of `bucket index << EDGE_SHIFT | bitmap byte`,
+# so up to 2^24 buckets
+EDGE_SHIFT: int = 8
+EDGE_MASK: int = 0xff
+
+# byte translation table: 0 for zero, 1 otherwise
+_NON_ZERO: bytes = bytes([0] + [1] * 255)
+
 def bitmap_size(bm: bytes) -> int:
     '''
     count no. of bits
     '''
-    return 0 + sum(bool(b) for b in bm)
+    return len(bm) - bm.count(0)
 
-def to_bitmap(cov: list[int]) -> bytes:
+def to_bitmap(cov: bytes) -> bytes:
     '''
-    covert coverage output to bitmap
+    covert binned coverage output to bitmap
     '''
-    bm = bytearray(len(cov))
+    return bytes(cov).translate(BITMAP_TABLE)
 
-    for i, c in enumerate(cov):
-        bm[i] = (1 << (c - 1)) if c else 0
+def to_edges(binned: bytes, start: int = 0, edges: array = None) -> array:
+    '''
+    convert binned hitcounts to an edge list
 
-    return bm
+    Arguments:
+    ---
+    - binned: binned hitcounts
+    - start: bucket index of `binned[0]`
+    - edges: append to this edge list if set. its last bucket must be before `start`
 
-def hash(bm: bytes) -> bytes:
+    Returns:
+    ---
+    - edge list
     '''
-    hash for computing checksum of trace bits
+    edges = edges if edges is not None else array('I')
+
+    bm = to_bitmap(binned)
+    # runs of non-zero buckets are found with `find`, which skips zeros in C
+    flags = bm.translate(_NON_ZERO)
+    pos = flags.find(1)
+
+    while pos != -1:
+        end = flags.find(0, pos)
+        end = len(flags) if end == -1 else end
+
+        edges.extend(((start + i) << EDGE_SHIFT) | bm[i] for i in range(pos, end))
+        pos = flags.find(1, end)
+
+    return edges
+
+def cksum(edges: array) -> int:
+    '''
+    64-bit checksum of an edge list
     '''
-    # just take first 4-bytes of md5 lol
-    return md5(bm).digest()[:4]
+    return (zlib.crc32(edges) << 32) | zlib.adler32(edges)
 
 class CoverageResult:
     '''
     coverage result
     '''
-    def __init__(self, args: bytes, cov: list[int] = None, elapsed: int = -1, exception: dict[str, str] = None):
+    # the queue and `top_rated` hold many of these
+    __slots__ = (
+        'args', 'cov', 'cov_cksum', 'bitmap_size', 'elapsed', 'exception', 'cov_ref',
+        'handicap', 'depth', 'calibrated', 'fuzzed', 'favored', 'trimmed', 'fuzz_level',
+        'synced'
+    )
+
+    def __init__(
+        self, 
+        args: bytes, 
+        cov: array = None, 
+        elapsed: int = -1, 
+        exception: dict[str, str] = None, 
+        cov_cksum: int = None
+    ):
         '''
         create result instance.
 
         Arguments:
         ---
         - args: input
-        - cov: coverage
+        - cov: coverage as an edge list, see `to_edges`
         - elapsed: run time
         - execption: exception if any
+        - cov_cksum: checksum of `cov` if already computed, e.g. by the traced process
         '''
-        if cov:
-            cov = to_bitmap(cov)
-            self.cov_cksum = hash(cov)
-            self.bitmap_size = bitmap_size(cov)
+        self.cov_cksum: Union[int, None] = cov_cksum
+        self.bitmap_size: int = 0
+
+        if cov is not None:
+            self.bitmap_size = len(cov)
+
+            if cov_cksum is None:
+                self.cov_cksum = cksum(cov)
 
         self.args = args
 
         self.elapsed: int = elapsed
         self.exception = exception
 
-        self.cov: Union[bytes, None] = cov
+        self.cov: Union[array, None] = cov
         self.cov_ref: int = 0
         
         self.handicap: int = 0
@@ -60,5 +115,11 @@ class CoverageResult:
         self.favored: bool = False
         self.trimmed: bool = False
 
+        # no. of times picked by a power schedule
+        self.fuzz_level: int = 0
+
+        # written to or read from the sync directory
+        self.synced: bool = False
+
     def arg_head(self) -> str:
         return self.args[:4].hex()
\ No newline at end of file
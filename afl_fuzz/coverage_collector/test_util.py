@@ -0,0 +1,56 @@
+'''
+fixture shared by the unit tests of the coverage collector, and of afl
+'''
+
+import os
+import sys
+import tempfile
+import unittest
+
+from afl_fuzz.coverage_collector import instrument
+from afl_fuzz.coverage_collector.context import Context
+
+class TargetTestCase(unittest.TestCase):
+    '''
+    runs each test in a temporary directory, which holds the target and the caches, so that tests
+    do not share state through the temp folder
+    '''
+
+    # filename of the target, and its source
+    target: str = 'target.py'
+    source: str = 'def main(args: bytes):\n    pass\n'
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+        # so that targets are imported by name
+        sys.path.insert(0, self.tmp.name)
+
+        with open(self.target, 'w') as f:
+            f.write(self.source)
+
+        self.cache_dir = os.path.join(self.tmp.name, 'afl_fuzz_cache')
+        self.instrument_cache_dir = instrument.CACHE_DIR
+        instrument.CACHE_DIR = os.path.join(self.cache_dir, 'instrument')
+
+    def tearDown(self):
+        instrument.CACHE_DIR = self.instrument_cache_dir
+        sys.path.remove(self.tmp.name)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def create_context(self, n_buckets: int = 1024, entry: str = None, *args, **kwargs) -> Context:
+        '''
+        analyze the target, with the cache in the temporary directory
+
+        Arguments:
+        ---
+        - n_buckets: no. of trace buckets
+        - entry: entry point. the target if `None`
+        - args, kwargs: passed to `Context.create`
+        '''
+        kwargs.setdefault('cache_dir', os.path.join(self.cache_dir, 'context'))
+
+        return Context.create(n_buckets, entry or self.target, *args, **kwargs)
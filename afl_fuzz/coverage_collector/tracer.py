@@ -6,16 +6,26 @@ from coverage.pytracer import PyTracer as _PyTracer
 from coverage.types import TLineNo, TTraceFn
 import sys
 from types import FrameType
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 from .context import Context
-
-THIS_FILE = __file__.rstrip("co")
+from .pos_enc import line_marker
 
 class PyTracer(_PyTracer):
     def __init__(self):
         super().__init__()
-        self.cur_file_pe = None
+
+        # filename -> marker of each line. `co_filename` strings cache their hash, so a lookup
+        # is one dict access
+        ctx = Context.get()
+        self._pe: dict[str, Sequence[int]] = ctx._pe if ctx else dict()
+
+        # markers of the innermost traced frame
+        self.cur_file_pe: Sequence[int] = ()
+
+    def __repr__(self) -> str:
+        # coverage.py's repr expects a dict of lines/arcs, which `Hitcount` is not
+        return f'<PyTracer at 0x{id(self):x}>'
 
     def _trace(
         self,
@@ -25,66 +35,64 @@ class PyTracer(_PyTracer):
         lineno: Optional[TLineNo] = None,       # pylint: disable=unused-argument
     ) -> Optional[TTraceFn]:
         """The trace function passed to sys.settrace."""
-        
-        if THIS_FILE in frame.f_code.co_filename:
-            return None
-        
+
         if (self.stopped and sys.gettrace() == self._cached_bound_method_trace):
             sys.settrace(None)
             return None
 
-        
-        flineno: TLineNo = frame.f_lineno
-        filename = frame.f_code.co_filename
-
-        pe: int = -1
-
-        # cache file marker
-        if filename != self.cur_file_name:
-            if file_pe := Context.get()._pe.get(filename, None):
-                pe = file_pe.get(flineno, -1)
-        else:
-            file_pe = self.cur_file_pe
-            pe = self.cur_file_pe.get(flineno, -1)
-        
-        if pe != -1:
-            self._activity = True
-            
-            if event == 'call':
-                self.data_stack.append((self.last_line, self.cur_file_name, self.cur_file_pe))
-
-                if self.last_line != 0:
-                    self.data.add(self.last_line, pe)
+        # only frames of encoded files get this function as their local tracer, and the
+        # innermost of them is the frame of the event
+        if event == 'line':
+            try:
+                pe = self.cur_file_pe[frame.f_lineno]
+            except IndexError:
+                return self._cached_bound_method_trace
 
-                self.last_line = 0
-                self.cur_file_name = filename
-                self.cur_file_pe = file_pe
-
-            elif event == 'line':
-                # Note: 
-                # cannot distinguish multiline statements
-                # e.g.
-                # ```
-                # print(
-                #   'x' + 
-                #   'y'
-                # )
-                # ```
-                #
-                # inline statements
-                # e.g.
-                # ```
-                # if x: print(x)
-                # ```
+            # Note:
+            # cannot distinguish multiline statements
+            # e.g.
+            # ```
+            # print(
+            #   'x' +
+            #   'y'
+            # )
+            # ```
+            #
+            # inline statements
+            # e.g.
+            # ```
+            # if x: print(x)
+            # ```
+            if pe:
                 if self.last_line != 0:
                     self.data.add(self.last_line, pe)
 
                 self.last_line = pe >> 1
 
-            elif event == 'return':
-                if self.last_line != 0:
-                    self.data.add(self.last_line, self.data_stack[-1][0])
+        elif event == 'call':
+            file_pe = self._pe.get(frame.f_code.co_filename)
+
+            # no local tracer, so no 'line' and 'return' events in files without encoding
+            if file_pe is None:
+                return None
+
+            self._activity = True
+
+            # module frames report line 0 on 'call' since python 3.11
+            pe = line_marker(file_pe, frame.f_lineno or frame.f_code.co_firstlineno)
+
+            self.data_stack.append((self.last_line, self.cur_file_pe))
+
+            if self.last_line != 0 and pe:
+                self.data.add(self.last_line, pe)
+
+            self.last_line = 0
+            self.cur_file_pe = file_pe
+
+        elif event == 'return' and self.data_stack:
+            if self.last_line != 0:
+                self.data.add(self.last_line, self.data_stack[-1][0])
 
-                self.last_line, self.cur_file_name, self.cur_file_pe = self.data_stack.pop()
+            self.last_line, self.cur_file_pe = self.data_stack.pop()
 
         return self._cached_bound_method_trace
@@ -0,0 +1,111 @@
+'''
+benchmark: `Hitcount.add` calls per execution, bucket collisions in a small map and traced calls/s
+with each trace mode, on the demo targets and a target with long straight-line functions. the
+'settrace' backend is used, in process.
+
+usage: python benchmark/blocks.py [n_calls] [n_buckets]
+'''
+import os
+import sys
+import time
+import random
+import tempfile
+from contextlib import redirect_stdout
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.backend import create_backend
+from afl_fuzz.coverage_collector.pos_enc import TRACE_MODES
+
+from tracer import DEMO_DIR, TARGETS, import_target
+
+STRAIGHT = '''
+def step(x):
+{body}
+    return x
+
+def main(args: bytes):
+    x = 0
+    for b in args:
+        if b & 1:
+            x = step(x + b)
+        else:
+            x = step(x - b)
+    return x
+'''
+
+def bench(main, inputs: list[bytes], n_buckets: int) -> tuple[float, float, float]:
+    '''
+    Returns:
+    ---
+    - `Hitcount.add` calls per execution
+    - share of distinct edges which share a bucket with another edge
+    - traced calls/s
+    '''
+    c = create_backend('settrace')
+
+    n_adds = 0
+    edges: set[tuple[int, int]] = set()
+    add = c.data.add
+
+    def counting_add(s: int, t: int):
+        nonlocal n_adds
+        n_adds += 1
+        edges.add((s, t))
+        add(s, t)
+
+    elapsed = 0
+
+    for counted in [False, True]:
+        c.data.add = counting_add if counted else add
+
+        for args in inputs:
+            start = time.time()
+
+            c.data.reset()
+            c.start()
+
+            try:
+                main(args)
+            except Exception:
+                pass
+            finally:
+                c.stop()
+
+            elapsed += 0 if counted else time.time() - start
+
+    buckets = set((s ^ t) & (n_buckets - 1) for s, t in edges)
+
+    return n_adds / len(inputs), 1 - len(buckets) / max(len(edges), 1), len(inputs) / elapsed
+
+if __name__ == '__main__':
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_buckets = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+    tmp = tempfile.TemporaryDirectory()
+
+    with open(os.path.join(tmp.name, 'straight.py'), 'w') as f:
+        f.write(STRAIGHT.format(body='\n'.join(f'    x = (x * {i} + {i}) % 65521' for i in range(1, 41))))
+
+    print(f'adds per exec, collisions in {n_buckets} buckets, calls/s')
+    print(f'{"target":<20}' + ''.join(f'{f"{m} adds":>14}{f"{m} coll.":>14}{f"{m} calls/s":>14}' for m in TRACE_MODES))
+
+    for folder, entry in [*TARGETS, (None, 'straight.py')]:
+        os.chdir(os.path.join(DEMO_DIR, folder) if folder else tmp.name)
+        sys.path.insert(0, os.getcwd())
+
+        inputs = [random.randbytes(random.randint(1, 32)) for _ in range(n_calls)]
+        row = f'{folder or entry:<20}'
+
+        for mode in TRACE_MODES:
+            Context._instance = Context.create(n_buckets, entry, 'settrace', mode)
+
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                adds, collisions, calls = bench(import_target(entry), inputs, n_buckets)
+
+            row += f'{adds:>14.1f}{collisions:>14.1%}{calls:>14.0f}'
+
+        sys.path.pop(0)
+        print(row)
+
+    os.chdir(DEMO_DIR)
+    tmp.cleanup()
@@ -0,0 +1,79 @@
+'''
+benchmark: time to create and read a context for a synthetic project of `n_modules` modules which
+import each other. cold runs parse every module, warm runs reuse the cache of analyzed files.
+
+usage: python benchmark/context.py [n_modules]
+'''
+import os
+import sys
+import time
+import random
+import tempfile
+
+from afl_fuzz.coverage_collector.context import Context
+
+MODULE = '''
+import os
+{imports}
+
+def f{i}(x):
+    if x > {i}:
+        return x - 1
+    for k in range(x):
+        if k % 3 == 0:
+            x += k
+        elif k % 3 == 1:
+            x -= 1
+        else:
+            x *= 2
+    return x
+
+class C{i}:
+    def g(self, y):
+        while y > 0:
+            y //= 2
+        return y
+'''
+
+def write_project(n_modules: int):
+    '''
+    write `mod0.py` to `mod<n_modules - 1>.py` in the working directory. every module is reachable
+    from `mod0`
+    '''
+    random.seed(0)
+
+    for i in range(n_modules):
+        imports = [f'mod{i + 1}'] if i + 1 < n_modules else []
+        imports += [f'mod{j}' for j in random.sample(range(n_modules), 3)]
+
+        with open(f'mod{i}.py', 'w') as f:
+            f.write(MODULE.format(i=i, imports='\n'.join(f'import {el}' for el in imports)))
+
+def timed(f) -> float:
+    start = time.time()
+    f()
+    return time.time() - start
+
+if __name__ == '__main__':
+    n_modules = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+
+    tmp = tempfile.TemporaryDirectory()
+    os.chdir(tmp.name)
+    sys.path.insert(0, tmp.name)
+
+    write_project(n_modules)
+
+    cache_dir = os.path.join(tmp.name, 'cache')
+
+    print(f'{n_modules} modules')
+    print(f'no cache: {timed(lambda: Context.create(1024, "mod0.py", cache_dir=None)):.3f} s')
+    print(f'cold:     {timed(lambda: Context.create(1024, "mod0.py", cache_dir=cache_dir)):.3f} s')
+    print(f'warm:     {timed(lambda: Context.create(1024, "mod0.py", cache_dir=cache_dir)):.3f} s')
+
+    ctx = Context.create(1024, 'mod0.py', cache_dir=cache_dir)
+    ctx.write('mod0.ctx')
+
+    print(f'read:     {timed(lambda: Context.read("mod0.ctx")) * 1000:.3f} ms, {os.path.getsize("mod0.ctx")} bytes')
+
+    os.chdir('/')
+    tmp.cleanup()
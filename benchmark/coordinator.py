@@ -0,0 +1,62 @@
+'''
+benchmark: share of time spent syncing with a local coordinator, for several nodes fuzzing the
+maze of benchmark/schedule.py. sync time should stay within a few percent of elapsed time, even
+when syncing more often than `SYNC_INTERVAL`.
+
+usage: python benchmark/coordinator.py [n_nodes] [seconds] [sync_interval] [exec_mode]
+'''
+import os
+import sys
+import tempfile
+import multiprocessing
+from contextlib import redirect_stdout
+
+from afl_fuzz.afl import fuzz
+from afl_fuzz.afl import sync
+from afl_fuzz.afl.config import TRACE_BUCKETS, TRACE_BACKEND
+from afl_fuzz.afl.coordinator import Coordinator
+from afl_fuzz.coverage_collector.context import Context
+
+from schedule import MAZE
+
+def node(address: str, name: str, seconds: float, exec_mode: str):
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        fuzz('maze.py', [bytes(16)], max_elapsed=seconds, exec_mode=exec_mode, coordinator=address, sync_id=name)
+
+if __name__ == '__main__':
+    n_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 30
+    sync.SYNC_INTERVAL = float(sys.argv[3]) if len(sys.argv) > 3 else sync.SYNC_INTERVAL
+    exec_mode = sys.argv[4] if len(sys.argv) > 4 else 'persistent'
+
+    tmp = tempfile.TemporaryDirectory()
+    os.chdir(tmp.name)
+
+    with open('maze.py', 'w') as f:
+        f.write(MAZE)
+
+    coordinator = Coordinator(Context.create(TRACE_BUCKETS, 'maze.py', TRACE_BACKEND))
+    address = coordinator.start()
+
+    mp = multiprocessing.get_context('fork' if hasattr(os, 'fork') else 'spawn')
+    procs = [mp.Process(target=node, args=(address, f'node{i}', seconds, exec_mode)) for i in range(n_nodes)]
+
+    for p in procs:
+        p.start()
+
+    for p in procs:
+        p.join()
+
+    stats = coordinator.stats()
+
+    print(f'{n_nodes} nodes, {seconds:.0f} s, sync every {sync.SYNC_INTERVAL} s')
+    print(f'{"node":<10}{"execs":>10}{"exported":>10}{"imported":>10}{"syncs":>10}{"sync time":>12}')
+
+    for name, el in stats['instances'].items():
+        print(f'{name:<10}{el["execs"]:>10}{el["exported"]:>10}{el["imported"]:>10}{el["syncs"]:>10}{el["sync_time"] / el["elapsed"]:>12.2%}')
+
+    print(f'corpus: {stats["entries"]} entries, buckets covered: {stats["covered"]}')
+
+    coordinator.close()
+    os.chdir('/')
+    tmp.cleanup()
@@ -0,0 +1,96 @@
+'''
+benchmark: `cull_queue` time for several map and queue sizes, on random traces: the first cull,
+then a cull after a few new entries. the quadratic implementation it replaced is only run on
+1K buckets.
+
+usage: python benchmark/cull.py [density]
+'''
+import os
+import sys
+import time
+import random
+import tempfile
+from array import array
+
+from afl_fuzz.afl.state import State
+from afl_fuzz.afl.score import update_bitmap_score, cull_queue
+from afl_fuzz.coverage_collector.result import CoverageResult, EDGE_SHIFT
+
+# (no. of buckets, queue size)
+SIZES: list[tuple[int, int]] = [(1 << 10, 1000), (1 << 10, 10000), (1 << 16, 1000), (1 << 16, 10000)]
+
+# entries added before the second cull
+N_NEW: int = 10
+
+def quadratic_cull_queue(state: State):
+    '''
+    favor top rated entries, as before
+    '''
+    covered = [False] * state.n_buckets
+
+    for el in state.queue:
+        el.favored = False
+
+    for i in range(state.n_buckets):
+        if not state.top_rated.get(i) or covered[i]:
+            continue
+
+        for j in range(state.n_buckets):
+            covered[i] |= bool(state.top_rated.get(j))
+
+        state.top_rated[i].favored = True
+
+def add_entries(state: State, n_entries: int, density: float):
+    '''
+    push random traces into the queue, rated by `update_bitmap_score`
+    '''
+    n_edges = max(1, int(state.n_buckets * density))
+
+    for _ in range(n_entries):
+        buckets = sorted(random.sample(range(state.n_buckets), n_edges))
+
+        cov = CoverageResult(random.randbytes(16), array('I', ((i << EDGE_SHIFT) | 1 for i in buckets)))
+        cov.elapsed = random.randint(1, 1000)
+
+        state.queue.push(cov)
+        update_bitmap_score(state, cov)
+
+def bench(cull, state: State) -> float:
+    '''
+    Returns:
+    ---
+    - seconds per cull
+    '''
+    state.score_changed = True
+
+    start = time.time()
+    cull(state)
+
+    return time.time() - start
+
+if __name__ == '__main__':
+    density = float(sys.argv[1]) if len(sys.argv) > 1 else 0.02
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+
+        with open('target.py', 'w') as f:
+            f.write('def main(args: bytes):\n    pass\n')
+
+        print(f'{"buckets":<10}{"queue":<10}{"favored":>10}{"first (ms)":>14}{f"+{N_NEW} (ms)":>14}{"quadratic (ms)":>18}')
+
+        for n_buckets, n_entries in SIZES:
+            state = State('target.py', n_buckets=n_buckets)
+            add_entries(state, n_entries, density)
+
+            first = bench(cull_queue, state)
+
+            # steady state: a few new entries per cycle
+            add_entries(state, N_NEW, density)
+            steady = bench(cull_queue, state)
+
+            n_favored = sum(el.favored for el in state.queue)
+
+            quadratic = f'{bench(quadratic_cull_queue, state) * 1e3:>18.1f}' if n_buckets <= 1024 else f'{"-":>18}'
+
+            print(f'{n_buckets:<10}{n_entries:<10}{n_favored:>10}{first * 1e3:>14.1f}{steady * 1e3:>14.2f}' + quadratic)
@@ -0,0 +1,47 @@
+'''
+benchmark: time to find the dependencies of a synthetic project of `n_modules` modules (see
+benchmark/context.py), serially and in a process pool, then from the cache after a few modules
+changed. parsing in a pool only helps with several cores.
+
+usage: python benchmark/deps.py [n_modules] [n_changed]
+'''
+import os
+import sys
+import tempfile
+
+from afl_fuzz.coverage_collector.cache import ContextCache
+from afl_fuzz.coverage_collector.dep_analyzer import get_deps
+
+from context import write_project, timed
+
+if __name__ == '__main__':
+    n_modules = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_changed = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    tmp = tempfile.TemporaryDirectory()
+    os.chdir(tmp.name)
+    sys.path.insert(0, tmp.name)
+
+    write_project(n_modules)
+
+    cache_dir = os.path.join(tmp.name, 'cache')
+
+    print(f'{n_modules} modules, {os.cpu_count()} cores')
+    print(f'serial:              {timed(lambda: get_deps("mod0.py")):.3f} s')
+    print(f'{os.cpu_count()} processes:         {timed(lambda: get_deps("mod0.py", n_jobs=None)):.3f} s')
+    print(f'deny glob:           {timed(lambda: get_deps("mod0.py", deny=["*/mod1*"])):.3f} s, {len(get_deps("mod0.py", deny=["*/mod1*"]))} files')
+    print(f'cache, cold:         {timed(lambda: ContextCache(cache_dir).deps("mod0.py")):.3f} s')
+    print(f'cache, warm:         {timed(lambda: ContextCache(cache_dir).deps("mod0.py")):.3f} s')
+
+    for i in range(n_changed):
+        with open(f'mod{i * (n_modules // n_changed)}.py', 'a') as f:
+            # a new edge to a module already found
+            f.write(f'\nimport mod{n_modules - 1 - i}\n')
+
+    cache = ContextCache(cache_dir)
+    elapsed = timed(lambda: cache.deps('mod0.py'))
+
+    print(f'cache, {n_changed} changed:     {elapsed:.3f} s, {cache.n_misses} parsed')
+
+    os.chdir('/')
+    tmp.cleanup()
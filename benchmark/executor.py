@@ -0,0 +1,83 @@
+'''
+benchmark: execs/s of each executor on the demo targets
+
+usage: python benchmark/executor.py [n_execs] [batch_size]
+'''
+import os
+import sys
+import time
+import random
+from uuid import uuid4
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.executor import EXECUTORS, create_executor
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+# (folder, entry point)
+TARGETS: list[tuple[str, str]] = [
+    ('toy_example', 'to_test.py'),
+    ('simulated_bff', 'buffer_overflow.py'),
+    ('simulated_sqli', 'sqli.py')
+]
+
+def bench(mode: str, entry: str, ctx: str, inputs: list[bytes], n_buckets: int = 1024, batch_size: int = 1) -> float:
+    '''
+    measure execs/s
+
+    Arguments:
+    ---
+    - mode: executor name
+    - entry: entry point
+    - ctx: context file
+    - inputs: inputs to run
+    - n_buckets: no. of trace buckets
+    - batch_size: no. of inputs per `collect_batch` call. 1 to call `collect`
+
+    Returns:
+    ---
+    - execs/s
+    '''
+    executor = create_executor(mode, entry[:entry.rindex('.')], ctx, n_buckets)
+
+    try:
+        # warm up
+        executor.collect(inputs[0])
+
+        start = time.time()
+
+        if batch_size == 1:
+            for args in inputs:
+                executor.collect(args)
+        else:
+            for i in range(0, len(inputs), batch_size):
+                executor.collect_batch(inputs[i:(i + batch_size)])
+
+        return len(inputs) / (time.time() - start)
+    finally:
+        executor.close()
+
+if __name__ == '__main__':
+    n_execs = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f'{"target":<20}' + ''.join(f'{mode:>22}' for mode in EXECUTORS))
+
+    for folder, entry in TARGETS:
+        os.chdir(os.path.join(DEMO_DIR, folder))
+        sys.path.insert(0, os.getcwd())
+
+        ctx = f'{uuid4()}.ctx'
+        Context.create(1024, entry).write(ctx)
+
+        inputs = [random.randbytes(random.randint(1, 32)) for _ in range(n_execs)]
+
+        try:
+            result = { mode: bench(mode, entry, ctx, inputs, batch_size=batch_size) for mode in EXECUTORS }
+        finally:
+            os.remove(ctx)
+            sys.path.pop(0)
+
+        print(f'{folder:<20}' + ''.join(
+            f'{result[mode]:>14.1f} ({result[mode] / result["spawn"]:>4.0f}x)' for mode in EXECUTORS
+        ))
@@ -0,0 +1,81 @@
+'''
+benchmark: `Hitcount.add`, `Hitcount.get_binned` and `to_bitmap` at several map sizes, against
+the list-backed implementation they replaced.
+
+usage: python benchmark/hitcount.py [n_repeat]
+'''
+import sys
+import random
+import timeit
+
+from afl_fuzz.coverage_collector.pos_enc import Hitcount, to_binned, randint
+from afl_fuzz.coverage_collector.result import to_bitmap
+
+SIZES: list[int] = [1 << 10, 1 << 16, 1 << 18]
+
+# edges added per `add` measurement
+N_EDGES: int = 10000
+
+class ListHitcount(Hitcount):
+    '''
+    list-backed hitcount, binned per bucket in python
+    '''
+    def __init__(self, n_buckets: int):
+        super().__init__(n_buckets, [0] * n_buckets)
+
+    def add(self, s: int, t: int):
+        hash = (s ^ t) % self._n
+        self._buckets[hash] = min(self._buckets[hash] + 1, 128)
+
+    def get_binned(self) -> list[int]:
+        out: list[int] = self._buckets[:]
+
+        for i in range(self._n):
+            out[i] = to_binned(out[i])
+
+        return out
+
+def list_to_bitmap(cov: list[int]) -> bytes:
+    bm = bytearray(len(cov))
+
+    for i, c in enumerate(cov):
+        bm[i] = (1 << (c - 1)) if c else 0
+
+    return bm
+
+def bench(h: Hitcount, to_bm, n_repeat: int) -> tuple[float, float, float]:
+    '''
+    Arguments:
+    ---
+    - h: hitcount
+    - to_bm: bitmap conversion
+    - n_repeat: no. of repeats, the best is taken
+
+    Returns:
+    ---
+    - ns per `add`, µs per `get_binned`, µs per bitmap conversion
+    '''
+    edges = [(randint(), randint()) for _ in range(N_EDGES)]
+
+    def add_all():
+        for s, t in edges:
+            h.add(s, t)
+
+    add = min(timeit.repeat(add_all, number=1, repeat=n_repeat)) / N_EDGES * 1e9
+    binned = min(timeit.repeat(h.get_binned, number=1, repeat=n_repeat)) * 1e6
+
+    cov = h.get_binned()
+    bitmap = min(timeit.repeat(lambda: to_bm(cov), number=1, repeat=n_repeat)) * 1e6
+
+    return add, binned, bitmap
+
+if __name__ == '__main__':
+    n_repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    random.seed(0)
+
+    print(f'{"buckets":<10}{"impl":<8}{"add (ns)":>12}{"get_binned (µs)":>18}{"to_bitmap (µs)":>18}')
+
+    for n in SIZES:
+        for name, h, to_bm in [('list', ListHitcount(n), list_to_bitmap), ('bytes', Hitcount(n), to_bitmap)]:
+            add, binned, bitmap = bench(h, to_bm, n_repeat)
+            print(f'{n:<10}{name:<8}{add:>12.0f}{binned:>18.1f}{bitmap:>18.1f}')
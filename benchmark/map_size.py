@@ -0,0 +1,96 @@
+'''
+benchmark: per execution cost of the coverage map at several sizes. first the map operations of
+one execution (bin, edge list, reset) on a trace of `n_edges` edges, over all buckets and over the
+buckets written only, then execs/s of each executor and backend on the toy target.
+
+usage: python benchmark/map_size.py [n_execs] [n_edges]
+'''
+import os
+import sys
+import time
+import random
+from uuid import uuid4
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.backend import TRACE_BACKENDS
+from afl_fuzz.coverage_collector.pos_enc import Hitcount
+from afl_fuzz.coverage_collector.result import to_edges
+
+from executor import DEMO_DIR, bench
+
+SIZES: list[int] = [1 << 10, 1 << 16, 1 << 20]
+
+def map_ops(n_buckets: int, trace: list[tuple[int, int]], tracked: bool, n_repeat: int = 200) -> float:
+    '''
+    Returns:
+    ---
+    - µs per execution spent in map operations, on top of `Hitcount.add`
+    '''
+    h = Hitcount(n_buckets)
+
+    def run(ops: bool):
+        start = time.time()
+
+        for _ in range(n_repeat):
+            for s, t in trace:
+                h.add(s, t)
+
+            if not ops:
+                for i in h._touched:
+                    h._buckets[i] = 0
+
+                h._touched.clear()
+            elif tracked:
+                h.bin()
+                h.edges()
+                h.reset()
+            else:
+                # every bucket, as before buckets were tracked
+                h._buckets[:] = h.get_binned()
+                to_edges(h._buckets)
+                h._buckets[:] = bytes(n_buckets)
+                h._touched.clear()
+
+        return time.time() - start
+
+    return (run(True) - run(False)) / n_repeat * 1e6
+
+if __name__ == '__main__':
+    n_execs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_edges = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+
+    random.seed(0)
+    trace = [(random.getrandbits(32), random.getrandbits(32)) for _ in range(n_edges)]
+
+    print(f'map operations per execution, {n_edges} edges (µs)')
+    print(f'{"buckets":<10}{"all buckets":>14}{"written only":>14}')
+
+    for n in SIZES:
+        print(f'{n:<10}{map_ops(n, trace, False):>14.1f}{map_ops(n, trace, True):>14.1f}')
+
+    backends = [b for b in TRACE_BACKENDS if b != 'monitoring' or hasattr(sys, 'monitoring')]
+    modes = ['forkserver', 'persistent']
+
+    os.chdir(os.path.join(DEMO_DIR, 'toy_example'))
+    sys.path.insert(0, os.getcwd())
+
+    inputs = [random.randbytes(random.randint(1, 32)) for _ in range(n_execs)]
+
+    print()
+    print(f'execs/s on toy_example')
+    print(f'{"executor":<28}' + ''.join(f'{n:>10}' for n in SIZES))
+
+    for mode in modes:
+        for b in backends:
+            result: list[float] = []
+
+            for n in SIZES:
+                ctx = f'{uuid4()}.ctx'
+                Context.create(n, 'to_test.py', b).write(ctx)
+
+                try:
+                    result.append(bench(mode, 'to_test.py', ctx, inputs, n_buckets=n))
+                finally:
+                    os.remove(ctx)
+
+            print(f'{f"{mode}, {b}":<28}' + ''.join(f'{el:>10.0f}' for el in result))
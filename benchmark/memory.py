@@ -0,0 +1,85 @@
+'''
+benchmark: memory per queue entry of a corpus, with dense bitmaps in a `__dict__` object (as
+before) and with edge lists in `CoverageResult`
+
+usage: python benchmark/memory.py [n_entries] [n_buckets] [density]
+'''
+import sys
+import random
+import tracemalloc
+from array import array
+
+from afl_fuzz.coverage_collector.result import CoverageResult, cksum, to_bitmap, to_edges
+
+# distinct random traces
+N_TRACES: int = 64
+
+class DenseResult:
+    '''
+    coverage result with a dense bitmap and a `__dict__`
+    '''
+    def __init__(self, args: bytes, cov: bytes):
+        self.cov_cksum = cksum(cov)
+        self.bitmap_size = len(cov) - cov.count(0)
+        self.args = args
+        self.elapsed = -1
+        self.exception = None
+        self.cov = cov
+        self.cov_ref = 0
+        self.handicap = 0
+        self.depth = 0
+        self.calibrated = False
+        self.fuzzed = False
+        self.favored = False
+        self.trimmed = False
+
+def random_trace(n_buckets: int, density: float) -> bytes:
+    '''
+    binned hitcounts of a random trace
+    '''
+    binned = bytearray(n_buckets)
+
+    for i in random.sample(range(n_buckets), int(n_buckets * density)):
+        binned[i] = random.randint(1, 8)
+
+    return binned
+
+def measure(create, n_entries: int, traces: list) -> float:
+    '''
+    Arguments:
+    ---
+    - create: create entry from input and trace
+    - n_entries: no. of entries
+    - traces: traces, reused in turn
+
+    Returns:
+    ---
+    - bytes per entry
+    '''
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+
+    corpus = [create(random.randbytes(16), traces[i % len(traces)]) for i in range(n_entries)]
+
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    return size / len(corpus)
+
+if __name__ == '__main__':
+    n_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_buckets = int(sys.argv[2]) if len(sys.argv) > 2 else 1 << 16
+    density = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+
+    traces = [random_trace(n_buckets, density) for _ in range(N_TRACES)]
+
+    # entries copy the converted traces
+    bitmaps = [to_bitmap(binned) for binned in traces]
+    edges = [to_edges(binned) for binned in traces]
+
+    dense = measure(lambda args, bm: DenseResult(args, bytearray(bm)), n_entries, bitmaps)
+    sparse = measure(lambda args, e: CoverageResult(args, array('I', e)), n_entries, edges)
+
+    print(f'{n_entries} entries, {n_buckets} buckets, {density:.0%} of buckets covered per trace')
+    print(f'{"dense bitmap, __dict__":<28}{dense / 1024:>10.1f} KiB/entry')
+    print(f'{"edge list, __slots__":<28}{sparse / 1024:>10.1f} KiB/entry')
@@ -0,0 +1,101 @@
+'''
+benchmark: buckets covered after a fixed no. of executions with each seed schedule on the demo
+targets and on a maze of nested byte comparisons, averaged over a few runs. the demo targets are
+shallow, so the maze is where schedules differ.
+
+usage: python benchmark/schedule.py [n_execs] [n_runs] [exec_mode]
+'''
+import os
+import sys
+import time
+import random
+import tempfile
+from contextlib import redirect_stdout
+
+from afl_fuzz.afl import fuzz
+from afl_fuzz.afl.schedule import SCHEDULES
+from afl_fuzz.coverage_collector.result import bitmap_size
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+# (folder, entry point, seed)
+TARGETS: list[tuple[str, str, list[bytes]]] = [
+    ('toy_example', 'to_test.py', [bytes([0x00])]),
+    ('simulated_bff', 'buffer_overflow.py', [b'a' * 100, b'HELLO']),
+    ('simulated_sqli', 'sqli.py', [bytes([0x00, 0x00, 0x00, 0x00]), b'abc']),
+    (None, 'maze.py', [bytes(16)])
+]
+
+MAZE = '''
+def main(args: bytes):
+    if len(args) < 8:
+        return 0
+
+    n = 0
+
+    if args[0] == 0x46:
+        n += 1
+        if args[1] == 0x55:
+            n += 1
+            if args[2] == 0x5a:
+                n += 1
+                if args[3] == 0x5a:
+                    n += 1
+
+    for b in args[4:8]:
+        if b < 0x20:
+            n += 1
+        elif b < 0x40:
+            n += 2
+        elif b < 0x80:
+            n += 3
+        else:
+            n += 4
+
+    if args[4] == args[5] and args[6] == 0xff:
+        n += 1
+
+    return n
+'''
+
+def bench(entry: str, seed: list[bytes], schedule: str, n_execs: int, run: int, exec_mode: str) -> tuple[int, int]:
+    '''
+    Returns:
+    ---
+    - no. of covered buckets
+    - no. of executions
+    '''
+    random.seed(run)
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        state = fuzz(entry, seed, schedule=schedule, max_execs=n_execs, exec_mode=exec_mode)
+
+    return bitmap_size(state.covered), state.total_execs
+
+if __name__ == '__main__':
+    n_execs = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    exec_mode = sys.argv[3] if len(sys.argv) > 3 else 'persistent'
+
+    tmp = tempfile.TemporaryDirectory()
+
+    with open(os.path.join(tmp.name, 'maze.py'), 'w') as f:
+        f.write(MAZE)
+
+    print(f'buckets covered after {n_execs} execs, mean of {n_runs} runs')
+    print(f'{"target":<20}' + ''.join(f'{s:>10}' for s in SCHEDULES) + f'{"time (s)":>10}')
+
+    for folder, entry, seed in TARGETS:
+        os.chdir(os.path.join(DEMO_DIR, folder) if folder else tmp.name)
+
+        start = time.time()
+        covered: list[float] = []
+
+        for schedule in SCHEDULES:
+            results = [bench(entry, seed, schedule, n_execs, run, exec_mode) for run in range(n_runs)]
+            covered.append(sum(n for n, _ in results) / n_runs)
+
+        print(f'{folder or entry:<20}' + ''.join(f'{n:>10.1f}' for n in covered) + f'{time.time() - start:>10.0f}')
+
+    os.chdir(DEMO_DIR)
+    tmp.cleanup()
@@ -0,0 +1,65 @@
+'''
+benchmark: execs/s of a deterministic stage of a single entry with 1 to `os.cpu_count()` executor
+workers, on the demo targets. the stage is split across workers, so execs/s should scale with
+the no. of cores.
+
+usage: python benchmark/stage.py [input_len] [exec_mode]
+'''
+import os
+import sys
+import time
+import random
+from contextlib import redirect_stdout
+
+from afl_fuzz.afl.state import State
+from afl_fuzz.afl.exec import fuzz_batched
+from afl_fuzz.afl.mutation import generate_bitflips
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+# (folder, entry point)
+TARGETS: list[tuple[str, str]] = [
+    ('toy_example', 'to_test.py'),
+    ('simulated_bff', 'buffer_overflow.py'),
+    ('simulated_sqli', 'sqli.py')
+]
+
+def bench(entry: str, args: bytes, n_workers: int, exec_mode: str) -> float:
+    '''
+    measure execs/s of bitflip 1/1 on an input
+
+    Returns:
+    ---
+    - execs/s
+    '''
+    state = State(entry, exec_mode=exec_mode, exec_options={ 'n_workers': n_workers })
+    state.use_ctx()
+
+    buf = bytearray(args)
+
+    try:
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            # warm up
+            [*fuzz_batched(state, [args] * n_workers)]
+
+            start = time.time()
+            n_execs = len([*fuzz_batched(state, (bytes(buf) for _ in generate_bitflips(buf, 1)))])
+
+        return n_execs / (time.time() - start)
+    finally:
+        state.rm_ctx()
+
+if __name__ == '__main__':
+    input_len = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    exec_mode = sys.argv[2] if len(sys.argv) > 2 else 'persistent'
+
+    workers = sorted({ 1, 2, 4, os.cpu_count() })
+
+    print(f'{"target":<20}' + ''.join(f'{f"{n} workers":>14}' for n in workers))
+
+    for folder, entry in TARGETS:
+        os.chdir(os.path.join(DEMO_DIR, folder))
+
+        args = random.randbytes(input_len)
+
+        print(f'{folder:<20}' + ''.join(f'{bench(entry, args, n, exec_mode):>14.1f}' for n in workers))
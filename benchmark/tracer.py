@@ -0,0 +1,110 @@
+'''
+benchmark: traced calls/s of `main` with each tracing backend on the demo targets, in process.
+also checks that 'settrace' and 'monitoring' produce the same bitmap. 'instrument' records
+edges across calls differently, so its bitmap is not compared.
+
+usage: python benchmark/tracer.py [n_calls]
+'''
+import os
+import sys
+import time
+import random
+import importlib
+from contextlib import redirect_stdout
+
+from afl_fuzz.coverage_collector.context import Context
+from afl_fuzz.coverage_collector.backend import TRACE_BACKENDS, ITraceBackend, create_backend
+
+DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'demo')
+
+# (folder, entry point)
+TARGETS: list[tuple[str, str]] = [
+    ('toy_example', 'to_test.py'),
+    ('simulated_bff', 'buffer_overflow.py'),
+    ('simulated_sqli', 'sqli.py')
+]
+
+def import_target(entry: str):
+    '''
+    import the entry point afresh, so that the instrumentation hook sees it
+
+    Returns:
+    ---
+    - `main` of the entry point
+    '''
+    files = set(os.path.realpath(f) for f in Context.get()._pe.keys())
+
+    for name, m in [*sys.modules.items()]:
+        if isinstance(getattr(m, '__file__', None), str) and os.path.realpath(m.__file__) in files:
+            del sys.modules[name]
+
+    return importlib.import_module(entry[:entry.rindex('.')]).main
+
+def bench(c: ITraceBackend, main, inputs: list[bytes]) -> tuple[float, list[bytes]]:
+    '''
+    measure traced calls/s
+
+    Arguments:
+    ---
+    - c: tracing backend, `None` to run without tracing
+    - main: entry point
+    - inputs: inputs to run
+
+    Returns:
+    ---
+    - calls/s
+    - binned bitmap of each input
+    '''
+    bitmaps: list[bytes] = []
+    elapsed = 0
+
+    for args in inputs:
+        start = time.time()
+
+        if c:
+            c.data.reset()
+            c.start()
+
+        try:
+            main(args)
+        except Exception:
+            pass
+        finally:
+            c and c.stop()
+
+        elapsed += time.time() - start
+
+        if c:
+            c.data.bin()
+            bitmaps.append(bytes(c.data._buckets))
+
+    return len(inputs) / elapsed, bitmaps
+
+if __name__ == '__main__':
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    backends = [b for b in TRACE_BACKENDS if b != 'monitoring' or hasattr(sys, 'monitoring')]
+
+    print(f'{"target":<20}{"untraced":>12}' + ''.join(f'{b:>14}' for b in backends) + f'{"same bitmap":>14}')
+
+    result: dict[str, tuple[float, list[bytes]]] = dict()
+
+    for folder, entry in TARGETS:
+        os.chdir(os.path.join(DEMO_DIR, folder))
+        sys.path.insert(0, os.getcwd())
+
+        Context._instance = Context.create(1024, entry)
+
+        inputs = [random.randbytes(random.randint(1, 32)) for _ in range(n_calls)]
+
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            untraced, _ = bench(None, import_target(entry), inputs)
+
+            for b in backends:
+                c = create_backend(b)
+                result[b] = bench(c, import_target(entry), inputs)
+
+        sys.path.pop(0)
+
+        same = result['monitoring'][1] == result['settrace'][1] if 'monitoring' in result else '-'
+
+        print(f'{folder:<20}{untraced:>12.0f}' + ''.join(f'{result[b][0]:>14.0f}' for b in backends) + f'{str(same):>14}')